@@ -0,0 +1,128 @@
+"""Chat and health-check latency during an upload burst, with and without admission control.
+
+Runs the app in-process (stub LLM and embeddings, see bench_e2e). Each round fires a
+burst of concurrent uploads while chat clients and a health-check prober keep
+sending requests, then reports latency and status counts per request type along
+with the admission stats (queue depth, shed counts) from /api/metrics.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_admission [--uploads 12] [--pages 40] [--chat-clients 8] [--duration 10]
+"""
+from benchmarks.bench_e2e import configure_environment
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+from collections import Counter
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import httpx
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    return time.perf_counter() - start, response.status_code
+
+
+async def run_round(client: httpx.AsyncClient, pdf_bytes: bytes, args) -> dict:
+    samples = {"upload": [], "chat": [], "health": []}
+    deadline = time.perf_counter() + args.duration
+
+    async def upload(i: int):
+        samples["upload"].append(await timed(
+            client, "POST", "/api/upload",
+            files={"file": (f"burst_{i}.pdf", pdf_bytes, "application/pdf")}
+        ))
+
+    async def chat_client(i: int):
+        session_id = str(uuid.uuid4())
+        n = 0
+        while time.perf_counter() < deadline:
+            samples["chat"].append(await timed(
+                client, "POST", "/api/chat",
+                json={"question": f"Explain the revenue trend ({i}-{n})", "session_id": session_id}
+            ))
+            n += 1
+
+    async def health_prober():
+        while time.perf_counter() < deadline:
+            samples["health"].append(await timed(client, "GET", "/"))
+            await asyncio.sleep(args.health_interval)
+
+    await asyncio.gather(
+        *(upload(i) for i in range(args.uploads)),
+        *(chat_client(i) for i in range(args.chat_clients)),
+        health_prober()
+    )
+    return samples
+
+
+async def run(args, work_dir: str) -> list:
+    import main
+    from config import settings
+
+    path = make_synthetic_pdf(os.path.join(work_dir, "burst.pdf"), args.pages)
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    rows = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for enabled in (False, True):
+                settings.admission_control_enabled = enabled
+                samples = await run_round(client, pdf_bytes, args)
+                admission = (await client.get("/api/metrics")).json()["admission"]
+
+                for kind, results in samples.items():
+                    statuses = Counter(status for _, status in results)
+                    ok = [duration for duration, status in results if status < 400]
+                    rows.append({
+                        "admission": "on" if enabled else "off",
+                        "request": kind,
+                        "ok": sum(count for status, count in statuses.items() if status < 400),
+                        "shed_429": statuses.get(429, 0),
+                        "shed_503": statuses.get(503, 0),
+                        "errors": sum(count for status, count in statuses.items() if status >= 400 and status not in (429, 503)),
+                        **percentiles(ok)
+                    })
+                rows.append({"admission": "on" if enabled else "off", "request": "metrics", "stats": admission})
+    finally:
+        await main.shutdown_event()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=12, help="Concurrent uploads in the burst")
+    parser.add_argument("--pages", type=int, default=40, help="Pages per uploaded PDF")
+    parser.add_argument("--chat-clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds chat and health clients keep running")
+    parser.add_argument("--health-interval", type=float, default=0.05)
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="Stub LLM latency in seconds")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_admission_")
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    configure_environment(work_dir, args.stub_latency, real_embeddings=False)
+    try:
+        rows = asyncio.run(run(args, work_dir))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table([row for row in rows if row["request"] != "metrics"],
+                ["admission", "request", "ok", "shed_429", "shed_503", "errors", "p50_ms", "p99_ms"])
+    write_results("admission", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
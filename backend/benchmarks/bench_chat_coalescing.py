@@ -0,0 +1,75 @@
+"""Latency and model calls of chat request coalescing against a stub model.
+
+Fires N concurrent identical questions (plus a few distinct ones) through the
+single-flight layer and RAGPipeline, with and without coalescing, and reports
+model calls, searches and latency. Correctness is covered by
+tests/test_request_coalescer.py.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chat_coalescing [--concurrency 50] [--distinct 3]
+"""
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.stubs import StubGenerativeModel, StubVectorStore
+import argparse
+import asyncio
+import time
+
+from services.rag_pipeline import RAGPipeline
+from services.request_coalescer import SingleFlight
+
+
+async def ask(coalescer: SingleFlight, pipeline: RAGPipeline, question: str, history: list):
+    start = time.perf_counter()
+    result, coalesced = await coalescer.run(
+        pipeline.coalescing_key(question, None, history),
+        lambda: pipeline.generate_answer(question=question, chat_history=list(history))
+    )
+    # Each caller updates only its own session
+    history.append({"role": "user", "content": question})
+    history.append({"role": "assistant", "content": result["answer"]})
+    return time.perf_counter() - start, coalesced
+
+
+async def run(concurrency: int, distinct: int, coalesce: bool, latency: float):
+    pipeline = RAGPipeline(StubVectorStore(), model=StubGenerativeModel(latency=latency))
+    coalescer = SingleFlight("bench")
+    if not coalesce:
+        # Unique keys disable sharing
+        counter = iter(range(10 ** 9))
+        pipeline.coalescing_key = lambda *args: str(next(counter))
+
+    questions = [f"What were the key risks disclosed in section {i}?" for i in range(distinct)]
+    sessions = [[] for _ in range(concurrency)]
+    outcomes = await asyncio.gather(*(
+        ask(coalescer, pipeline, questions[i % distinct], sessions[i])
+        for i in range(concurrency)
+    ))
+
+    return {
+        "mode": "coalesced" if coalesce else "independent",
+        "requests": concurrency,
+        "model_calls": pipeline.model.calls,
+        "searches": pipeline.vector_store.searches,
+        "coalesced": sum(1 for _, was_coalesced in outcomes if was_coalesced),
+        **percentiles([duration for duration, _ in outcomes])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rows = [
+        asyncio.run(run(args.concurrency, args.distinct, coalesce, args.latency))
+        for coalesce in (False, True)
+    ]
+    print_table(rows, ["mode", "requests", "model_calls", "searches", "coalesced", "p50_ms", "p99_ms"])
+    write_results("chat_coalescing", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compare the recursive character splitter with the structure-aware chunker.
+
+Reports chunk count, ingest time (chunking + embedding) and retrieval hit rate@k
+for line-item questions whose answer is a numeric row in the document.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_chunking [--pages 40] [--queries 50] [--k 3] [--pdf PATH]
+"""
+from benchmarks.common import SAMPLE_PDF_PATH, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from config import settings
+from services.chunking import StructureAwareChunker
+from services.pdf_processor import PDFProcessor
+
+
+def build_queries(pages_content, count: int, seed: int = 7):
+    """Pick numeric rows and ask for their first value; the row must land in one chunk to count as a hit"""
+    rows = []
+    for page_data in pages_content:
+        for line in page_data["content"].splitlines():
+            line = line.strip()
+            tokens = line.split()
+            if StructureAwareChunker.is_numeric_row(line) and len(tokens) >= 3:
+                label = " ".join(t for t in tokens if not StructureAwareChunker.is_numeric_row(t))
+                if label:
+                    rows.append((label, line))
+
+    rng = random.Random(seed)
+    rng.shuffle(rows)
+    return [(f"What was the reported {label}?", row) for label, row in rows[:count]]
+
+
+def bench_strategy(strategy: str, pages_content, queries, embeddings, k: int):
+    settings.chunking_strategy = strategy
+    processor = PDFProcessor()
+
+    start = time.perf_counter()
+    documents = processor.split_into_chunks(pages_content, "bench.pdf", "bench")
+    chunk_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    texts = [doc.page_content for doc in documents]
+    chunk_vectors = np.array(embeddings.embed_documents(texts), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+
+    query_vectors = np.array(embeddings.embed_documents([q for q, _ in queries]), dtype=np.float32)
+    chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    top_k = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :k]
+
+    hits = sum(
+        any(row in texts[idx] for idx in top_k[q_idx])
+        for q_idx, (_, row) in enumerate(queries)
+    )
+
+    return {
+        "strategy": strategy,
+        "chunks": len(documents),
+        "avg_chars": sum(len(t) for t in texts) / len(texts) if texts else 0.0,
+        "chunk_s": chunk_seconds,
+        "embed_s": embed_seconds,
+        f"hit_rate@{k}": hits / len(queries) if queries else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--pdf", default=None, help="Benchmark this PDF instead of synthetic + sample")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    # Keep statement rows in the prose so both strategies have to deal with them
+    settings.extract_tables = False
+    original_strategy = settings.chunking_strategy
+    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.pdf:
+            sources = [(os.path.basename(args.pdf), args.pdf)]
+        else:
+            sources = [("synthetic", make_synthetic_pdf(os.path.join(tmp_dir, "synthetic.pdf"), args.pages, 0.5))]
+            if os.path.exists(SAMPLE_PDF_PATH):
+                sources.append(("sample.pdf", SAMPLE_PDF_PATH))
+
+        for label, path in sources:
+            start = time.perf_counter()
+            pages_content = PDFProcessor().extract_text_from_pdf(path)
+            extract_seconds = time.perf_counter() - start
+            queries = build_queries(pages_content, args.queries)
+
+            for strategy in ("recursive", "structure"):
+                row = bench_strategy(strategy, pages_content, queries, embeddings, args.k)
+                row.update({"document": label, "extract_s": extract_seconds, "queries": len(queries)})
+                row["ingest_s"] = extract_seconds + row["chunk_s"] + row["embed_s"]
+                rows.append(row)
+
+    settings.chunking_strategy = original_strategy
+    print_table(rows, ["document", "strategy", "chunks", "avg_chars", "chunk_s", "embed_s", "ingest_s", f"hit_rate@{args.k}"])
+    write_results("chunking", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
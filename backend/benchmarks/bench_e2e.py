@@ -0,0 +1,245 @@
+"""End-to-end benchmark of the FastAPI app with a stub LLM.
+
+Drives the real app in-process over httpx's ASGI transport, with a deterministic
+stub in place of genai.GenerativeModel and (unless --real-embeddings) hash-based
+embeddings, against a throwaway Chroma directory. Scenarios:
+
+  ingest   upload throughput of synthetic and sample.pdf-derived documents at several sizes
+  listing  /api/documents and /api/chunks latency as the corpus grows
+  chat     /api/chat latency percentiles at several concurrency levels
+
+The process RSS high-water mark is recorded after every step. Results are written
+as JSON; pass --baseline with a previous results file to report regressions.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_e2e [--sizes 5 20 50] [--concurrency 1 8 32]
+                                   [--baseline benchmarks/results/e2e.json] [--fail-on-regression]
+"""
+from benchmarks.common import (
+    SAMPLE_PDF_PATH, compare_results, load_results, percentiles, print_table, write_results
+)
+from benchmarks.stubs import StubEmbeddings, StubGenerativeModel
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import fitz  # PyMuPDF
+import httpx
+
+CHAT_QUESTIONS = [
+    "How did revenue change compared to the prior year?",
+    "Explain the main drivers of operating expenses.",
+    "Why did borrowings increase during the period?",
+    "Compare total assets and total liabilities.",
+    "What is the trend in retained earnings?",
+]
+
+
+def configure_environment(work_dir: str, stub_latency: float, real_embeddings: bool) -> None:
+    """Point storage at work_dir and swap external models for stubs; must run before importing main"""
+    os.environ.update({
+        "CHROMA_PERSIST_DIRECTORY": os.path.join(work_dir, "chroma_db"),
+        "FACTS_DB_PATH": os.path.join(work_dir, "facts.db"),
+        "CHART_CACHE_DIRECTORY": os.path.join(work_dir, "chart_cache"),
+        # Measure the pipeline rather than the production rate limits
+        "LLM_REQUESTS_PER_MINUTE": "1000000",
+        "LLM_TOKENS_PER_MINUTE": "1000000000",
+        "LLM_MAX_CONCURRENCY": "64",
+        "LOG_LEVEL": "WARNING",
+    })
+
+    import google.generativeai as genai
+    genai.GenerativeModel = lambda *args, **kwargs: StubGenerativeModel(latency=stub_latency)
+
+    if not real_embeddings:
+        import langchain_huggingface
+        langchain_huggingface.HuggingFaceEmbeddings = StubEmbeddings
+
+
+def make_sample_derived_pdf(path: str, pages: int) -> str:
+    """Repeat the pages of data/sample.pdf until the document has the requested page count"""
+    source = fitz.open(SAMPLE_PDF_PATH)
+    doc = fitz.open()
+    while doc.page_count < pages:
+        doc.insert_pdf(source, to_page=min(source.page_count, pages - doc.page_count) - 1)
+    doc.save(path)
+    doc.close()
+    source.close()
+    return path
+
+
+def peak_rss_mb() -> float:
+    """Process resident set size high-water mark in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def time_requests(client: httpx.AsyncClient, method: str, url: str, repeats: int, **kwargs) -> list:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def run_ingest_and_listing(client: httpx.AsyncClient, args, pdf_dir: str) -> tuple:
+    sources = ["synthetic"] + (["sample"] if os.path.exists(SAMPLE_PDF_PATH) else [])
+    ingest_rows, listing_rows = [], []
+    corpus_chunks = 0
+
+    for source in sources:
+        for pages in args.sizes:
+            path = os.path.join(pdf_dir, f"{source}_{pages}.pdf")
+            if source == "synthetic":
+                make_synthetic_pdf(path, pages, table_ratio=args.table_ratio)
+            else:
+                make_sample_derived_pdf(path, pages)
+
+            with open(path, "rb") as f:
+                content = f.read()
+            start = time.perf_counter()
+            response = await client.post("/api/upload", files={"file": (os.path.basename(path), content, "application/pdf")})
+            elapsed = time.perf_counter() - start
+            response.raise_for_status()
+            chunks = response.json()["chunks_count"]
+            corpus_chunks += chunks
+
+            ingest_rows.append({
+                "scenario": "ingest",
+                "name": f"{source}_{pages}p",
+                "pages": pages,
+                "size_mb": len(content) / (1024 * 1024),
+                "chunks": chunks,
+                "seconds": elapsed,
+                "pages_per_sec": pages / elapsed,
+                "chunks_per_sec": chunks / elapsed,
+                "peak_rss_mb": peak_rss_mb()
+            })
+
+            # Listing endpoints against the corpus as it stands now
+            for endpoint, url in (("documents", "/api/documents"), ("chunks", "/api/chunks?limit=100")):
+                durations = await time_requests(client, "GET", url, args.listing_repeats)
+                listing_rows.append({
+                    "scenario": "listing",
+                    "name": f"{endpoint}@{len(ingest_rows)}docs",
+                    "documents": len(ingest_rows),
+                    "corpus_chunks": corpus_chunks,
+                    **percentiles(durations),
+                    "peak_rss_mb": peak_rss_mb()
+                })
+
+    return ingest_rows, listing_rows
+
+
+async def run_chat(client: httpx.AsyncClient, args) -> list:
+    rows = []
+    for concurrency in args.concurrency:
+        async def ask(i: int) -> float:
+            # Distinct sessions and questions so requests do not coalesce
+            question = f"{CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]} (request {i})"
+            start = time.perf_counter()
+            response = await client.post("/api/chat", json={"question": question, "session_id": str(uuid.uuid4())})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        total = max(concurrency, args.chat_requests)
+        durations = []
+        start = time.perf_counter()
+        for offset in range(0, total, concurrency):
+            durations += await asyncio.gather(*(ask(offset + i) for i in range(min(concurrency, total - offset))))
+        elapsed = time.perf_counter() - start
+
+        rows.append({
+            "scenario": "chat",
+            "name": f"concurrency_{concurrency}",
+            "concurrency": concurrency,
+            "requests_per_sec": total / elapsed,
+            **percentiles(durations),
+            "peak_rss_mb": peak_rss_mb()
+        })
+    return rows
+
+
+async def run(args, work_dir: str) -> list:
+    import main
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            ingest_rows, listing_rows = await run_ingest_and_listing(client, args, work_dir)
+            chat_rows = await run_chat(client, args)
+    finally:
+        await main.shutdown_event()
+
+    return ingest_rows + listing_rows + chat_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 50], help="Document sizes in pages")
+    parser.add_argument("--table-ratio", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--chat-requests", type=int, default=64, help="Chat requests per concurrency level")
+    parser.add_argument("--listing-repeats", type=int, default=20)
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the sentence-transformers model")
+    parser.add_argument("--baseline", default=None, help="Previous e2e results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the temporary Chroma/upload directory")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    # Uploads land in the relative upload directory; run from inside the work dir
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    configure_environment(work_dir, args.stub_latency, args.real_embeddings)
+    try:
+        rows = asyncio.run(run(args, work_dir))
+    finally:
+        os.chdir(previous_cwd)
+        if not args.keep_data:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table([row for row in rows if row["scenario"] == "ingest"],
+                ["name", "pages", "chunks", "seconds", "pages_per_sec", "chunks_per_sec", "peak_rss_mb"])
+    print()
+    print_table([row for row in rows if row["scenario"] == "listing"],
+                ["name", "corpus_chunks", "p50_ms", "p99_ms", "peak_rss_mb"])
+    print()
+    print_table([row for row in rows if row["scenario"] == "chat"],
+                ["name", "requests_per_sec", "p50_ms", "p90_ms", "p99_ms", "peak_rss_mb"])
+    write_results("e2e", rows, args.output)
+
+    if args.baseline:
+        changes = compare_results(
+            rows,
+            load_results(args.baseline),
+            keys=["scenario", "name"],
+            lower_is_better=["seconds", "p50_ms", "p99_ms", "peak_rss_mb"],
+            higher_is_better=["pages_per_sec", "requests_per_sec"],
+            tolerance=args.tolerance
+        )
+        print()
+        if changes:
+            print_table(changes, ["scenario", "name", "metric", "baseline", "current", "change_pct", "status"])
+        else:
+            print(f"No changes beyond {args.tolerance:.0%} against {args.baseline}")
+        if args.fail_on_regression and any(change["status"] == "regression" for change in changes):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Per-row cost of the vectorized metrics engine versus one call per row.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_financial_metrics [--rows 1 10 100 1000 10000] [--repeat 5]
+"""
+from benchmarks.common import print_table, write_results
+import argparse
+import random
+import time
+
+from services.financial_metrics import FinancialMetricsEngine, INPUT_COLUMNS
+
+
+def make_columns(rows: int, seed: int = 1):
+    rng = random.Random(seed)
+    return {column: [rng.uniform(1e5, 1e9) for _ in range(rows)] for column in INPUT_COLUMNS}
+
+
+def best_of(repeat: int, fn) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--entities", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    engine = FinancialMetricsEngine()
+    results = []
+
+    for rows in args.rows:
+        columns = make_columns(rows)
+        entities = [f"company_{i % args.entities}" for i in range(rows)]
+        periods = [str(2000 + i // args.entities) for i in range(rows)]
+
+        batch_seconds = best_of(args.repeat, lambda: engine.calculate(columns, periods, entities))
+
+        def one_at_a_time():
+            for i in range(rows):
+                engine.calculate_single({column: values[i] for column, values in columns.items()})
+
+        single_seconds = best_of(args.repeat, one_at_a_time)
+
+        results.append({
+            "rows": rows,
+            "batch_ms": batch_seconds * 1000,
+            "batch_us_per_row": batch_seconds / rows * 1e6,
+            "single_us_per_row": single_seconds / rows * 1e6,
+            "speedup": single_seconds / batch_seconds if batch_seconds else 0.0
+        })
+
+    print_table(results, ["rows", "batch_ms", "batch_us_per_row", "single_us_per_row", "speedup"])
+    write_results("financial_metrics", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
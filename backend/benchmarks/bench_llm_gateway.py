@@ -0,0 +1,109 @@
+"""Load check for the LLM gateway against a flaky stub model.
+
+Sends a burst of batch requests followed by interactive ones through
+LLMGateway while the stub model rejects a fraction of calls with
+ResourceExhausted (HTTP 429), and reports per-lane latency, retries and
+failures. Interactive requests should overtake the queued batch backlog.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_llm_gateway [--batch 40] [--interactive 10] [--error-rate 0.2]
+"""
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.stubs import StubGenerativeModel
+import argparse
+import asyncio
+import random
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+from services.llm_gateway import LLMGateway, LLMUnavailableError, Priority
+
+
+class FlakyGenerativeModel(StubGenerativeModel):
+    """Stub model that fails a share of calls the way a rate-limited API does"""
+
+    def __init__(self, error_rate: float, seed: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.error_rate = error_rate
+        self.rejections = 0
+        self._random = random.Random(seed)
+
+    def generate_content(self, prompt: str, *args, **kwargs):
+        with self._lock:
+            reject = self._random.random() < self.error_rate
+            if reject:
+                self.rejections += 1
+        if reject:
+            raise google_exceptions.ResourceExhausted("Quota exceeded")
+        return super().generate_content(prompt, *args, **kwargs)
+
+
+async def call(gateway: LLMGateway, prompt: str, priority: Priority):
+    start = time.perf_counter()
+    try:
+        await gateway.generate(prompt, priority=priority)
+        ok = True
+    except LLMUnavailableError:
+        ok = False
+    return priority, time.perf_counter() - start, ok
+
+
+async def run(args) -> list:
+    model = FlakyGenerativeModel(args.error_rate, latency=args.latency)
+    gateway = LLMGateway(
+        model,
+        requests_per_minute=args.rpm,
+        max_concurrency=args.concurrency,
+        retry_base_delay=0.05,
+        retry_max_delay=1.0
+    )
+
+    tasks = [
+        asyncio.ensure_future(call(gateway, f"batch prompt {i}", Priority.BATCH))
+        for i in range(args.batch)
+    ]
+    # Interactive traffic arrives once the batch backlog is queued
+    await asyncio.sleep(0.01)
+    tasks += [
+        asyncio.ensure_future(call(gateway, f"interactive prompt {i}", Priority.INTERACTIVE))
+        for i in range(args.interactive)
+    ]
+    outcomes = await asyncio.gather(*tasks)
+    stats = gateway.get_stats()
+
+    rows = []
+    for priority in Priority:
+        lane = [outcome for outcome in outcomes if outcome[0] == priority]
+        rows.append({
+            "lane": priority.name.lower(),
+            "requests": len(lane),
+            "failed": sum(1 for _, _, ok in lane if not ok),
+            "avg_queue_wait_ms": stats["lanes"][priority.name.lower()]["avg_wait_seconds"] * 1000,
+            **percentiles([duration for _, duration, _ in lane])
+        })
+    for row in rows:
+        row["model_calls"] = model.calls + model.rejections
+        row["rejections"] = model.rejections
+        row["retries"] = stats["retries"]
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub model latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=int, default=6000)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    print_table(rows, ["lane", "requests", "failed", "avg_queue_wait_ms", "p50_ms", "p99_ms", "retries", "rejections"])
+    write_results("llm_gateway", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Per-page extraction time for each PDF extractor backend.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pdf_extractors [--pages 10 50] [--repeat 3]
+"""
+from benchmarks.common import SAMPLE_PDF_PATH, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import os
+import tempfile
+import time
+
+from services.pdf_extractors import EXTRACTORS, get_extractor
+
+
+def bench_file(file_path: str, label: str, repeat: int):
+    rows = []
+    for backend in EXTRACTORS:
+        extractor = get_extractor(backend)
+        durations = []
+        pages = 0
+        tables = 0
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages_content = extractor.extract(file_path)
+            durations.append(time.perf_counter() - start)
+            pages = len(pages_content)
+            tables = sum(len(page.get("tables", [])) for page in pages_content)
+
+        best = min(durations)
+        rows.append({
+            "document": label,
+            "backend": backend,
+            "pages": pages,
+            "tables": tables,
+            "total_s": best,
+            "ms_per_page": best / pages * 1000 if pages else 0.0
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--table-ratio", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pages in args.pages:
+            path = make_synthetic_pdf(os.path.join(tmp_dir, f"synthetic_{pages}.pdf"), pages, args.table_ratio)
+            rows.extend(bench_file(path, f"synthetic_{pages}p", args.repeat))
+
+    if os.path.exists(SAMPLE_PDF_PATH):
+        rows.extend(bench_file(SAMPLE_PDF_PATH, "sample.pdf", args.repeat))
+
+    print_table(rows, ["document", "backend", "pages", "tables", "total_s", "ms_per_page"])
+    write_results("pdf_extractors", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
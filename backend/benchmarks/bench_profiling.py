@@ -0,0 +1,147 @@
+"""Overhead of the profiling hooks on chat and upload latency.
+
+Runs the app in-process (stub LLM and embeddings, see bench_e2e) and repeats the
+same chat load and uploads with profiling off, with the continuous stack sampler
+at one or more intervals, and with every request carrying X-Profile (cProfile).
+Reports throughput, latency percentiles and the overhead relative to the run
+with profiling off.
+
+Per-request cProfile is one request at a time, so with --concurrency above 1 most
+requests in that mode are passed through unprofiled; the "profiled" column shows
+how many were actually captured.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_profiling [--chat-requests 200] [--concurrency 8] [--intervals 0.02 0.005]
+"""
+from benchmarks.bench_e2e import CHAT_QUESTIONS, configure_environment
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import httpx
+
+
+async def run_chat_load(client: httpx.AsyncClient, args, headers: dict) -> dict:
+    async def ask(i: int) -> float:
+        question = f"{CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]} (request {i})"
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={"question": question, "session_id": str(uuid.uuid4())}, headers=headers)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    durations = []
+    start = time.perf_counter()
+    for offset in range(0, args.chat_requests, args.concurrency):
+        batch = min(args.concurrency, args.chat_requests - offset)
+        durations += await asyncio.gather(*(ask(offset + i) for i in range(batch)))
+    elapsed = time.perf_counter() - start
+    return {"requests_per_sec": args.chat_requests / elapsed, **percentiles(durations)}
+
+
+async def run_uploads(client: httpx.AsyncClient, args, pdf_bytes: bytes, headers: dict) -> dict:
+    durations = []
+    for i in range(args.uploads):
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/upload",
+            files={"file": (f"profiled_{i}.pdf", pdf_bytes, "application/pdf")},
+            headers=headers
+        )
+        response.raise_for_status()
+        durations.append(time.perf_counter() - start)
+    return {"requests_per_sec": args.uploads / sum(durations), **percentiles(durations)}
+
+
+async def run(args, work_dir: str) -> list:
+    import main
+    from config import settings
+
+    path = make_synthetic_pdf(os.path.join(work_dir, "profiled.pdf"), args.pages)
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+
+    settings.profiling_enabled = True
+    settings.profiling_token = ""
+    modes = [("off", None, {})]
+    modes += [(f"sampler_{interval * 1000:g}ms", interval, {}) for interval in args.intervals]
+    modes += [("cprofile_per_request", None, {"X-Profile": "1"})]
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    rows = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up so the first mode does not pay for lazy initialisation
+            await run_uploads(client, argparse.Namespace(uploads=1), pdf_bytes, {})
+            await run_chat_load(client, argparse.Namespace(chat_requests=args.concurrency, concurrency=args.concurrency), {})
+
+            for mode, interval, headers in modes:
+                if interval is not None:
+                    main.stack_sampler.interval = interval
+                    main.stack_sampler.reset()
+                    main.stack_sampler.start()
+                captured_before = main.request_profiles.stats["captured"]
+                samples_before = main.stack_sampler.stats["samples"]
+                seconds_before = main.stack_sampler.stats["sample_seconds_total"]
+
+                results = {
+                    "chat": await run_chat_load(client, args, headers),
+                    "upload": await run_uploads(client, args, pdf_bytes, headers)
+                }
+
+                main.stack_sampler.stop()
+                samples = main.stack_sampler.stats["samples"] - samples_before
+                sample_seconds = main.stack_sampler.stats["sample_seconds_total"] - seconds_before
+                for scenario, result in results.items():
+                    rows.append({
+                        "mode": mode,
+                        "scenario": scenario,
+                        "profiled": main.request_profiles.stats["captured"] - captured_before if headers else 0,
+                        "avg_sample_ms": sample_seconds / samples * 1000 if samples else 0.0,
+                        **result
+                    })
+    finally:
+        await main.shutdown_event()
+
+    baseline = {row["scenario"]: row for row in rows if row["mode"] == "off"}
+    for row in rows:
+        base = baseline[row["scenario"]]
+        row["p50_overhead_pct"] = (row["p50_ms"] / base["p50_ms"] - 1) * 100
+        row["throughput_overhead_pct"] = (base["requests_per_sec"] / row["requests_per_sec"] - 1) * 100
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chat-requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--uploads", type=int, default=3, help="Sequential uploads per mode")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per uploaded PDF")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.02, 0.005], help="Sampler intervals in seconds")
+    parser.add_argument("--stub-latency", type=float, default=0.02, help="Stub LLM latency in seconds")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_profiling_")
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    configure_environment(work_dir, args.stub_latency, real_embeddings=False)
+    try:
+        rows = asyncio.run(run(args, work_dir))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(rows, ["mode", "scenario", "profiled", "requests_per_sec", "p50_ms", "p99_ms",
+                       "p50_overhead_pct", "throughput_overhead_pct", "avg_sample_ms"])
+    write_results("profiling", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
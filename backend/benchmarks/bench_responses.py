@@ -0,0 +1,151 @@
+"""Payload size and latency of the large JSON read endpoints.
+
+Two parts:
+
+  serialize  encoding a ChunksResponse of N synthetic chunks: validated models through
+             jsonable_encoder + json (the previous path) vs. model_construct + orjson
+  endpoints  /api/chunks, /api/documents and /api/highlight-chunks served in-process
+             (stub LLM and embeddings, see bench_e2e) with identity, gzip and zstd
+             Accept-Encoding; bytes on the wire and latency per request
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_responses [--chunks 5000] [--pages 200] [--repeats 20]
+"""
+from benchmarks.bench_e2e import configure_environment
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import httpx
+import orjson
+
+ENCODINGS = ["identity", "gzip", "zstd"]
+
+
+def make_chunk_payloads(count: int) -> list:
+    text = "Revenue increased by 12% driven by higher volumes in the domestic segment. " * 12
+    return [
+        {
+            "id": f"doc:{i // 20}:{i % 20}",
+            "content": text,
+            "page": i // 20,
+            "metadata": {
+                "document_id": "doc", "filename": "report.pdf", "page": i // 20,
+                "chunk_index": i % 20, "chunk_type": "text", "page_hash": "0123456789abcdef",
+                "upload_date": "2024-01-01T00:00:00"
+            }
+        }
+        for i in range(count)
+    ]
+
+
+def run_serialize(count: int, repeats: int) -> list:
+    from fastapi.encoders import jsonable_encoder
+    from models.schemas import ChunkInfo, ChunksResponse
+
+    payloads = make_chunk_payloads(count)
+
+    def validated_json() -> bytes:
+        response = ChunksResponse(chunks=[ChunkInfo(**chunk) for chunk in payloads], total_count=count)
+        return json.dumps(jsonable_encoder(response)).encode("utf-8")
+
+    def constructed_orjson() -> bytes:
+        chunks = [ChunkInfo.model_construct(**chunk) for chunk in payloads]
+        return orjson.dumps(ChunksResponse.model_construct(chunks=chunks, total_count=count).model_dump())
+
+    rows = []
+    for name, fn in (("validated+json", validated_json), ("construct+orjson", constructed_orjson)):
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            body = fn()
+            durations.append(time.perf_counter() - start)
+        rows.append({
+            "scenario": "serialize",
+            "name": name,
+            "chunks": count,
+            "bytes": len(body),
+            **percentiles(durations)
+        })
+    return rows
+
+
+async def run_endpoints(args, work_dir: str) -> list:
+    import main
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    rows = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            path = make_synthetic_pdf(os.path.join(work_dir, "corpus.pdf"), args.pages)
+            with open(path, "rb") as f:
+                response = await client.post("/api/upload", files={"file": ("corpus.pdf", f.read(), "application/pdf")})
+            response.raise_for_status()
+            document_id = (await client.get("/api/documents")).json()["documents"][0]["id"]
+
+            requests = [
+                ("chunks", "GET", "/api/chunks", {"params": {"limit": args.limit}}),
+                ("documents", "GET", "/api/documents", {}),
+                ("highlight", "POST", "/api/highlight-chunks",
+                 {"json": {"query": "revenue growth borrowings", "document_id": document_id}}),
+            ]
+            for name, method, url, kwargs in requests:
+                for encoding in ENCODINGS:
+                    durations, wire_bytes, body_bytes, served = [], 0, 0, None
+                    for _ in range(args.repeats):
+                        start = time.perf_counter()
+                        response = await client.request(method, url, headers={"Accept-Encoding": encoding}, **kwargs)
+                        response.raise_for_status()
+                        durations.append(time.perf_counter() - start)
+                        wire_bytes = response.num_bytes_downloaded
+                        body_bytes = len(response.content)
+                        served = response.headers.get("content-encoding", "identity")
+                    rows.append({
+                        "scenario": "endpoint",
+                        "name": f"{name}:{encoding}",
+                        "content_encoding": served,
+                        "wire_bytes": wire_bytes,
+                        "body_bytes": body_bytes,
+                        **percentiles(durations)
+                    })
+    finally:
+        await main.shutdown_event()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks in the serialization test")
+    parser.add_argument("--pages", type=int, default=200, help="Pages of the ingested corpus")
+    parser.add_argument("--limit", type=int, default=1000, help="limit for /api/chunks")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_responses_")
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    configure_environment(work_dir, stub_latency=0.0, real_embeddings=False)
+    try:
+        rows = run_serialize(args.chunks, args.repeats)
+        rows += asyncio.run(run_endpoints(args, work_dir))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table([row for row in rows if row["scenario"] == "serialize"], ["name", "chunks", "bytes", "p50_ms", "p99_ms"])
+    print()
+    print_table([row for row in rows if row["scenario"] == "endpoint"],
+                ["name", "content_encoding", "wire_bytes", "body_bytes", "p50_ms", "p99_ms"])
+    write_results("responses", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
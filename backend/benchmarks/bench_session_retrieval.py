@@ -0,0 +1,117 @@
+"""Retrieval reuse across the turns of a chat session.
+
+Ingests a synthetic report into the in-process app (see bench_e2e), then plays
+scripted multi-turn conversations with follow-ups twice: with session retrieval
+state disabled and enabled. Reports per-turn chat latency, how often the vector
+search was skipped or narrowed, and the search time saved.
+
+Hash-based stub embeddings make every pair of distinct queries unrelated, so reuse
+only shows up meaningfully with --real-embeddings.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_session_retrieval [--sessions 20] [--pages 60] [--real-embeddings]
+"""
+from benchmarks.bench_e2e import configure_environment
+from benchmarks.common import percentiles, print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import httpx
+
+CONVERSATIONS = [
+    ["What was total revenue in 2023?", "and the previous year?", "what about net income?", "and in 2021?"],
+    ["How did operating expenses change in 2023?", "Why did they increase?", "and the prior year?"],
+    ["Explain the movement in borrowings during 2023.", "what about trade payables?", "and those in 2022?"],
+]
+
+
+async def play(client: httpx.AsyncClient, conversation: list) -> list:
+    session_id = str(uuid.uuid4())
+    durations = []
+    for question in conversation:
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={"question": question, "session_id": session_id})
+        response.raise_for_status()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def run(args, work_dir: str) -> list:
+    import main
+    from config import settings
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    rows = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            path = make_synthetic_pdf(os.path.join(work_dir, "report.pdf"), args.pages)
+            with open(path, "rb") as f:
+                response = await client.post("/api/upload", files={"file": ("report.pdf", f.read(), "application/pdf")})
+            response.raise_for_status()
+
+            for enabled in (False, True):
+                settings.session_retrieval_enabled = enabled
+                before = dict(main.rag_pipeline.get_stats())
+                first_turns, follow_ups = [], []
+                for i in range(args.sessions):
+                    durations = await play(client, CONVERSATIONS[i % len(CONVERSATIONS)])
+                    first_turns.append(durations[0])
+                    follow_ups.extend(durations[1:])
+                after = main.rag_pipeline.get_stats()
+
+                retrievals = after["retrievals"] - before["retrievals"]
+                skipped = after["retrieval_skipped"] - before["retrieval_skipped"]
+                rows.append({
+                    "mode": "session_state" if enabled else "fresh_retrieval",
+                    "sessions": args.sessions,
+                    "retrievals": retrievals,
+                    "skipped": skipped,
+                    "narrowed": after["retrieval_narrowed"] - before["retrieval_narrowed"],
+                    "condensed": after["follow_ups_condensed"] - before["follow_ups_condensed"],
+                    "skip_rate": skipped / retrievals if retrievals else 0.0,
+                    "seconds_saved": after["retrieval_seconds_saved"] - before["retrieval_seconds_saved"],
+                    "first_turn_p50_ms": percentiles(first_turns)["p50_ms"],
+                    **{f"follow_up_{key}": value for key, value in percentiles(follow_ups).items()}
+                })
+    finally:
+        await main.shutdown_event()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Stub LLM latency in seconds")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the sentence-transformers model")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_session_")
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    # Keep the facts fast path out of the way so every turn reaches retrieval
+    os.environ["FACTS_FAST_PATH_ENABLED"] = "False"
+    configure_environment(work_dir, args.stub_latency, args.real_embeddings)
+    try:
+        rows = asyncio.run(run(args, work_dir))
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(rows, [
+        "mode", "retrievals", "skipped", "narrowed", "condensed", "skip_rate",
+        "seconds_saved", "first_turn_p50_ms", "follow_up_p50_ms", "follow_up_p99_ms"
+    ])
+    write_results("session_retrieval", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
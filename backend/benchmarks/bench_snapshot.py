@@ -0,0 +1,119 @@
+"""Replica warm-up: snapshot restore vs. full re-ingest.
+
+Builds a synthetic PDF corpus, ingests it with the bulk ingestor into one Chroma
+directory, exports a snapshot, then restores it into a fresh directory. Reports
+the time of each step, the snapshot size, and checks that the restored store holds
+the same chunks and answers queries identically.
+
+With the default stub embeddings the re-ingest time understates production,
+where embedding dominates; use --real-embeddings for representative numbers.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_snapshot [--documents 20] [--pages 30] [--real-embeddings]
+"""
+from benchmarks.bench_e2e import configure_environment
+from benchmarks.common import print_table, write_results
+from benchmarks.synthetic import make_synthetic_pdf
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+PROBE_QUERIES = [
+    "total revenue for the year",
+    "borrowings measured at amortised cost",
+    "foreign currency risk exposure",
+]
+
+
+def directory_bytes(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def run(args, work_dir: str) -> list:
+    from bulk_ingest import BulkIngestor, Checkpoint
+    from services.facts_store import FactsStore
+    from services.vector_store import VectorStoreService
+    from snapshot import export_snapshot, import_snapshot
+
+    corpus_dir = os.path.join(work_dir, "corpus")
+    os.makedirs(corpus_dir)
+    for i in range(args.documents):
+        make_synthetic_pdf(os.path.join(corpus_dir, f"report_{i}.pdf"), args.pages, seed=i)
+
+    # Source replica: full ingest
+    source = VectorStoreService(persist_directory=os.path.join(work_dir, "chroma_source"))
+    asyncio.run(source.initialize())
+    source_facts = FactsStore(os.path.join(work_dir, "facts_source.db"))
+    ingestor = BulkIngestor(
+        source,
+        Checkpoint(os.path.join(work_dir, "checkpoint.json"), restart=True),
+        workers=args.workers,
+        embed_batch_size=256,
+        write_batch_size=5000,
+        facts_store=source_facts
+    )
+    start = time.perf_counter()
+    ingest_stats = ingestor.run(corpus_dir)
+    ingest_seconds = time.perf_counter() - start
+
+    snapshot_dir = os.path.join(work_dir, "snapshot")
+    start = time.perf_counter()
+    manifest = export_snapshot(source, snapshot_dir, source_facts)
+    export_seconds = time.perf_counter() - start
+
+    # New replica: restore from the snapshot
+    replica = VectorStoreService(persist_directory=os.path.join(work_dir, "chroma_replica"))
+    asyncio.run(replica.initialize())
+    replica_facts = FactsStore(os.path.join(work_dir, "facts_replica.db"))
+    start = time.perf_counter()
+    import_stats = import_snapshot(replica, snapshot_dir, replica_facts)
+    import_seconds = time.perf_counter() - start
+
+    assert replica.get_document_count() == source.get_document_count(), "restored chunk count differs"
+    assert replica_facts.count() == source_facts.count(), "restored facts count differs"
+    for query in PROBE_QUERIES:
+        source_ids = [doc.id for doc, _, _ in source.search_by_embedding(source.embed_query(query), k=5)]
+        replica_ids = [doc.id for doc, _, _ in replica.search_by_embedding(replica.embed_query(query), k=5)]
+        assert source_ids == replica_ids, f"query results differ for {query!r}"
+
+    chunks = manifest["count"]
+    return [
+        {"step": "full_reingest", "chunks": chunks, "seconds": ingest_seconds,
+         "chunks_per_sec": chunks / ingest_seconds, "pages": ingest_stats["pages"]},
+        {"step": "snapshot_export", "chunks": chunks, "seconds": export_seconds,
+         "chunks_per_sec": chunks / export_seconds, "snapshot_mb": directory_bytes(snapshot_dir) / (1024 * 1024)},
+        {"step": "snapshot_restore", "chunks": import_stats["imported"], "seconds": import_seconds,
+         "chunks_per_sec": import_stats["imported"] / import_seconds,
+         "speedup_vs_reingest": ingest_seconds / import_seconds}
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=30, help="Pages per document")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the sentence-transformers model")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_snapshot_")
+    configure_environment(work_dir, stub_latency=0.0, real_embeddings=args.real_embeddings)
+    try:
+        rows = run(args, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(rows, ["step", "chunks", "seconds", "chunks_per_sec", "snapshot_mb", "speedup_vs_reingest"])
+    write_results("snapshot", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
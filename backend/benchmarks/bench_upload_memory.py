@@ -0,0 +1,110 @@
+"""Peak memory of concurrent uploads: spooled form parsing vs. streaming the multipart body to disk.
+
+Every strategy is served by an ASGI route and receives a real multipart request, so the
+numbers include body parsing, not just the copy to disk.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_upload_memory [--uploads 10] [--size-mb 50]
+"""
+from benchmarks.common import print_table, write_results
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from services.upload_storage import save_multipart_upload
+
+
+def build_app(tmp_dir: str, max_size: int, chunk_size: int) -> Starlette:
+    counter = iter(range(1_000_000))
+
+    def destination(name: str) -> str:
+        return os.path.join(tmp_dir, f"{name}_{next(counter)}.pdf")
+
+    async def spooled_read(request):
+        """The original path: Starlette spools the form, then the whole file is read back"""
+        form = await request.form()
+        content = await form["file"].read()
+        if len(content) > max_size:
+            return JSONResponse({"detail": "File is too large"}, status_code=413)
+        with open(destination("spooled_read"), "wb") as buffer:
+            buffer.write(content)
+        return JSONResponse({"size": len(content)})
+
+    async def spooled_copy(request):
+        """Chunked copy of the spooled form file: bounded memory, but every byte is written twice"""
+        form = await request.form()
+        upload = form["file"]
+        total_size = 0
+        with open(destination("spooled_copy"), "wb") as buffer:
+            while chunk := await upload.read(chunk_size):
+                total_size += len(chunk)
+                buffer.write(chunk)
+        return JSONResponse({"size": total_size})
+
+    async def streaming(request):
+        _, _, size, _ = await save_multipart_upload(request, "file", lambda _: destination("streaming"), max_size)
+        return JSONResponse({"size": size})
+
+    return Starlette(routes=[
+        Route(f"/{handler.__name__}", handler, methods=["POST"])
+        for handler in (spooled_read, spooled_copy, streaming)
+    ])
+
+
+async def run_concurrent(strategy: str, app: Starlette, source_path: str, uploads: int):
+    handles = [open(source_path, "rb") for _ in range(uploads)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            responses = await asyncio.gather(*(
+                client.post(f"/{strategy}", files={"file": ("report.pdf", handle, "application/pdf")})
+                for handle in handles
+            ))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        for handle in handles:
+            handle.close()
+
+    for response in responses:
+        response.raise_for_status()
+    return {"strategy": strategy, "uploads": uploads, "elapsed_s": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_path = os.path.join(tmp_dir, "source.pdf")
+        with open(source_path, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        app = build_app(tmp_dir, size, args.chunk_kb * 1024)
+        for strategy in ("spooled_read", "spooled_copy", "streaming"):
+            rows.append(asyncio.run(run_concurrent(strategy, app, source_path, args.uploads)))
+
+    print_table(rows, ["strategy", "uploads", "elapsed_s", "peak_mb"])
+    write_results("upload_memory", rows, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Allow running benchmarks as `python -m benchmarks.<name>` from the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE_PDF_PATH = os.path.join(BACKEND_DIR, "..", "data", "sample.pdf")
+
+
+@contextmanager
+def timer(results: Dict[str, float], key: str):
+    """Record the wall-clock duration of the block in seconds under results[key]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = time.perf_counter() - start
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as milliseconds"""
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]) -> None:
+    """Print benchmark rows as an aligned text table"""
+    def fmt(value: Any) -> str:
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    widths = {col: max(len(col), *(len(fmt(row.get(col, ""))) for row in rows)) for col in columns}
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(fmt(row.get(col, "")).ljust(widths[col]) for col in columns))
+
+
+def write_results(name: str, results: Any, output_path: str = None) -> str:
+    """Write machine-readable benchmark results as JSON and return the file path"""
+    output_path = output_path or os.path.join(BACKEND_DIR, "benchmarks", "results", f"{name}.json")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    payload = {
+        "benchmark": name,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results
+    }
+    with open(output_path, "w") as f:
+        json.dump(payload, f, indent=2, default=str)
+
+    print(f"Results written to {output_path}")
+    return output_path
+
+
+def load_results(path: str) -> Any:
+    """Read the results section of a JSON file written by write_results"""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare_results(
+    rows: List[Dict[str, Any]],
+    baseline_rows: List[Dict[str, Any]],
+    keys: List[str],
+    lower_is_better: List[str],
+    higher_is_better: List[str] = (),
+    tolerance: float = 0.2
+) -> List[Dict[str, Any]]:
+    """Match rows to a baseline run on keys and report metrics that moved by more than tolerance"""
+    baseline = {tuple(row.get(key) for key in keys): row for row in baseline_rows}
+    changes = []
+    for row in rows:
+        previous = baseline.get(tuple(row.get(key) for key in keys))
+        if previous is None:
+            continue
+        for metric in [*lower_is_better, *higher_is_better]:
+            current_value, baseline_value = row.get(metric), previous.get(metric)
+            if not isinstance(current_value, (int, float)) or not baseline_value:
+                continue
+            change = (current_value - baseline_value) / baseline_value
+            if metric in higher_is_better:
+                change = -change
+            if abs(change) > tolerance:
+                changes.append({
+                    **{key: row.get(key) for key in keys},
+                    "metric": metric,
+                    "baseline": baseline_value,
+                    "current": current_value,
+                    "change_pct": change * 100,
+                    "status": "regression" if change > 0 else "improvement"
+                })
+    return changes
@@ -0,0 +1,59 @@
+from typing import List
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Deterministic stand-in for genai.GenerativeModel with a fixed latency"""
+
+    def __init__(self, model_name: str = "stub", latency: float = 0.2, *args, **kwargs):
+        self.model_name = model_name
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, *args, **kwargs) -> StubResponse:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return StubResponse(f"Stub answer {digest} for a prompt of {len(prompt)} characters.")
+
+
+class StubEmbeddings:
+    """Deterministic hash-seeded unit vectors, for runs without the sentence-transformers model"""
+
+    def __init__(self, dimensions: int = 384, *args, **kwargs):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class StubVectorStore:
+    """Vector store double that returns no documents after a fixed search latency"""
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.searches = 0
+
+    def similarity_search(self, query: str, k: int = None, document_ids=None):
+        self.searches += 1
+        time.sleep(self.latency)
+        return []
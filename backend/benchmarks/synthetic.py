@@ -0,0 +1,79 @@
+from typing import List
+import random
+import fitz  # PyMuPDF
+
+PROSE_SENTENCES = [
+    "The Company continued to invest in its core operations during the period.",
+    "Management believes that liquidity remains sufficient for the next twelve months.",
+    "Revenue growth was driven primarily by higher volumes in the domestic segment.",
+    "Operating expenses increased due to higher personnel and distribution costs.",
+    "The Group's exposure to foreign currency risk is monitored on a regular basis.",
+    "Borrowings are measured at amortised cost using the effective interest method.",
+]
+
+LINE_ITEMS = [
+    "Revenue", "Cost of revenue", "Gross profit", "Selling expenses",
+    "General and administrative expenses", "Operating profit", "Finance income",
+    "Finance costs", "Profit before tax", "Income tax expense", "Net income",
+    "Cash and cash equivalents", "Trade receivables", "Inventories",
+    "Total current assets", "Property, plant and equipment", "Total assets",
+    "Trade payables", "Short-term borrowings", "Total current liabilities",
+    "Long-term borrowings", "Total liabilities", "Share capital",
+    "Retained earnings", "Total equity",
+]
+
+
+def _write_prose_page(doc: "fitz.Document", rng: random.Random, heading: str) -> None:
+    page = doc.new_page()
+    y = 72
+    page.insert_text((72, y), heading.upper(), fontsize=13)
+    y += 28
+    while y < page.rect.height - 72:
+        sentence = " ".join(rng.choice(PROSE_SENTENCES) for _ in range(2))
+        # Wrap roughly at 95 characters per line
+        for start in range(0, len(sentence), 95):
+            page.insert_text((72, y), sentence[start:start + 95], fontsize=9)
+            y += 13
+        y += 6
+
+
+def _write_table_page(doc: "fitz.Document", rng: random.Random, heading: str, years: List[int]) -> None:
+    page = doc.new_page()
+    page.insert_text((72, 60), heading.upper(), fontsize=13)
+
+    # Boundaries of the label column and one column per year
+    col_x = [72, 300, 390, 480, 570]
+    row_height = 18
+    top = 80
+    rows = [["Line item"] + [str(year) for year in years]]
+    for item in LINE_ITEMS:
+        rows.append([item] + [f"{rng.randint(1000, 9_999_999):,}" for _ in years])
+
+    # Ruled grid so layout-aware extractors can detect the table
+    bottom = top + row_height * len(rows)
+    for i in range(len(rows) + 1):
+        page.draw_line((col_x[0], top + i * row_height), (col_x[-1], top + i * row_height), width=0.5)
+    for x in col_x:
+        page.draw_line((x, top), (x, bottom), width=0.5)
+
+    for r, row in enumerate(rows):
+        y = top + r * row_height + 13
+        for c, cell in enumerate(row):
+            page.insert_text((col_x[c] + 4, y), cell, fontsize=9)
+
+
+def make_synthetic_pdf(path: str, pages: int, table_ratio: float = 0.3, seed: int = 42) -> str:
+    """Write a financial-report-like PDF mixing prose pages and ruled statement tables"""
+    rng = random.Random(seed)
+    years = [2023, 2022, 2021]
+    doc = fitz.open()
+
+    for page_idx in range(pages):
+        if rng.random() < table_ratio:
+            _write_table_page(doc, rng, f"Consolidated statement {page_idx + 1}", years)
+        else:
+            _write_prose_page(doc, rng, f"Note {page_idx + 1}")
+
+    doc.save(path)
+    doc.close()
+    return path
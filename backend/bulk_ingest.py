@@ -0,0 +1,359 @@
+"""Offline bulk ingestion of a directory of PDFs into the vector store.
+
+Usage (from the backend directory):
+    python bulk_ingest.py [DIRECTORY] [--workers N] [--checkpoint FILE] [--restart]
+
+Extraction and chunking run in a process pool; embeddings are batched across
+files and written to Chroma in large batches. Completed files are recorded in a
+checkpoint so an interrupted run resumes where it stopped. A file whose content
+changed since it was ingested replaces the chunks and facts of its old version.
+
+The CLI opens the Chroma directory itself and refuses to run while the API
+server holds it: a compaction in the server would swap collections under the
+run and its writes would be dropped with the retired collection.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Deque, List, Dict, Any, Optional, Set
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_worker_processor = None
+# A file in flight when a worker dies (e.g. OOM-killed) is retried once in a fresh pool
+MAX_EXTRACT_ATTEMPTS = 2
+
+
+def _hash_file(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def document_id_for(content_hash: str) -> str:
+    """Same content always maps to the same document id, so re-runs upsert in place"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"sha256:{content_hash}"))
+
+
+def _extract_file(file_path: str) -> Dict[str, Any]:
+    """Worker: extract and chunk one PDF; returns plain data so it pickles cheaply"""
+    global _worker_processor
+    if _worker_processor is None:
+        from services.pdf_processor import PDFProcessor
+        _worker_processor = PDFProcessor()
+
+    try:
+        content_hash = _hash_file(file_path)
+        document_id = document_id_for(content_hash)
+        filename = os.path.basename(file_path)
+
+        pages_content = _worker_processor.extract_text_from_pdf(file_path)
+        documents = _worker_processor.split_into_chunks(pages_content, filename, document_id)
+
+        chunks = []
+        for doc in documents:
+            doc.metadata.update({
+                "document_id": document_id,
+                "content_hash": content_hash,
+                "source_path": file_path
+            })
+            chunks.append((doc.metadata["chunk_id"], doc.page_content, doc.metadata))
+
+        return {
+            "path": file_path,
+            "document_id": document_id,
+            "content_hash": content_hash,
+            "pages": len(pages_content),
+            "chunks": chunks,
+            "facts": _worker_processor.extract_facts(pages_content)
+        }
+    except Exception as e:
+        return {"path": file_path, "error": str(e)}
+
+
+class Checkpoint:
+    """JSON record of completed and failed files, written atomically after every flush"""
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.data = {"completed": {}, "failed": {}}
+        if not restart and os.path.exists(path):
+            with open(path, "r") as f:
+                self.data = json.load(f)
+
+    @staticmethod
+    def _file_key(file_path: str) -> Dict[str, Any]:
+        stat = os.stat(file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_done(self, file_path: str) -> bool:
+        entry = self.data["completed"].get(file_path)
+        if not entry:
+            return False
+        key = self._file_key(file_path)
+        return entry["size"] == key["size"] and entry["mtime"] == key["mtime"]
+
+    def mark_completed(self, result: Dict[str, Any]) -> None:
+        self.data["completed"][result["path"]] = {
+            **self._file_key(result["path"]),
+            "document_id": result["document_id"],
+            "content_hash": result["content_hash"],
+            "pages": result["pages"],
+            "chunks": len(result["chunks"]),
+            "completed_at": datetime.now().isoformat()
+        }
+        self.data["failed"].pop(result["path"], None)
+
+    def mark_failed(self, file_path: str, error: str) -> None:
+        self.data["failed"][file_path] = error
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class BulkIngestor:
+    def __init__(
+        self, 
+        vector_store, 
+        checkpoint: Checkpoint, 
+        workers: int, 
+        embed_batch_size: int, 
+        write_batch_size: int,
+        facts_store=None
+    ):
+        self.vector_store = vector_store
+        self.facts_store = facts_store
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+
+        self.pending_files: List[Dict[str, Any]] = []
+        self.pending_chunks = 0
+        self.stats = {
+            "files_total": 0, "files_skipped": 0, "files_ingested": 0, "files_failed": 0,
+            "documents_replaced": 0, "pages": 0, "chunks": 0, "embed_seconds": 0.0, "write_seconds": 0.0
+        }
+
+    @staticmethod
+    def find_pdfs(directory: str) -> List[str]:
+        pdf_paths = []
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith(".pdf"):
+                    pdf_paths.append(os.path.abspath(os.path.join(root, name)))
+        return sorted(pdf_paths)
+
+    def run(self, directory: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+
+        pdf_paths = self.find_pdfs(directory)
+        todo = [path for path in pdf_paths if not self.checkpoint.is_done(path)]
+        self.stats["files_total"] = len(pdf_paths)
+        self.stats["files_skipped"] = len(pdf_paths) - len(todo)
+        logger.info(f"Found {len(pdf_paths)} PDFs, {len(todo)} to ingest with {self.workers} workers")
+
+        pending = deque(todo)
+        attempts: Dict[str, int] = {}
+        while pending:
+            # Returns early when a worker dies; the next pass starts a fresh pool
+            self._extract_with_pool(pending, attempts)
+        self._flush()
+
+        elapsed = time.perf_counter() - start
+        self.stats.update({
+            "elapsed_seconds": elapsed,
+            "pages_per_second": self.stats["pages"] / elapsed if elapsed else 0.0,
+            "chunks_per_second": self.stats["chunks"] / elapsed if elapsed else 0.0,
+            "files_per_second": self.stats["files_ingested"] / elapsed if elapsed else 0.0
+        })
+        return self.stats
+
+    def _extract_with_pool(self, pending: Deque[str], attempts: Dict[str, int]) -> None:
+        # Keep a bounded number of files in flight so results do not pile up in memory
+        max_in_flight = self.workers * 2
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            in_flight = {}
+            broken = False
+
+            while True:
+                while pending and not broken and len(in_flight) < max_in_flight:
+                    path = pending.popleft()
+                    try:
+                        in_flight[executor.submit(_extract_file, path)] = path
+                    except BrokenProcessPool:
+                        pending.appendleft(path)
+                        broken = True
+                if not in_flight:
+                    return
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        self._worker_died(path, pending, attempts, e)
+                        continue
+                    self._collect(result)
+
+                if self.pending_chunks >= self.write_batch_size:
+                    self._flush()
+
+    def _worker_died(self, path: str, pending: Deque[str], attempts: Dict[str, int], error: Exception) -> None:
+        """A worker process died with path in flight: retry it in a new pool, or record it as failed"""
+        attempts[path] = attempts.get(path, 0) + 1
+        if attempts[path] < MAX_EXTRACT_ATTEMPTS:
+            logger.warning(f"Worker died while extracting {path}, retrying: {str(error)}")
+            pending.append(path)
+            return
+        self._collect({"path": path, "error": f"Worker process died: {str(error) or type(error).__name__}"})
+
+    def _stale_document_ids(self, result: Dict[str, Any]) -> Set[str]:
+        """Ids this file was ingested under before its content changed, unless another file still has them"""
+        stale_ids = self.vector_store.get_document_ids_by_source(result["path"])
+        previous = self.checkpoint.data["completed"].get(result["path"])
+        if previous:
+            stale_ids.add(previous["document_id"])
+        stale_ids.discard(result["document_id"])
+        in_use = {
+            entry["document_id"] for path, entry in self.checkpoint.data["completed"].items()
+            if path != result["path"]
+        }
+        in_use.update(pending["document_id"] for pending in self.pending_files)
+        return stale_ids - in_use
+
+    def _collect(self, result: Dict[str, Any]) -> None:
+        if "error" in result:
+            logger.error(f"Failed to extract {result['path']}: {result['error']}")
+            self.stats["files_failed"] += 1
+            self.checkpoint.mark_failed(result["path"], result["error"])
+            return
+
+        self.pending_files.append(result)
+        self.pending_chunks += len(result["chunks"])
+
+    def _flush(self) -> None:
+        """Embed and write every buffered chunk, then checkpoint the files they came from"""
+        if not self.pending_files:
+            self.checkpoint.save()
+            return
+
+        ids, texts, metadatas = [], [], []
+        for result in self.pending_files:
+            for chunk_id, text, metadata in result["chunks"]:
+                ids.append(chunk_id)
+                texts.append(text)
+                metadatas.append(metadata)
+
+        if ids:
+            embed_start = time.perf_counter()
+            embeddings = self.vector_store.embed_texts(texts, batch_size=self.embed_batch_size)
+            self.stats["embed_seconds"] += time.perf_counter() - embed_start
+
+            write_start = time.perf_counter()
+            self.vector_store.upsert_embeddings(ids, embeddings, texts, metadatas, batch_size=self.write_batch_size)
+            self.stats["write_seconds"] += time.perf_counter() - write_start
+
+        if self.facts_store:
+            for result in self.pending_files:
+                filename = os.path.basename(result["path"])
+                self.facts_store.replace_document_facts(result["document_id"], filename, result["facts"])
+
+        # Older versions of these files, now that the new chunks are written
+        for result in self.pending_files:
+            for stale_id in self._stale_document_ids(result):
+                logger.info(f"Removing previous version {stale_id} of {result['path']}")
+                self.vector_store.delete_document(stale_id)
+                if self.facts_store:
+                    self.facts_store.delete_document(stale_id)
+                self.stats["documents_replaced"] += 1
+
+        for result in self.pending_files:
+            self.checkpoint.mark_completed(result)
+            self.stats["files_ingested"] += 1
+            self.stats["pages"] += result["pages"]
+            self.stats["chunks"] += len(result["chunks"])
+        self.checkpoint.save()
+
+        logger.info(f"Flushed {len(ids)} chunks from {len(self.pending_files)} files")
+        self.pending_files = []
+        self.pending_chunks = 0
+
+
+def print_report(stats: Dict[str, Any]) -> None:
+    print("\nBulk ingestion report")
+    print(f"  files:      {stats['files_ingested']} ingested, {stats['files_skipped']} skipped, "
+          f"{stats['files_failed']} failed (of {stats['files_total']})")
+    print(f"  pages:      {stats['pages']} ({stats['pages_per_second']:.2f} pages/s)")
+    print(f"  chunks:     {stats['chunks']} ({stats['chunks_per_second']:.2f} chunks/s)")
+    print(f"  embedding:  {stats['embed_seconds']:.2f}s")
+    print(f"  writing:    {stats['write_seconds']:.2f}s")
+    print(f"  total:      {stats['elapsed_seconds']:.2f}s")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDFs into the vector store")
+    parser.add_argument("directory", nargs="?", default=settings.pdf_upload_path)
+    parser.add_argument("--workers", type=int, default=settings.bulk_ingest_workers)
+    parser.add_argument("--embed-batch-size", type=int, default=settings.bulk_embed_batch_size)
+    parser.add_argument("--write-batch-size", type=int, default=settings.bulk_write_batch_size)
+    parser.add_argument("--checkpoint", default=settings.bulk_checkpoint_file)
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--report-json", default=None, help="Also write the throughput report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    logging.basicConfig(level=settings.log_level)
+
+    from services.facts_store import FactsStore
+    from services.vector_store import vector_store_instance as vector_store
+    owner = vector_store.directory_owner()
+    if owner is not None:
+        raise SystemExit(
+            f"{vector_store.persist_directory} is in use by the API server (pid {owner}); "
+            f"stop it before bulk ingestion or upload through the API instead"
+        )
+    asyncio.run(vector_store.initialize())
+
+    ingestor = BulkIngestor(
+        vector_store,
+        Checkpoint(args.checkpoint, restart=args.restart),
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        write_batch_size=args.write_batch_size,
+        facts_store=FactsStore()
+    )
+    stats = ingestor.run(args.directory)
+    print_report(stats)
+
+    if args.report_json:
+        with open(args.report_json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     vector_db_path: str = os.getenv("VECTOR_DB_PATH", "./vector_store")
     vector_db_type: str = os.getenv("VECTOR_DB_TYPE", "chromadb")
     chroma_persist_directory: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+    chroma_collection_name: str = os.getenv("CHROMA_COLLECTION_NAME", "documents")
     
     # PDF upload path
     pdf_upload_path: str = os.getenv("PDF_UPLOAD_PATH", "../data")
@@ -19,6 +20,31 @@ class Settings(BaseSettings):
     max_file_size: int = 50 * 1024 * 1024  # 50MB
     upload_directory: str = "uploads"
     
+    # Bulk ingestion configuration
+    bulk_ingest_workers: int = int(os.getenv("BULK_INGEST_WORKERS", str(os.cpu_count() or 2)))
+    bulk_embed_batch_size: int = int(os.getenv("BULK_EMBED_BATCH_SIZE", "256"))
+    bulk_write_batch_size: int = int(os.getenv("BULK_WRITE_BATCH_SIZE", "5000"))
+    bulk_checkpoint_file: str = os.getenv("BULK_CHECKPOINT_FILE", "bulk_ingest_checkpoint.json")
+    
+    # Storage maintenance configuration
+    maintenance_enabled: bool = os.getenv("MAINTENANCE_ENABLED", "True").lower() == "true"
+    maintenance_interval_seconds: float = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+    # Upload files younger than this are never collected (their ingestion may still be running)
+    maintenance_orphan_grace_seconds: float = float(os.getenv("MAINTENANCE_ORPHAN_GRACE_SECONDS", "3600"))
+    compaction_deleted_fraction: float = float(os.getenv("COMPACTION_DELETED_FRACTION", "0.3"))
+    compaction_min_deleted: int = int(os.getenv("COMPACTION_MIN_DELETED", "1000"))
+    compaction_batch_size: int = int(os.getenv("COMPACTION_BATCH_SIZE", "1000"))
+    compaction_retire_grace_seconds: float = float(os.getenv("COMPACTION_RETIRE_GRACE_SECONDS", "30"))
+    # Admin endpoints (/api/maintenance/*) are hidden unless this is set and sent in X-Admin-Token
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    # Snapshot endpoints only read and write directories below this one
+    snapshot_directory: str = os.getenv("SNAPSHOT_DIRECTORY", "snapshots")
+    
+    # Chart rendering configuration
+    chart_cache_directory: str = os.getenv("CHART_CACHE_DIRECTORY", "chart_cache")
+    chart_cache_max_bytes: int = int(os.getenv("CHART_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256MB
+    chart_render_workers: int = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+    
     # Embedding model configuration
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
     
@@ -27,14 +53,80 @@ class Settings(BaseSettings):
     llm_temperature: float = float(os.getenv("LLM_TEMPERATURE", "0.1"))
     max_tokens: int = int(os.getenv("MAX_TOKENS", "1000"))
     
+    # LLM gateway configuration
+    llm_requests_per_minute: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    llm_tokens_per_minute: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    llm_retry_base_delay: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    llm_retry_max_delay: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+    llm_request_timeout: float = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+    
     # Chunking configuration
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    # "recursive" splits each page by characters; "structure" follows sections across pages
+    chunking_strategy: str = os.getenv("CHUNKING_STRATEGY", "recursive")
+    chunk_max_tokens: int = int(os.getenv("CHUNK_MAX_TOKENS", "250"))
+    chunk_tokenizer_model: str = os.getenv("CHUNK_TOKENIZER_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    
+    # PDF extraction configuration ("auto", "pymupdf", "pdfplumber" or "pypdf2")
+    pdf_extractor: str = os.getenv("PDF_EXTRACTOR", "auto")
+    table_page_min_lines: int = int(os.getenv("TABLE_PAGE_MIN_LINES", "5"))
+    table_page_numeric_ratio: float = float(os.getenv("TABLE_PAGE_NUMERIC_RATIO", "0.3"))
+    
+    # Table extraction configuration
+    extract_tables: bool = os.getenv("EXTRACT_TABLES", "True").lower() == "true"
+    table_min_rows: int = int(os.getenv("TABLE_MIN_ROWS", "2"))
+    
+    # Structured facts configuration
+    facts_db_path: str = os.getenv("FACTS_DB_PATH", "facts.db")
+    facts_fast_path_enabled: bool = os.getenv("FACTS_FAST_PATH_ENABLED", "True").lower() == "true"
     
     # Retrieval configuration
     retrieval_k: int = int(os.getenv("RETRIEVAL_K", "5"))
+    max_retrieval_documents: int = int(os.getenv("MAX_RETRIEVAL_DOCUMENTS", "5"))
     similarity_threshold: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
     
+    # Session retrieval reuse configuration
+    session_retrieval_enabled: bool = os.getenv("SESSION_RETRIEVAL_ENABLED", "True").lower() == "true"
+    session_retrieval_max_sessions: int = int(os.getenv("SESSION_RETRIEVAL_MAX_SESSIONS", "1000"))
+    session_retrieval_ttl_seconds: float = float(os.getenv("SESSION_RETRIEVAL_TTL_SECONDS", "1800"))
+    session_follow_up_max_words: int = int(os.getenv("SESSION_FOLLOW_UP_MAX_WORDS", "10"))
+    # Cosine similarity to the previous query above which its chunks are reused without searching
+    session_reuse_similarity: float = float(os.getenv("SESSION_REUSE_SIMILARITY", "0.85"))
+    # ... and above which the search is narrowed to the documents the previous turn retrieved from
+    session_narrow_similarity: float = float(os.getenv("SESSION_NARROW_SIMILARITY", "0.6"))
+    
+    # Admission control: per traffic class concurrency, queue length and queue deadline (seconds)
+    admission_control_enabled: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true"
+    admission_ingest_concurrency: int = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "2"))
+    admission_ingest_queue: int = int(os.getenv("ADMISSION_INGEST_QUEUE", "8"))
+    admission_ingest_timeout: float = float(os.getenv("ADMISSION_INGEST_TIMEOUT", "30"))
+    admission_query_concurrency: int = int(os.getenv("ADMISSION_QUERY_CONCURRENCY", "16"))
+    admission_query_queue: int = int(os.getenv("ADMISSION_QUERY_QUEUE", "64"))
+    admission_query_timeout: float = float(os.getenv("ADMISSION_QUERY_TIMEOUT", "10"))
+    admission_analysis_concurrency: int = int(os.getenv("ADMISSION_ANALYSIS_CONCURRENCY", "4"))
+    admission_analysis_queue: int = int(os.getenv("ADMISSION_ANALYSIS_QUEUE", "16"))
+    admission_analysis_timeout: float = float(os.getenv("ADMISSION_ANALYSIS_TIMEOUT", "10"))
+    
+    # On-demand profiling (X-Profile header, /api/profiling endpoints); off unless enabled
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+    # When set, profiling requests must send it in the X-Profile-Token header
+    profiling_token: str = os.getenv("PROFILING_TOKEN", "")
+    profiling_max_profiles: int = int(os.getenv("PROFILING_MAX_PROFILES", "20"))
+    # Continuous stack sampler: started at boot when enabled, sampling interval and aggregation window in seconds
+    profiling_sampler_enabled: bool = os.getenv("PROFILING_SAMPLER_ENABLED", "False").lower() == "true"
+    profiling_sampler_interval: float = float(os.getenv("PROFILING_SAMPLER_INTERVAL", "0.02"))
+    profiling_sampler_window_seconds: float = float(os.getenv("PROFILING_SAMPLER_WINDOW_SECONDS", "300"))
+    
+    # Response encoding configuration
+    response_compression_min_size: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+    response_gzip_level: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    response_zstd_level: int = int(os.getenv("RESPONSE_ZSTD_LEVEL", "3"))
+    # Build read-path models (chunks, documents) from stored data without re-validating it
+    skip_read_validation: bool = os.getenv("SKIP_READ_VALIDATION", "True").lower() == "true"
+    
     # Server configuration
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8000"))
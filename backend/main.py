@@ -1,12 +1,32 @@
 from typing import Optional
+import base64
 import uuid
-from fastapi import FastAPI, Query, UploadFile, File, HTTPException
+from fastapi import FastAPI, Header, Query, Request, Response, HTTPException
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from services.admission_control import AdmissionControlMiddleware, AdmissionController
+from services.chart_service import MEDIA_TYPES, ChartService
 from services.evaluation_service import EvaluationService
+from services.facts_store import FactsStore
+from services.financial_metrics import FinancialMetricsEngine
 from services.highlighting_service import HighlightingService
-from models.schemas import ChatRequest, ChatResponse, DocumentsResponse, FeedbackRequest, UploadResponse
+from models.schemas import (
+    ChartRequest, ChartResponse, ChatRequest, ChatResponse, DocumentsResponse, FeedbackRequest,
+    FinancialMetricsRequest, FinancialMetricsResponse, ReplaceDocumentResponse, SnapshotRequest, UploadResponse
+)
 from services.pdf_processor import PDFProcessor
+from services.profiling import (
+    ProfilingMiddleware, RequestProfileStore, StackSampler, profile_thread_work, profiling_authorized
+)
+from services.llm_gateway import LLMRequestError, LLMUnavailableError, Priority
+from services.maintenance_service import MaintenanceService, admin_authorized, remove_upload_files
 from services.rag_pipeline import RAGPipeline
+from services.request_coalescer import SingleFlight
+from services.response_compression import CompressionMiddleware
+from services.ingestion_service import DocumentNotFoundError, IngestionService
+from services.upload_storage import FileTooLargeError, MultipartUploadError, save_multipart_upload
+from snapshot import export_snapshot, import_snapshot, resolve_snapshot_directory
 from config import settings
 import logging
 import time
@@ -20,9 +40,14 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="RAG-based Financial Statement Q&A System",
     description="AI-powered Q&A system for financial documents using RAG",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Per traffic class concurrency limits; added first so shed responses still get CORS headers
+admission_controller = AdmissionController.from_settings()
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,11 +57,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (zstd or gzip, per Accept-Encoding)
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in per-request cProfile (X-Profile header) and continuous stack sampling
+request_profiles = RequestProfileStore()
+stack_sampler = StackSampler()
+app.add_middleware(ProfilingMiddleware, store=request_profiles)
+
 # Initialize services
 pdf_processor = PDFProcessor()
-rag_pipeline = RAGPipeline(vector_store)
+facts_store = FactsStore()
+rag_pipeline = RAGPipeline(vector_store, facts_store)
+ingestion_service = IngestionService(pdf_processor, vector_store, facts_store)
 evaluation_service = EvaluationService()
 highlighting_service = HighlightingService()
+financial_metrics_engine = FinancialMetricsEngine()
+chart_service = ChartService()
+chat_coalescer = SingleFlight("chat")
+maintenance_service = MaintenanceService(vector_store)
 
 conversation_histories = {}
 
@@ -51,10 +90,27 @@ async def startup_event():
 
     # Initialize vector store
     await vector_store.initialize()
+    # Lets snapshot.py refuse to write to the directory while this process serves it
+    vector_store.claim_directory()
+
+    # Periodic upload GC and index compaction
+    maintenance_service.start()
+
+    if settings.profiling_enabled and settings.profiling_sampler_enabled:
+        stack_sampler.start()
 
     logger.info("RAG Q&A System initialized successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background workers on shutdown"""
+    await maintenance_service.stop()
+    vector_store.release_directory()
+    stack_sampler.stop()
+    chart_service.shutdown()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -62,50 +118,64 @@ async def root():
 
 
 @app.post("/api/upload")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(request: Request):
     """Upload and process PDF file"""
 
     start_time = time.time()
-    try:
-        # Validate file type (PDF)
-        if not file.filename.lower().endswith('.pdf'):
+    file_path = None
+    original_filename = None
+    # Generate unique filename
+    file_id = str(uuid.uuid4())
+
+    def upload_destination(filename: str) -> str:
+        # Validate file type (PDF) before any of the body is written
+        if not filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
-        # Check file size
-        file_content = await file.read()
-        if len(file_content) > settings.max_file_size:
+        return os.path.join(settings.upload_directory, f"{file_id}_{filename}")
+
+    try:
+        # Parse the multipart body as it arrives and stream the file to disk, enforcing the size limit as we go
+        try:
+            original_filename, file_path, file_size, content_hash = await save_multipart_upload(
+                request,
+                "file",
+                upload_destination,
+                max_size=settings.max_file_size
+            )
+        except FileTooLargeError:
             raise HTTPException(status_code=413, detail="File is too large")
+        except MultipartUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        filename = f"{file_id}_{file.filename}"
-        file_path = os.path.join(settings.upload_directory, filename)
-        
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
-        # Process PDF and extract text
-        documents = pdf_processor.process_pdf(file_path, file.filename)
-        
-        # Store documents in vector database
-        vector_store.add_documents(documents, file_id)
+        # Process PDF and store its chunks in vector database, off the event loop
+        documents = await run_in_threadpool(
+            profile_thread_work(ingestion_service.ingest_file),
+            file_path,
+            original_filename,
+            file_id,
+            extra_metadata={"content_hash": content_hash}
+        )
        
-        logger.info(f"Successfully processed {file.filename}: {len(documents)} chunks created")
+        logger.info(f"Successfully processed {original_filename}: {len(documents)} chunks created")
        
         processing_time = time.time() - start_time
         
         return UploadResponse(
             message="PDF uploaded and processed successfully",
-            filename=file.filename,
+            filename=original_filename,
             chunks_count=len(documents),
-            processing_time=processing_time
+            processing_time=processing_time,
+            file_size=file_size,
+            content_hash=content_hash
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error processing PDF {file.filename}: {str(e)}")
+        logger.error(f"Error processing PDF {original_filename}: {str(e)}")
+        # Do not keep the file of a failed upload around
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
 
@@ -116,7 +186,7 @@ async def chat(request: ChatRequest):
     
     try:
         # Generate session ID if not provided
-        session_id = getattr(request, 'session_id', str(uuid.uuid4()))
+        session_id = request.session_id or str(uuid.uuid4())
         
         # Get or create conversation history
         if session_id not in conversation_histories:
@@ -124,12 +194,24 @@ async def chat(request: ChatRequest):
         
         chat_history = conversation_histories[session_id]
         
-        # Use RAG pipeline to generate answer
-        result = await rag_pipeline.generate_answer(
-            question=request.question,
-            chat_history=chat_history
+        # Use RAG pipeline to generate answer; identical concurrent questions share one run
+        history_snapshot = list(chat_history)
+        priority = Priority.BATCH if request.batch else Priority.INTERACTIVE
+        result, coalesced = await chat_coalescer.run(
+            rag_pipeline.coalescing_key(request.question, request.document_ids, history_snapshot, priority),
+            lambda: rag_pipeline.generate_answer(
+                question=request.question,
+                chat_history=history_snapshot,
+                document_ids=request.document_ids,
+                priority=priority,
+                session_id=session_id
+            )
         )
         
+        if coalesced:
+            # The shared run recorded retrieval state for the leader's session only
+            rag_pipeline.adopt_session_state(session_id, result.get("session_state"))
+        
         # Update conversation history
         chat_history.append({"role": "user", "content": request.question})
         chat_history.append({"role": "assistant", "content": result["answer"]})
@@ -148,6 +230,17 @@ async def chat(request: ChatRequest):
             processing_time=processing_time
         )
         
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable for chat request: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail="The language model is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    except LLMRequestError as e:
+        # Retrying will not help (bad key, rejected prompt), so no Retry-After
+        logger.error(f"LLM rejected chat request: {str(e)}")
+        raise HTTPException(status_code=502, detail="The language model rejected the request.")
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
@@ -159,7 +252,8 @@ async def get_documents():
     """Get list of processed documents"""
     try:
         documents = await vector_store.get_documents_info()
-        return DocumentsResponse(documents=documents)
+        # Serialize straight to orjson instead of re-encoding the models through jsonable_encoder
+        return ORJSONResponse(DocumentsResponse(documents=documents).model_dump())
     except Exception as e:
         logger.error(f"Error retrieving documents: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving documents")
@@ -180,7 +274,7 @@ async def get_chunks(
             page=page,
             limit=limit
         )
-        return chunks
+        return ORJSONResponse(chunks.model_dump())
     except Exception as e:
         logger.error(f"Error retrieving chunks: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving chunks")
@@ -190,13 +284,72 @@ async def get_chunks(
 async def delete_document(document_id: str):
     """Delete a specific document and its chunks"""
     try:
-        vector_store.delete_document(document_id)
+        ingestion_service.delete_document(document_id)
+        rag_pipeline.session_cache.invalidate_document(document_id)
+        remove_upload_files(document_id)
         return {"message": f"Document {document_id} deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting document: {str(e)}")
         raise HTTPException(status_code=500, detail="Error deleting document")
 
 
+@app.put("/api/documents/{document_id}")
+async def replace_document(document_id: str, request: Request):
+    """Replace a document with a revised PDF, re-embedding only the pages that changed"""
+    start_time = time.time()
+    staging_path = None
+
+    def staging_destination(filename: str) -> str:
+        if not filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        return os.path.join(settings.upload_directory, f"{document_id}_{filename}.partial")
+    
+    try:
+        try:
+            filename, staging_path, _, content_hash = await save_multipart_upload(
+                request,
+                "file",
+                staging_destination,
+                max_size=settings.max_file_size
+            )
+        except FileTooLargeError:
+            raise HTTPException(status_code=413, detail="File is too large")
+        except MultipartUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        file_path = os.path.join(settings.upload_directory, f"{document_id}_{filename}")
+        
+        stats = await run_in_threadpool(
+            profile_thread_work(ingestion_service.replace_document),
+            staging_path,
+            filename,
+            document_id,
+            extra_metadata={"content_hash": content_hash}
+        )
+        rag_pipeline.session_cache.invalidate_document(document_id)
+        
+        # Swap in the revised file and drop the previous upload(s) for this document
+        os.replace(staging_path, file_path)
+        remove_upload_files(document_id, keep=file_path)
+        
+        return ReplaceDocumentResponse(
+            message="Document replaced successfully",
+            filename=filename,
+            processing_time=time.time() - start_time,
+            **stats
+        )
+        
+    except HTTPException:
+        raise
+    except DocumentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error replacing document {document_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error replacing document: {str(e)}")
+    finally:
+        if staging_path and os.path.exists(staging_path):
+            os.remove(staging_path)
+
+
 @app.post("/api/feedback")
 async def submit_feedback(request: FeedbackRequest):
     """Submit user feedback for answer quality evaluation"""
@@ -221,6 +374,145 @@ async def get_feedback_stats():
         logger.error(f"Error getting feedback stats: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving feedback statistics")
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get runtime counters of the backend services"""
+    return {
+        "chat_coalescing": chat_coalescer.get_stats(),
+        "rag_pipeline": rag_pipeline.get_stats(),
+        "llm_gateway": rag_pipeline.llm_gateway.get_stats(),
+        "charts": chart_service.stats,
+        # Counts the vector collection, so off the event loop
+        "maintenance": await run_in_threadpool(maintenance_service.get_stats),
+        "admission": admission_controller.get_stats(),
+        "profiling": {"requests": request_profiles.get_stats(), "sampler": stack_sampler.get_stats()}
+    }
+
+
+def require_profiling_access(request: Request) -> None:
+    """Hide the profiling endpoints unless profiling is enabled and the token matches"""
+    if not profiling_authorized(dict(request.headers)):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/api/profiling/requests")
+async def list_request_profiles(request: Request):
+    """List captured per-request profiles, newest first"""
+    require_profiling_access(request)
+    return {"profiles": request_profiles.list()}
+
+
+@app.get("/api/profiling/requests/{profile_id}")
+async def download_request_profile(
+    profile_id: str,
+    request: Request,
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$")
+):
+    """Download a request profile as a pstats file or a text summary"""
+    require_profiling_access(request)
+    profile = request_profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profile.to_text(sort=sort))
+    return Response(
+        content=profile.to_pstats(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+    )
+
+
+@app.get("/api/profiling/sampler")
+async def get_sampler_profile(
+    request: Request,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    window_seconds: Optional[float] = Query(None, gt=0, description="Defaults to the sampler window"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """Hottest frames of the continuous sampler, or its stacks in collapsed (flamegraph) format"""
+    require_profiling_access(request)
+    if format == "collapsed":
+        return PlainTextResponse(
+            stack_sampler.collapsed(window_seconds),
+            headers={"Content-Disposition": 'attachment; filename="stacks.collapsed"'}
+        )
+    return {**stack_sampler.hottest(window_seconds, limit), "sampler": stack_sampler.get_stats()}
+
+
+@app.post("/api/profiling/sampler/{action}")
+async def control_sampler(action: str, request: Request):
+    """Start, stop or reset the continuous stack sampler"""
+    require_profiling_access(request)
+    if action == "start":
+        stack_sampler.start()
+    elif action == "stop":
+        await run_in_threadpool(stack_sampler.stop)
+    elif action == "reset":
+        stack_sampler.reset()
+    else:
+        raise HTTPException(status_code=404, detail="Unknown sampler action")
+    return stack_sampler.get_stats()
+
+
+def require_admin_access(request: Request) -> None:
+    """Hide the admin endpoints unless an admin token is configured and sent"""
+    if not admin_authorized(dict(request.headers)):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def snapshot_path(name: str) -> str:
+    try:
+        return resolve_snapshot_directory(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/maintenance/run")
+async def run_maintenance(
+    request: Request,
+    force_compaction: bool = Query(False, description="Rebuild the vector index regardless of churn")
+):
+    """Run storage maintenance now: orphaned upload cleanup and, if due, index compaction"""
+    require_admin_access(request)
+    try:
+        return await maintenance_service.run_once(force_compaction=force_compaction)
+    except Exception as e:
+        logger.error(f"Error running maintenance: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error running maintenance: {str(e)}")
+
+
+@app.post("/api/maintenance/snapshot/export")
+async def export_vector_snapshot(snapshot_request: SnapshotRequest, request: Request):
+    """Export the vector store (and facts) of the running server to a snapshot directory"""
+    require_admin_access(request)
+    directory = snapshot_path(snapshot_request.directory)
+    try:
+        return await run_in_threadpool(
+            export_snapshot, vector_store, directory, facts_store if snapshot_request.include_facts else None
+        )
+    except Exception as e:
+        logger.error(f"Error exporting snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+
+
+@app.post("/api/maintenance/snapshot/import")
+async def import_vector_snapshot(snapshot_request: SnapshotRequest, request: Request):
+    """Import a snapshot into the running server; writes are tracked by any compaction in progress"""
+    require_admin_access(request)
+    directory = snapshot_path(snapshot_request.directory)
+    if not os.path.exists(os.path.join(directory, "manifest.json")):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    try:
+        return await run_in_threadpool(
+            import_snapshot, vector_store, directory,
+            facts_store if snapshot_request.include_facts else None, snapshot_request.replace
+        )
+    except Exception as e:
+        logger.error(f"Error importing snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+
+
 @app.post("/api/highlight-chunks")
 async def highlight_chunks(request: dict):
     """Get highlighted document chunks for a query"""
@@ -236,22 +528,111 @@ async def highlight_chunks(request: dict):
             {
                 "content": chunk.content,
                 "page": chunk.page,
-                "metadata": chunk.metadata,
                 "id": chunk.id
             }
             for chunk in chunks_response.chunks
         ]
         
-        # Add highlighting
+        # Offsets only; clients already hold the chunk content from /api/chunks
         highlighted_docs = highlighting_service.highlight_relevant_chunks(query, documents)
         
-        return {"highlighted_chunks": highlighted_docs}
+        return ORJSONResponse({"query": query, "highlighted_chunks": highlighted_docs})
         
     except Exception as e:
         logger.error(f"Error highlighting chunks: {str(e)}")
         raise HTTPException(status_code=500, detail="Error highlighting document chunks")
 
 
+@app.post("/analysis/calculate-metrics")
+async def calculate_metrics(request: FinancialMetricsRequest):
+    """Calculate financial ratios and growth for one set of values or a column-oriented batch"""
+    start_time = time.time()
+    
+    try:
+        if request.columns is not None:
+            metrics, row_count = financial_metrics_engine.calculate_batch(
+                request.columns,
+                periods=request.periods,
+                entities=request.entities
+            )
+        else:
+            values = request.model_dump(exclude={"columns", "periods", "entities"})
+            metrics = financial_metrics_engine.calculate_single(values)
+            row_count = 1
+        
+        return FinancialMetricsResponse(
+            metrics=metrics,
+            row_count=row_count,
+            periods=request.periods,
+            entities=request.entities,
+            processing_time=time.time() - start_time
+        )
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error calculating metrics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error calculating financial metrics")
+
+
+@app.post("/analysis/generate-chart")
+async def generate_chart(request: ChartRequest, if_none_match: Optional[str] = Header(None)):
+    """Render a chart (cached by content) and return it inline with an ETag"""
+    try:
+        chart_id, path, cached = await chart_service.generate_chart(
+            request.type,
+            request.data,
+            title=request.title,
+            fmt=request.format
+        )
+        fmt = path.rsplit(".", 1)[-1]
+        etag = f'"{chart_id}"'
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+        
+        # Client already holds this exact chart
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        
+        with open(path, "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        
+        chart = ChartResponse(
+            chart_id=chart_id,
+            format=fmt,
+            media_type=MEDIA_TYPES[fmt],
+            url=f"/analysis/charts/{chart_id}.{fmt}",
+            image=f"data:{MEDIA_TYPES[fmt]};base64,{encoded}",
+            cached=cached
+        )
+        return Response(content=chart.model_dump_json(), media_type="application/json", headers=headers)
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generating chart: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error generating chart")
+
+
+@app.get("/analysis/charts/{chart_file}")
+async def get_chart(chart_file: str, if_none_match: Optional[str] = Header(None)):
+    """Serve a rendered chart image from the cache"""
+    chart_id, _, fmt = chart_file.partition(".")
+    if fmt not in MEDIA_TYPES or len(chart_id) != 64 or not all(c in "0123456789abcdef" for c in chart_id):
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    etag = f'"{chart_id}"'
+    # Content-addressed, so the bytes behind a chart id never change
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    path = chart_service.get_cached_chart(chart_id, fmt)
+    if not path:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.host, port=settings.port, reload=settings.debug) 
\ No newline at end of file
@@ -7,6 +7,10 @@ class ChatRequest(BaseModel):
     question: str
     chat_history: Optional[List[Dict[str, str]]] = []
     session_id: Optional[str] = None
+    # Restrict retrieval to these documents; None searches everything
+    document_ids: Optional[List[str]] = None
+    # Scripted/bulk callers (evaluations, report runs) set this to yield LLM capacity to interactive chat
+    batch: bool = False
 
 
 class DocumentSource(BaseModel):
@@ -39,6 +43,22 @@ class UploadResponse(BaseModel):
     filename: str
     chunks_count: int
     processing_time: float
+    file_size: Optional[int] = None
+    content_hash: Optional[str] = None
+
+
+class ReplaceDocumentResponse(BaseModel):
+    message: str
+    document_id: str
+    filename: str
+    pages_total: int
+    pages_changed: int
+    pages_removed: int
+    pages_unchanged: int
+    chunks_upserted: int
+    chunks_deleted: int
+    chunks_metadata_updated: int = 0
+    processing_time: float
 
 
 class ChunkInfo(BaseModel):
@@ -60,11 +80,43 @@ class FinancialMetricsRequest(BaseModel):
     shareholders_equity: Optional[float] = 0
     current_assets: Optional[float] = 0
     current_liabilities: Optional[float] = 0
+    gross_profit: Optional[float] = None
+    operating_income: Optional[float] = None
+    # Column-oriented batch form: {"revenue": [...], "net_income": [...]}, one value per row
+    columns: Optional[Dict[str, List[Optional[float]]]] = None
+    periods: Optional[List[str]] = None
+    entities: Optional[List[str]] = None
+
+
+class FinancialMetricsResponse(BaseModel):
+    # Single request: metric -> value; batch request: metric -> one value per row
+    metrics: Dict[str, Any]
+    row_count: int
+    periods: Optional[List[str]] = None
+    entities: Optional[List[str]] = None
+    processing_time: float
 
 class ChartRequest(BaseModel):
     type: str  # 'bar', 'line', 'pie', 'financial_metrics'
     data: Dict[str, Any]
     title: Optional[str] = "Financial Chart"
+    format: Optional[str] = "png"  # 'png' or 'svg'
+
+
+class ChartResponse(BaseModel):
+    chart_id: str
+    format: str
+    media_type: str
+    url: str
+    image: str  # base64 data URI
+    cached: bool
+
+class SnapshotRequest(BaseModel):
+    # Snapshot name: a directory relative to settings.snapshot_directory
+    directory: str
+    # On import, delete chunks and facts that are not in the snapshot
+    replace: bool = False
+    include_facts: bool = True
 
 class FeedbackRequest(BaseModel):
     question: str
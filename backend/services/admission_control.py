@@ -0,0 +1,215 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Pattern, Set, Tuple
+import asyncio
+import re
+import time
+import orjson
+from starlette.types import ASGIApp, Receive, Scope, Send
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (traffic class, methods, path pattern); first match wins, unmatched routes are not limited
+ROUTE_CLASSES: List[Tuple[str, Set[str], Pattern]] = [
+    ("ingest", {"POST"}, re.compile(r'^/api/upload$')),
+    ("ingest", {"PUT"}, re.compile(r'^/api/documents/[^/]+$')),
+    ("ingest", {"POST"}, re.compile(r'^/api/maintenance/(run|snapshot/(export|import))$')),
+    ("query", {"POST"}, re.compile(r'^/api/(chat|highlight-chunks)$')),
+    ("analysis", {"POST"}, re.compile(r'^/analysis/')),
+]
+
+
+class RequestShedError(Exception):
+    """Raised when a request is turned away instead of queued or served"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Concurrency limit for one traffic class with a bounded FIFO wait queue.
+
+    Requests beyond max_queue waiters are refused at once (429); queued requests
+    that are not admitted within queue_timeout are refused (503). A released slot
+    is handed straight to the oldest waiter so new arrivals cannot barge ahead.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a request holds a slot, for Retry-After
+        self._service_seconds = 1.0
+        self.stats = {
+            "admitted": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0
+        }
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a newcomer"""
+        backlog = (len(self._waiters) + 1) / max(self.max_concurrency, 1)
+        return int(min(60, max(1, round(backlog * self._service_seconds))))
+
+    async def acquire(self) -> None:
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.stats["admitted"] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.stats["shed_queue_full"] += 1
+            raise RequestShedError(429, f"Too many {self.name} requests queued", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        enqueued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            # A slot handed over in the same instant the deadline passed is still taken
+            if not waiter.done():
+                waiter.cancel()
+                self._remove_waiter(waiter)
+                self.stats["shed_deadline"] += 1
+                raise RequestShedError(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            if waiter.done():
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            raise
+
+        waited = time.monotonic() - enqueued_at
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds_total"] += waited
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], waited)
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        if held_seconds is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+        # Pass the slot on without decrementing, so the count never dips below the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        admitted = self.stats["admitted"]
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_wait_seconds": self.stats["wait_seconds_total"] / admitted if admitted else 0.0,
+            "avg_service_seconds": self._service_seconds
+        }
+
+
+class AdmissionController:
+    """Separate admission budgets per traffic class"""
+
+    def __init__(self, limiters: Dict[str, AdmissionLimiter], route_classes: Optional[List[Tuple[str, Set[str], Pattern]]] = None):
+        self.limiters = limiters
+        self.route_classes = route_classes or ROUTE_CLASSES
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls({
+            "ingest": AdmissionLimiter(
+                "ingest",
+                settings.admission_ingest_concurrency,
+                settings.admission_ingest_queue,
+                settings.admission_ingest_timeout
+            ),
+            "query": AdmissionLimiter(
+                "query",
+                settings.admission_query_concurrency,
+                settings.admission_query_queue,
+                settings.admission_query_timeout
+            ),
+            "analysis": AdmissionLimiter(
+                "analysis",
+                settings.admission_analysis_concurrency,
+                settings.admission_analysis_queue,
+                settings.admission_analysis_timeout
+            ),
+        })
+
+    def classify(self, method: str, path: str) -> Optional[str]:
+        for traffic_class, methods, pattern in self.route_classes:
+            if method in methods and pattern.match(path):
+                return traffic_class
+        return None
+
+    def limiter_for(self, method: str, path: str) -> Optional[AdmissionLimiter]:
+        traffic_class = self.classify(method, path)
+        return self.limiters.get(traffic_class) if traffic_class else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """Applies the controller's per-class limits before a request reaches its route"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.admission_control_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.limiter_for(scope["method"], scope["path"])
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except RequestShedError as e:
+            logger.warning(f"Shed {scope['method']} {scope['path']}: {e.reason}")
+            await self._send_shed_response(send, e)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - start)
+
+    @staticmethod
+    async def _send_shed_response(send: Send, error: RequestShedError) -> None:
+        body = orjson.dumps({"detail": error.reason})
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(error.retry_after).encode("latin-1")),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,256 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHART_TYPES = {"bar", "line", "pie", "financial_metrics"}
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def normalize_chart_request(chart_type: str, data: Dict[str, Any], title: Optional[str], fmt: str) -> Dict[str, Any]:
+    """Canonical form of a chart request; identical charts normalize to identical dicts.
+
+    Accepted data shapes:
+      {"labels": [...], "values": [...]}
+      {"labels": [...], "datasets": [{"label": "2023", "values": [...]}, ...]}  ("data" also accepted)
+      {"Revenue": 100, "Net income": 20}  (flat label -> value mapping)
+      {"metrics": {...}}  (financial_metrics, e.g. the /analysis/calculate-metrics output)
+    """
+    chart_type = (chart_type or "").strip().lower()
+    fmt = (fmt or "png").strip().lower()
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"Unsupported chart type: {chart_type}. Expected one of: {', '.join(sorted(CHART_TYPES))}")
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported image format: {fmt}. Expected one of: {', '.join(MEDIA_TYPES)}")
+
+    if isinstance(data.get("metrics"), dict):
+        data = data["metrics"]
+
+    if "labels" in data:
+        labels = [str(label) for label in data["labels"]]
+        if "datasets" in data:
+            datasets = [
+                {
+                    "label": str(dataset.get("label", "")),
+                    "values": [float(v) if v is not None else None for v in dataset.get("values", dataset.get("data", []))]
+                }
+                for dataset in data["datasets"]
+            ]
+        else:
+            datasets = [{"label": "", "values": [float(v) if v is not None else None for v in data.get("values", [])]}]
+    else:
+        # Flat mapping; non-numeric entries (e.g. nested dicts) are ignored
+        items = [(str(k), v) for k, v in data.items() if isinstance(v, (int, float)) or v is None]
+        labels = [label for label, _ in items]
+        datasets = [{"label": "", "values": [float(v) if v is not None else None for _, v in items]}]
+
+    for dataset in datasets:
+        if len(dataset["values"]) != len(labels):
+            raise ValueError("Every dataset must have one value per label")
+    if chart_type == "pie" and len(datasets) != 1:
+        raise ValueError("Pie charts take exactly one dataset")
+
+    return {
+        "type": chart_type,
+        "title": (title or "").strip(),
+        "labels": labels,
+        "datasets": datasets,
+        "format": fmt
+    }
+
+
+def chart_key(normalized: Dict[str, Any]) -> str:
+    """Content address of a normalized chart request"""
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_chart(normalized: Dict[str, Any]) -> bytes:
+    """Render a normalized chart request headless; runs inside a worker process"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = normalized["labels"]
+    datasets = normalized["datasets"]
+    chart_type = normalized["type"]
+
+    def clean(values: List[Optional[float]]) -> List[float]:
+        return [v if v is not None else 0.0 for v in values]
+
+    fig, ax = plt.subplots(figsize=(8, 5), dpi=100)
+    try:
+        if chart_type == "bar":
+            width = 0.8 / max(len(datasets), 1)
+            positions = range(len(labels))
+            for idx, dataset in enumerate(datasets):
+                ax.bar([p + idx * width for p in positions], clean(dataset["values"]), width, label=dataset["label"] or None)
+            ax.set_xticks([p + width * (len(datasets) - 1) / 2 for p in positions])
+            ax.set_xticklabels(labels, rotation=30, ha="right")
+        elif chart_type == "line":
+            for dataset in datasets:
+                ax.plot(labels, clean(dataset["values"]), marker="o", label=dataset["label"] or None)
+            ax.tick_params(axis="x", rotation=30)
+        elif chart_type == "pie":
+            ax.pie(clean(datasets[0]["values"]), labels=labels, autopct="%1.1f%%", startangle=90)
+            ax.axis("equal")
+        else:  # financial_metrics
+            values = clean(datasets[0]["values"])
+            bars = ax.barh(labels, values, color=["#2e7d32" if v >= 0 else "#c62828" for v in values])
+            ax.bar_label(bars, labels=[f"{v:,.2f}" for v in values], padding=3)
+            ax.axvline(0, color="#555555", linewidth=0.8)
+            ax.invert_yaxis()
+
+        if normalized["title"]:
+            ax.set_title(normalized["title"])
+        if chart_type in ("bar", "line") and any(dataset["label"] for dataset in datasets):
+            ax.legend()
+
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=normalized["format"])
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartCache:
+    """Content-addressed on-disk cache of rendered charts with LRU eviction by total size"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(
+            os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+        )
+
+    def path_for(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def get(self, key: str, fmt: str) -> Optional[str]:
+        path = self.path_for(key, fmt)
+        try:
+            # Touch on hit so eviction order follows last use
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, fmt: str, content: bytes) -> str:
+        path = self.path_for(key, fmt)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+
+        with self._lock:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self.total_bytes += len(content) - previous_size
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        for _, size, entry_path in sorted(entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                continue
+
+        logger.info(f"Chart cache evicted down to {self.total_bytes} bytes")
+
+
+class ChartService:
+    def __init__(self, cache: Optional[ChartCache] = None, workers: Optional[int] = None):
+        self.cache = cache or ChartCache(settings.chart_cache_directory, settings.chart_cache_max_bytes)
+        self.workers = workers or settings.chart_render_workers
+        self._executor = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "renders": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the server's threads, locks or open Chroma handles
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    async def generate_chart(
+        self,
+        chart_type: str,
+        data: Dict[str, Any],
+        title: Optional[str] = None,
+        fmt: str = "png"
+    ) -> Tuple[str, str, bool]:
+        """Return (chart key, cached file path, cache hit) for a chart request"""
+        normalized = normalize_chart_request(chart_type, data, title, fmt)
+        key = chart_key(normalized)
+        fmt = normalized["format"]
+        self.stats["requests"] += 1
+
+        path = self.cache.get(key, fmt)
+        if path:
+            self.stats["cache_hits"] += 1
+            return key, path, True
+
+        # Identical requests arriving together share one render
+        render = self._in_flight.get(key)
+        cache_hit = render is not None
+        if cache_hit:
+            self.stats["cache_hits"] += 1
+        else:
+            render = asyncio.ensure_future(self._render(key, fmt, normalized))
+            self._in_flight[key] = render
+            render.add_done_callback(self._render_done)
+
+        # The render belongs to no single caller: a cancelled request leaves it running for the others
+        return key, await asyncio.shield(render), cache_hit
+
+    async def _render(self, key: str, fmt: str, normalized: Dict[str, Any]) -> str:
+        loop = asyncio.get_running_loop()
+        try:
+            content = await loop.run_in_executor(self._get_executor(), render_chart, normalized)
+            path = await loop.run_in_executor(None, self.cache.put, key, fmt, content)
+            self.stats["renders"] += 1
+            return path
+        finally:
+            self._in_flight.pop(key, None)
+
+    @staticmethod
+    def _render_done(render: asyncio.Task) -> None:
+        # Mark a failure retrieved so it does not log a warning once every caller has gone
+        if not render.cancelled():
+            render.exception()
+
+    def get_cached_chart(self, key: str, fmt: str) -> Optional[str]:
+        return self.cache.get(key, fmt)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,143 @@
+from typing import List, Dict, Any, Optional
+import re
+from services.pdf_extractors import NUMERIC_TOKEN_PATTERN
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_HEADING_PATTERN = re.compile(
+    r'^((consolidated|condensed|interim|separate)\s+)*'
+    r'(statements?\s+of\s+\w+|balance\s+sheets?|income\s+statements?|'
+    r'cash\s+flow\s+statements?|notes?\s+to\s+the\s+\w+|note\s+\d+)',
+    re.IGNORECASE
+)
+NUMBERED_HEADING_PATTERN = re.compile(r'^(\d+(\.\d+)*|[IVX]+|[A-Z])[.)]?\s+[A-Z][^.:;]{2,80}$')
+
+
+class TokenCounter:
+    """Counts tokens with the embedding model's tokenizer, loaded lazily"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._tokenizer = None
+        self._fallback = False
+
+    def count(self, text: str) -> int:
+        if self._tokenizer is None and not self._fallback:
+            try:
+                from transformers import AutoTokenizer
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            except Exception as e:
+                # Roughly four characters per word piece for English financial text
+                logger.warning(f"Could not load tokenizer {self.model_name}, estimating token counts: {str(e)}")
+                self._fallback = True
+
+        if self._fallback:
+            return max(1, len(text) // 4)
+        return len(self._tokenizer.encode(text, add_special_tokens=False))
+
+
+class StructureAwareChunker:
+    """Chunks a whole document along headings and statement sections.
+
+    Chunks may continue across pages (the page span is tracked), numeric rows are
+    never split, and chunk size is measured in embedding-model tokens.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, token_counter: Optional[TokenCounter] = None):
+        self.max_tokens = max_tokens or settings.chunk_max_tokens
+        self.token_counter = token_counter or TokenCounter(settings.chunk_tokenizer_model)
+
+    @staticmethod
+    def count_numeric_tokens(line: str) -> int:
+        return sum(1 for token in line.split() if NUMERIC_TOKEN_PATTERN.match(token))
+
+    @staticmethod
+    def is_numeric_row(line: str) -> bool:
+        """A line item row: label followed by one or more values, ending in a number"""
+        tokens = line.split()
+        return bool(tokens) and bool(NUMERIC_TOKEN_PATTERN.match(tokens[-1]))
+
+    @classmethod
+    def is_heading(cls, line: str) -> bool:
+        if len(line) > 100 or line.endswith((".", ",", ";")) or cls.count_numeric_tokens(line) >= 2:
+            return False
+        if STATEMENT_HEADING_PATTERN.match(line) or NUMBERED_HEADING_PATTERN.match(line):
+            return True
+        letters = [ch for ch in line if ch.isalpha()]
+        return len(letters) >= 4 and len(line.split()) <= 12 and all(ch.isupper() for ch in letters)
+
+    def chunk(self, pages_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return chunks as dicts with text, page_start, page_end, section and section_index"""
+        chunks = []
+        state = {"lines": [], "tokens": 0, "pages": [], "section": "", "section_index": 0}
+
+        def flush(next_section: str):
+            body = [line for line in state["lines"] if line != state["section"]]
+            if body:
+                chunks.append({
+                    "text": "\n".join(state["lines"]),
+                    "page_start": state["pages"][0],
+                    "page_end": state["pages"][-1],
+                    "section": state["section"],
+                    "section_index": state["section_index"]
+                })
+            # Following chunks start with the section heading for context
+            state["section"] = next_section
+            state["lines"] = [next_section] if next_section else []
+            state["tokens"] = self.token_counter.count(next_section) if next_section else 0
+            state["pages"] = []
+
+        def add(line: str, tokens: int, page_num: int):
+            if state["tokens"] + tokens > self.max_tokens and len(state["lines"]) > (1 if state["section"] else 0):
+                flush(state["section"])
+            state["lines"].append(line)
+            state["tokens"] += tokens
+            if not state["pages"] or state["pages"][-1] != page_num:
+                state["pages"].append(page_num)
+
+        for page_data in pages_content:
+            page_num = page_data["page_number"]
+
+            for raw_line in page_data["content"].splitlines():
+                line = raw_line.strip()
+                if not line:
+                    continue
+
+                if self.is_heading(line):
+                    # A new section always starts a new chunk
+                    flush(line)
+                    state["section_index"] += 1
+                    state["pages"] = [page_num]
+                    continue
+
+                tokens = self.token_counter.count(line)
+                if tokens <= self.max_tokens or self.is_numeric_row(line):
+                    # Numeric rows are atomic even when oversized
+                    add(line, tokens, page_num)
+                else:
+                    heading_tokens = self.token_counter.count(state["section"]) if state["section"] else 0
+                    for piece in self._split_long_line(line, max(16, self.max_tokens - heading_tokens)):
+                        add(piece, self.token_counter.count(piece), page_num)
+
+        flush("")
+        return chunks
+
+    def _split_long_line(self, line: str, max_tokens: int) -> List[str]:
+        """Split an oversized prose line on word boundaries"""
+        pieces = []
+        words = []
+        tokens = 0
+        for word in line.split():
+            # Word-piece tokenizers split on whitespace first, so per-word counts add up
+            word_tokens = self.token_counter.count(word)
+            if words and tokens + word_tokens > max_tokens:
+                pieces.append(" ".join(words))
+                words = []
+                tokens = 0
+            words.append(word)
+            tokens += word_tokens
+        if words:
+            pieces.append(" ".join(words))
+        return pieces
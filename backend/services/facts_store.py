@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional, Set
+import os
+import re
+import sqlite3
+import threading
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+FACT_COLUMNS = ["document_id", "filename", "page", "line_item", "line_item_key", "period", "value", "raw_value", "source"]
+INSERT_FACT_SQL = f"INSERT INTO facts ({', '.join(FACT_COLUMNS)}) VALUES ({', '.join('?' * len(FACT_COLUMNS))})"
+
+
+YEAR_PATTERN = re.compile(r'(?<!\d)(19|20)\d{2}(?!\d)')
+
+# Words that on their own do not name a line item ("Total", "Net", "Other", "Total for the year")
+GENERIC_LINE_ITEM_WORDS = {
+    "total", "totals", "subtotal", "sub", "net", "gross", "other", "others", "amount", "amounts", "balance",
+    "sum", "value", "values", "figure", "figures", "item", "items", "for", "the", "of", "year", "period", "at", "end"
+}
+# Single-word labels specific enough to stand for a line item
+SINGLE_WORD_LINE_ITEMS = {
+    "revenue", "revenues", "sales", "turnover", "inventories", "inventory", "goodwill", "depreciation",
+    "amortisation", "amortization", "dividends", "provisions", "borrowings", "receivables", "payables",
+    "ebitda", "ebit", "capex"
+}
+# A line item label does not end mid-phrase; prose fragments often do
+TRAILING_STOPWORDS = {
+    "and", "or", "of", "the", "to", "in", "for", "with", "by", "at", "from", "a", "an",
+    "was", "were", "is", "are", "had", "has", "have"
+}
+MAX_LINE_ITEM_WORDS = 8
+
+
+def normalize_line_item(label: str) -> str:
+    """Lowercase, drop note references and punctuation so labels match across documents and questions"""
+    label = label.lower()
+    label = re.sub(r'\bnotes?\s*\d+[a-z]?\b', ' ', label)
+    label = re.sub(r'[^a-z0-9]+', ' ', label)
+    return " ".join(label.split())
+
+
+def is_specific_line_item(key: str) -> bool:
+    """Whether a normalized label names a concrete line item rather than a subtotal, a generic word or prose"""
+    words = key.split()
+    if not words or len(words) > MAX_LINE_ITEM_WORDS or YEAR_PATTERN.search(key):
+        return False
+    if all(word in GENERIC_LINE_ITEM_WORDS for word in words) or words[-1] in TRAILING_STOPWORDS:
+        return False
+    if len(words) == 1:
+        return words[0] in SINGLE_WORD_LINE_ITEMS
+    return True
+
+
+class FactsStore:
+    """SQLite table of (line item, period, value) facts linked to document_id and page"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.facts_db_path
+        self._lock = threading.Lock()
+        self._line_item_keys: Optional[Set[str]] = None
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS facts (
+                    document_id TEXT NOT NULL,
+                    filename TEXT,
+                    page INTEGER NOT NULL,
+                    line_item TEXT NOT NULL,
+                    line_item_key TEXT NOT NULL,
+                    period TEXT,
+                    value REAL NOT NULL,
+                    raw_value TEXT,
+                    source TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_lookup ON facts (line_item_key, period)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_document ON facts (document_id, page)")
+
+    @contextmanager
+    def _connect(self):
+        with self._lock:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def add_facts(self, document_id: str, filename: str, facts: Iterable[Dict[str, Any]]) -> int:
+        """Insert extracted facts for a document; returns the number stored"""
+        rows = self._fact_rows(document_id, filename, facts)
+        if not rows:
+            return 0
+
+        try:
+            with self._connect() as conn:
+                conn.executemany(INSERT_FACT_SQL, rows)
+            self._line_item_keys = None
+            logger.info(f"Stored {len(rows)} facts for document {document_id}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error storing facts: {str(e)}")
+            raise
+
+    def replace_document_facts(self, document_id: str, filename: str, facts: Iterable[Dict[str, Any]]) -> int:
+        """Swap all facts of a document for a new set in one transaction, so readers never see it without facts"""
+        rows = self._fact_rows(document_id, filename, facts)
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM facts WHERE document_id = ?", (document_id,))
+                conn.executemany(INSERT_FACT_SQL, rows)
+            self._line_item_keys = None
+            logger.info(f"Replaced facts for document {document_id} with {len(rows)} facts")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error replacing facts for document {document_id}: {str(e)}")
+            raise
+
+    @staticmethod
+    def _fact_rows(document_id: str, filename: str, facts: Iterable[Dict[str, Any]]) -> List[tuple]:
+        return [
+            (
+                document_id,
+                filename,
+                fact["page"],
+                fact["line_item"],
+                normalize_line_item(fact["line_item"]),
+                fact.get("period"),
+                fact["value"],
+                fact.get("raw_value"),
+                fact.get("source")
+            )
+            for fact in facts
+        ]
+
+    def delete_document(self, document_id: str) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM facts WHERE document_id = ?", (document_id,))
+            self._line_item_keys = None
+        except Exception as e:
+            logger.error(f"Error deleting facts for document {document_id}: {str(e)}")
+            raise
+
+    def line_item_keys(self) -> Set[str]:
+        """Distinct normalized line items, cached until the table changes"""
+        if self._line_item_keys is None:
+            with self._connect() as conn:
+                self._line_item_keys = {row[0] for row in conn.execute("SELECT DISTINCT line_item_key FROM facts")}
+        return self._line_item_keys
+
+    def lookup(self, line_item_key: str, period: Optional[str] = None, document_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Facts for a normalized line item, optionally restricted to a period and document"""
+        query = f"SELECT {', '.join(FACT_COLUMNS)} FROM facts WHERE line_item_key = ?"
+        params: List[Any] = [line_item_key]
+        if period is not None:
+            query += " AND period = ?"
+            params.append(period)
+        if document_id is not None:
+            query += " AND document_id = ?"
+            params.append(document_id)
+        query += " ORDER BY period DESC, document_id, page"
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def backup(self, destination: str) -> None:
+        """Write a consistent copy of the facts database to destination"""
+        with self._lock:
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(destination)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+
+    def restore(self, source_path: str, replace: bool = False) -> None:
+        """Load facts from a backup: with replace the whole table, otherwise only the backup's documents"""
+        if replace:
+            with self._lock:
+                source = sqlite3.connect(source_path)
+                target = sqlite3.connect(self.db_path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+        else:
+            columns = ", ".join(FACT_COLUMNS)
+            with self._connect() as conn:
+                conn.execute("ATTACH DATABASE ? AS snapshot", (source_path,))
+                conn.execute("DELETE FROM facts WHERE document_id IN (SELECT DISTINCT document_id FROM snapshot.facts)")
+                conn.execute(f"INSERT INTO facts ({columns}) SELECT {columns} FROM snapshot.facts")
+        self._line_item_keys = None
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
@@ -0,0 +1,128 @@
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+INPUT_COLUMNS = [
+    "revenue",
+    "gross_profit",
+    "operating_income",
+    "net_income",
+    "total_assets",
+    "total_liabilities",
+    "shareholders_equity",
+    "current_assets",
+    "current_liabilities",
+]
+
+# metric name -> (numerator column, denominator column)
+RATIO_METRICS = {
+    "gross_margin": ("gross_profit", "revenue"),
+    "operating_margin": ("operating_income", "revenue"),
+    "net_profit_margin": ("net_income", "revenue"),
+    "return_on_assets": ("net_income", "total_assets"),
+    "return_on_equity": ("net_income", "shareholders_equity"),
+    "current_ratio": ("current_assets", "current_liabilities"),
+    "debt_to_equity": ("total_liabilities", "shareholders_equity"),
+    "debt_to_assets": ("total_liabilities", "total_assets"),
+    "equity_multiplier": ("total_assets", "shareholders_equity"),
+}
+
+GROWTH_COLUMNS = ["revenue", "gross_profit", "operating_income", "net_income", "total_assets", "shareholders_equity"]
+
+
+class FinancialMetricsEngine:
+    """Vectorized ratio and growth calculations over a column-oriented batch of periods/companies"""
+
+    def calculate(
+        self,
+        columns: Dict[str, List[Optional[float]]],
+        periods: Optional[List[str]] = None,
+        entities: Optional[List[str]] = None
+    ) -> Dict[str, List[Optional[float]]]:
+        """Compute every metric whose inputs are present; one output value per input row.
+
+        Growth is period-over-period within each entity, in period order when periods
+        are given (labels must sort chronologically, e.g. "2023" or "2023-Q4") and in
+        row order otherwise. Undefined values (division by zero, missing inputs,
+        first period) are returned as None.
+        """
+        metrics, _ = self.calculate_batch(columns, periods, entities)
+        return metrics
+
+    def calculate_batch(
+        self,
+        columns: Dict[str, List[Optional[float]]],
+        periods: Optional[List[str]] = None,
+        entities: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, List[Optional[float]]], int]:
+        """Same as calculate, also returning the number of rows the batch was evaluated over"""
+        frame = self._build_frame(columns, periods, entities)
+        metrics = {}
+
+        for metric, (numerator, denominator) in RATIO_METRICS.items():
+            if numerator in frame and denominator in frame:
+                metrics[metric] = self._safe_divide(frame[numerator].to_numpy(), frame[denominator].to_numpy())
+
+        growth_inputs = [column for column in GROWTH_COLUMNS if column in frame]
+        if growth_inputs and len(frame) > 1:
+            ordered = frame.sort_values(["_entity", "_period"], kind="stable") if periods else frame
+            previous = ordered.groupby("_entity", sort=False)[growth_inputs].shift(1).reindex(frame.index)
+
+            for column in growth_inputs:
+                current = frame[column].to_numpy()
+                prior = previous[column].to_numpy()
+                metrics[f"{column}_growth"] = self._safe_divide(current - prior, np.abs(prior))
+
+        return {metric: self._to_list(values) for metric, values in metrics.items()}, len(frame)
+
+    def calculate_single(self, values: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        """Compute ratios for a single set of statement values"""
+        columns = {column: [value] for column, value in values.items() if column in INPUT_COLUMNS and value is not None}
+        return {
+            metric: series[0]
+            for metric, series in self.calculate(columns).items()
+        }
+
+    @staticmethod
+    def _build_frame(
+        columns: Dict[str, List[Optional[float]]],
+        periods: Optional[List[str]],
+        entities: Optional[List[str]]
+    ) -> pd.DataFrame:
+        unknown = set(columns) - set(INPUT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}. Expected any of: {', '.join(INPUT_COLUMNS)}")
+
+        lengths = {len(values) for values in columns.values()}
+        if periods is not None:
+            lengths.add(len(periods))
+        if entities is not None:
+            lengths.add(len(entities))
+        if len(lengths) > 1:
+            raise ValueError("All columns, periods and entities must have the same length")
+
+        row_count = lengths.pop() if lengths else 0
+        frame = pd.DataFrame({
+            column: np.asarray(values, dtype=np.float64)  # None becomes NaN
+            for column, values in columns.items()
+        }, index=pd.RangeIndex(row_count))
+        frame["_entity"] = entities if entities is not None else ""
+        frame["_period"] = periods if periods is not None else ""
+        return frame
+
+    @staticmethod
+    def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = numerator / denominator
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+    @staticmethod
+    def _to_list(values: np.ndarray) -> List[Optional[float]]:
+        output = values.astype(object)
+        output[np.isnan(values)] = None
+        return output.tolist()
+
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional
 import re
 import logging
 
@@ -13,30 +13,36 @@ class HighlightingService:
         query: str, 
         documents: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
-        """Add highlighting information to relevant document chunks"""
+        """Find query term offsets in document chunks.
+        
+        Returns one entry per chunk with its id, page and [start, end) character offsets
+        into the chunk content; the content itself is not repeated.
+        """
         try:
             # Extract key terms from query
             key_terms = self._extract_key_terms(query)
+            pattern = self._terms_pattern(key_terms)
             
             highlighted_docs = []
             for doc in documents:
                 content = doc.get('content', '')
-                highlighted_content, highlights = self._highlight_text(content, key_terms)
+                highlights = self._find_highlights(content, pattern)
                 
-                highlighted_doc = {
-                    **doc,
-                    'highlighted_content': highlighted_content,
+                highlighted_docs.append({
+                    'id': doc.get('id'),
+                    'page': doc.get('page'),
                     'highlights': highlights,
                     'highlight_count': len(highlights)
-                }
-                
-                highlighted_docs.append(highlighted_doc)
+                })
             
             return highlighted_docs
             
         except Exception as e:
             logger.error(f"Error highlighting chunks: {str(e)}")
-            return documents
+            return [
+                {'id': doc.get('id'), 'page': doc.get('page'), 'highlights': [], 'highlight_count': 0}
+                for doc in documents
+            ]
     
     def _extract_key_terms(self, query: str) -> List[str]:
         """Extract key terms from query for highlighting"""
@@ -55,24 +61,18 @@ class HighlightingService:
         
         return key_terms
     
-    def _highlight_text(self, text: str, key_terms: List[str]) -> Tuple[str, List[Dict]]:
-        """Highlight key terms in text"""
-        highlights = []
-        highlighted_text = text
-        
-        for term in key_terms:
-            pattern = re.compile(re.escape(term), re.IGNORECASE)
-            matches = list(pattern.finditer(text))
-            
-            for match in matches:
-                highlights.append({
-                    'term': term,
-                    'start': match.start(),
-                    'end': match.end(),
-                    'matched_text': match.group()
-                })
-            
-            # Add HTML highlighting
-            highlighted_text = pattern.sub(f'<mark>{term}</mark>', highlighted_text)
-        
-        return highlighted_text, highlights
+    def _terms_pattern(self, key_terms: List[str]) -> Optional[re.Pattern]:
+        """One case-insensitive alternation of all terms, longest first so overlaps resolve to the longer term"""
+        if not key_terms:
+            return None
+        terms = sorted(set(key_terms), key=len, reverse=True)
+        return re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    
+    def _find_highlights(self, text: str, pattern: Optional[re.Pattern]) -> List[Dict[str, Any]]:
+        """Offsets of key term matches in text, in order of appearance"""
+        if pattern is None:
+            return []
+        return [
+            {'term': match.group().lower(), 'start': match.start(), 'end': match.end()}
+            for match in pattern.finditer(text)
+        ]
@@ -0,0 +1,177 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set
+from langchain.schema import Document
+from services.facts_store import FactsStore
+from services.pdf_processor import PDFProcessor
+from services.vector_store import VectorStoreService
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentNotFoundError(Exception):
+    """Raised when an operation targets a document_id with no stored chunks"""
+    pass
+
+
+class IngestionService:
+    def __init__(self, pdf_processor: PDFProcessor, vector_store: VectorStoreService, facts_store: Optional[FactsStore] = None):
+        self.pdf_processor = pdf_processor
+        self.vector_store = vector_store
+        self.facts_store = facts_store
+
+    def ingest_file(
+        self,
+        file_path: str,
+        filename: str,
+        document_id: str,
+        extra_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Extract, chunk and store a new PDF under document_id"""
+        pages_content = self.pdf_processor.extract_text_from_pdf(file_path)
+        documents = self.pdf_processor.process_pages(pages_content, filename, document_id)
+        self._apply_metadata(documents, extra_metadata)
+
+        self.vector_store.add_documents(documents, document_id)
+        self._store_facts(pages_content, filename, document_id)
+        return documents
+
+    def replace_document(
+        self,
+        file_path: str,
+        filename: str,
+        document_id: str,
+        extra_metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Replace a stored document with a revised PDF, re-embedding only pages whose text changed"""
+        stored_pages = self.vector_store.get_document_pages(document_id)
+        if not stored_pages:
+            raise DocumentNotFoundError(f"Document {document_id} not found")
+
+        pages_content = self.pdf_processor.extract_text_from_pdf(file_path)
+        if not pages_content:
+            raise Exception("No text content found in PDF")
+
+        # Compare page fingerprints against what is stored for this document
+        new_pages = {page_data["page_number"]: page_data for page_data in pages_content}
+        changed_pages = [
+            page_num
+            for page_num, page_data in new_pages.items()
+            if page_num not in stored_pages
+            or stored_pages[page_num]["page_hash"] != self.pdf_processor.fingerprint_page(page_data)
+            or stored_pages[page_num]["filename"] != filename
+        ]
+        removed_pages = [page_num for page_num in stored_pages if page_num not in new_pages]
+
+        if settings.chunking_strategy == "structure":
+            # Chunks may cross page boundaries, so re-chunk everything and keep what the change touched
+            all_documents = self.pdf_processor.split_into_chunks(pages_content, filename, document_id)
+            refresh_pages = self._affected_pages(set(changed_pages), all_documents, stored_pages)
+            documents = [doc for doc in all_documents if doc.metadata["page"] in refresh_pages]
+        else:
+            # Re-chunk and upsert only the changed pages; deterministic ids overwrite in place
+            refresh_pages = set(changed_pages)
+            documents = self.pdf_processor.split_into_chunks(
+                [new_pages[page_num] for page_num in sorted(changed_pages)],
+                filename,
+                document_id
+            )
+        # Document-level fields describe the revision, so every chunk gets the same values
+        revision_metadata = {"upload_date": datetime.now().isoformat(), **(extra_metadata or {})}
+        self._apply_metadata(documents, revision_metadata)
+        if documents:
+            self.vector_store.add_documents(documents, document_id)
+
+        # Drop chunks of removed pages and leftovers of changed pages that now have fewer chunks
+        new_chunk_ids = {doc.metadata["chunk_id"] for doc in documents}
+        stale_chunk_ids = [
+            chunk_id
+            for page_num in refresh_pages.union(removed_pages)
+            if page_num in stored_pages
+            for chunk_id in stored_pages[page_num]["chunk_ids"]
+            if chunk_id not in new_chunk_ids
+        ]
+        self.vector_store.delete_chunks(stale_chunk_ids)
+
+        # Chunks of unchanged pages keep their embeddings; only their document-level metadata moves on
+        kept_chunk_ids = [
+            chunk_id
+            for page_num, page_info in stored_pages.items()
+            if page_num not in refresh_pages and page_num not in removed_pages
+            for chunk_id in page_info["chunk_ids"]
+        ]
+        metadata_updated = self.vector_store.update_chunk_metadata(kept_chunk_ids, revision_metadata)
+
+        # Fact extraction is cheap, so the document's facts are simply rebuilt
+        self._store_facts(pages_content, filename, document_id)
+
+        logger.info(
+            f"Replaced document {document_id}: {len(changed_pages)} changed, "
+            f"{len(removed_pages)} removed, {len(new_pages) - len(changed_pages)} unchanged pages"
+        )
+
+        return {
+            "document_id": document_id,
+            "pages_total": len(new_pages),
+            "pages_changed": len(changed_pages),
+            "pages_removed": len(removed_pages),
+            "pages_unchanged": len(new_pages) - len(changed_pages),
+            "chunks_upserted": len(documents),
+            "chunks_deleted": len(stale_chunk_ids),
+            "chunks_metadata_updated": metadata_updated
+        }
+
+    def delete_document(self, document_id: str) -> None:
+        """Remove a document's chunks and facts"""
+        self.vector_store.delete_document(document_id)
+        if self.facts_store:
+            self.facts_store.delete_document(document_id)
+
+    def _store_facts(self, pages_content: List[Dict[str, Any]], filename: str, document_id: str) -> None:
+        if not self.facts_store:
+            return
+        try:
+            facts = self.pdf_processor.extract_facts(pages_content)
+            self.facts_store.replace_document_facts(document_id, filename, facts)
+        except Exception as e:
+            # Facts only power the fast path; chat still works from the vector store
+            logger.error(f"Error extracting facts for {filename}: {str(e)}")
+
+    @staticmethod
+    def _affected_pages(
+        changed_pages: Set[int],
+        documents: List[Document],
+        stored_pages: Dict[int, Dict[str, Any]]
+    ) -> Set[int]:
+        """Start pages whose chunks must be rewritten when structure-aware chunks span pages.
+
+        A change anywhere in a section can shift every later chunk boundary in that
+        section, so all pages of a touched section are refreshed, along with the
+        start pages of stored chunks that covered a changed page.
+        """
+        def span(doc: Document) -> range:
+            page = doc.metadata["page"]
+            return range(doc.metadata.get("page_start", page), doc.metadata.get("page_end", page) + 1)
+
+        dirty_sections = {
+            doc.metadata.get("section_index")
+            for doc in documents
+            if doc.metadata.get("chunk_type") == "text" and changed_pages.intersection(span(doc))
+        }
+
+        affected = set(changed_pages)
+        for doc in documents:
+            if doc.metadata.get("chunk_type") == "text" and doc.metadata.get("section_index") in dirty_sections:
+                affected.update(span(doc))
+        for page_num in changed_pages:
+            affected.update(stored_pages.get(page_num, {}).get("covering_pages", set()))
+
+        return affected
+
+    @staticmethod
+    def _apply_metadata(documents: List[Document], extra_metadata: Optional[Dict[str, Any]]) -> None:
+        if not extra_metadata:
+            return
+        for doc in documents:
+            doc.metadata.update(extra_metadata)
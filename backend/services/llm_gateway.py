@@ -0,0 +1,290 @@
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from google.api_core import exceptions as google_exceptions
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRIABLE_EXCEPTIONS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM cannot serve a request after retries"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRequestError(Exception):
+    """Raised when the LLM rejects a request in a way retrying will not fix (bad key, invalid request)"""
+    pass
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute; holds at most one minute of budget"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount tokens are available (requests larger than capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("priority", "sequence", "tokens", "future", "enqueued_at")
+
+    def __init__(self, priority: Priority, sequence: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.sequence = sequence
+        self.tokens = tokens
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class LLMGateway:
+    """Admission, rate limiting and retries in front of a generative model.
+
+    Requests wait in a priority queue (interactive ahead of batch) and are admitted
+    when a concurrency slot is free and both the requests-per-minute and
+    tokens-per-minute buckets allow it. Retriable errors are retried with jittered
+    exponential backoff; each attempt goes back through admission. An attempt that
+    times out keeps its slot until the model call really returns, so abandoned
+    worker threads never push concurrency past the limit.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        retry_max_delay: Optional[float] = None,
+        request_timeout: Optional[float] = None
+    ):
+        self.model = model
+        self.request_bucket = TokenBucket(requests_per_minute or settings.llm_requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute or settings.llm_tokens_per_minute)
+        self.max_concurrency = max_concurrency or settings.llm_max_concurrency
+        self.max_retries = settings.llm_max_retries if max_retries is None else max_retries
+        self.retry_base_delay = retry_base_delay or settings.llm_retry_base_delay
+        self.retry_max_delay = retry_max_delay or settings.llm_retry_max_delay
+        self.request_timeout = request_timeout or settings.llm_request_timeout
+
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "requests": 0, "completed": 0, "failed": 0, "retries": 0, "timeouts": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0
+        }
+        self._lane_stats = {priority.name.lower(): {"admitted": 0, "wait_seconds_total": 0.0} for priority in Priority}
+
+    async def generate(self, prompt: str, priority: Priority = Priority.INTERACTIVE) -> str:
+        """Generate text for prompt, raising LLMUnavailableError when retries are exhausted and LLMRequestError when the request is rejected"""
+        self.stats["requests"] += 1
+        estimated_tokens = len(prompt) // 4 + settings.max_tokens
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated_tokens)
+            # From here the slot belongs to the call and is released when the call really ends
+            call = self._start_call(prompt)
+            try:
+                response = await asyncio.wait_for(asyncio.shield(call), timeout=self.request_timeout)
+                self._reconcile_tokens(response, estimated_tokens)
+                self.stats["completed"] += 1
+                return self._response_text(response)
+            except asyncio.TimeoutError as e:
+                # An async call stops here; a call in a worker thread keeps its slot until the thread returns
+                call.cancel()
+                self.stats["timeouts"] += 1
+                last_error = e
+            except asyncio.CancelledError:
+                call.cancel()
+                raise
+            except RETRIABLE_EXCEPTIONS as e:
+                last_error = e
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"LLM call failed with non-retriable error: {str(e)}")
+                raise LLMRequestError(f"LLM request failed: {str(e)}") from e
+
+            if attempt == self.max_retries:
+                break
+            # Back off outside the concurrency slot, with full jitter
+            self.stats["retries"] += 1
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+            logger.warning(f"LLM call failed ({type(last_error).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        self.stats["failed"] += 1
+        raise LLMUnavailableError(
+            f"LLM unavailable after {self.max_retries + 1} attempts: {type(last_error).__name__}",
+            retry_after=self.retry_max_delay
+        ) from last_error
+
+    def _start_call(self, prompt: str) -> asyncio.Future:
+        """Start the model call; its concurrency slot is released when the call finishes, not when it is abandoned"""
+        loop = asyncio.get_running_loop()
+        if hasattr(self.model, "generate_content_async"):
+            call = asyncio.ensure_future(self.model.generate_content_async(prompt))
+            call.add_done_callback(lambda _: self._release())
+        else:
+            def run_in_thread() -> Any:
+                try:
+                    return self.model.generate_content(prompt)
+                finally:
+                    try:
+                        loop.call_soon_threadsafe(self._release)
+                    except RuntimeError:
+                        # Loop already closed; nothing left to admit
+                        pass
+
+            call = asyncio.ensure_future(asyncio.to_thread(run_in_thread))
+        # Calls abandoned after a timeout may still fail; mark their errors retrieved
+        call.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return call
+
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        try:
+            return (response.text or "").strip()
+        except ValueError:
+            # Blocked or empty candidates raise on .text
+            return ""
+
+    def _reconcile_tokens(self, response: Any, estimated_tokens: int) -> None:
+        """Give back the unused part of the token estimate when the model reports real usage"""
+        usage = getattr(response, "usage_metadata", None)
+        actual_tokens = getattr(usage, "total_token_count", None) if usage else None
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.token_bucket.refund(estimated_tokens - actual_tokens)
+
+    async def _acquire(self, priority: Priority, tokens: int) -> None:
+        self._ensure_dispatcher()
+        waiter = _Waiter(priority, next(self._sequence), tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, waiter)
+        self._wakeup.set()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Admitted just before cancellation: hand the slot back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release()
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        lane = self._lane_stats[priority.name.lower()]
+        lane["admitted"] += 1
+        lane["wait_seconds_total"] += waited
+        self.stats["wait_seconds_total"] += waited
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], waited)
+
+    def _release(self) -> None:
+        self._active -= 1
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._dispatcher.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch_loop())
+
+    async def _dispatch_loop(self) -> None:
+        """Admit queued requests in priority order as slots and rate budget allow"""
+        while True:
+            # Drop waiters whose callers went away
+            while self._queue and self._queue[0].future.done():
+                heapq.heappop(self._queue)
+
+            timeout = None
+            if self._queue and self._active < self.max_concurrency:
+                waiter = self._queue[0]
+                delay = max(self.request_bucket.time_until(1), self.token_bucket.time_until(waiter.tokens))
+                if delay <= 0:
+                    heapq.heappop(self._queue)
+                    self.request_bucket.consume(1)
+                    self.token_bucket.consume(waiter.tokens)
+                    self._active += 1
+                    waiter.future.set_result(None)
+                    continue
+                timeout = delay
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        queued = [waiter for waiter in self._queue if not waiter.future.done()]
+        now = time.monotonic()
+        lanes = {}
+        for priority in Priority:
+            name = priority.name.lower()
+            lane = self._lane_stats[name]
+            lane_waiters = [waiter for waiter in queued if waiter.priority == priority]
+            lanes[name] = {
+                "queue_depth": len(lane_waiters),
+                "oldest_wait_seconds": max((now - waiter.enqueued_at for waiter in lane_waiters), default=0.0),
+                "admitted": lane["admitted"],
+                "avg_wait_seconds": lane["wait_seconds_total"] / lane["admitted"] if lane["admitted"] else 0.0
+            }
+
+        return {
+            **self.stats,
+            "active": self._active,
+            "queue_depth": len(queued),
+            "lanes": lanes
+        }
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Optional
+import asyncio
+import hmac
+import os
+import re
+import time
+from services.vector_store import VectorStoreService
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Uploads are stored as "{document_id}_{original filename}"
+UPLOAD_FILE_PATTERN = re.compile(
+    r'^(?P<document_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})_.+$'
+)
+
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+
+def admin_authorized(headers: Dict[str, str]) -> bool:
+    """Whether a request may use the admin endpoints (a token is configured and matches)"""
+    if not settings.admin_token:
+        return False
+    return hmac.compare_digest(headers.get(ADMIN_TOKEN_HEADER, ""), settings.admin_token)
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files under path (0 when it does not exist)"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def remove_upload_files(document_id: str, upload_directory: Optional[str] = None, keep: Optional[str] = None) -> int:
+    """Delete the stored upload file(s) of a document, except keep; returns the number removed"""
+    upload_directory = upload_directory or settings.upload_directory
+    removed = 0
+    try:
+        names = os.listdir(upload_directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(upload_directory, name)
+        if name.startswith(f"{document_id}_") and path != keep:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+    return removed
+
+
+class MaintenanceService:
+    """Periodic storage upkeep: orphaned upload files and vector index compaction"""
+
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        upload_directory: Optional[str] = None,
+        interval_seconds: Optional[float] = None
+    ):
+        self.vector_store = vector_store
+        self.upload_directory = upload_directory or settings.upload_directory
+        self.interval_seconds = interval_seconds or settings.maintenance_interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "runs": 0,
+            "orphan_files_removed": 0,
+            "orphan_bytes_reclaimed": 0,
+            "compactions": 0,
+            "last_run_at": None,
+            "last_error": None
+        }
+        # Directory sizes as of the last pass; walking them per metrics call would block the caller
+        self.disk_usage: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._task is None and settings.maintenance_enabled:
+            self._task = asyncio.ensure_future(self._run_periodically())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self) -> None:
+        await asyncio.to_thread(self.measure_disk_usage)
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Storage maintenance failed: {str(e)}")
+
+    async def run_once(self, force_compaction: bool = False) -> Dict[str, Any]:
+        """Run one maintenance pass off the event loop; concurrent calls wait for the running pass"""
+        async with self._lock:
+            try:
+                return await asyncio.to_thread(self._run_once, force_compaction)
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                raise
+
+    def _run_once(self, force_compaction: bool) -> Dict[str, Any]:
+        result = {"orphans": self.collect_orphan_uploads(), "compaction": None}
+        result["stale_collections_dropped"] = self.vector_store.drop_stale_collections()
+
+        deleted = self.vector_store.deleted_since_compaction
+        fraction = self.vector_store.deleted_fraction()
+        if force_compaction or (
+            deleted >= settings.compaction_min_deleted
+            and fraction >= settings.compaction_deleted_fraction
+        ):
+            logger.info(f"Compacting vector index: {deleted} deleted entries ({fraction:.0%})")
+            result["compaction"] = self.vector_store.compact()
+            self.stats["compactions"] += 1
+
+        self.measure_disk_usage()
+        self.stats["runs"] += 1
+        self.stats["last_run_at"] = time.time()
+        self.stats["last_error"] = None
+        return result
+
+    def collect_orphan_uploads(self) -> Dict[str, int]:
+        """Delete upload files whose document has no chunks, and abandoned .partial staging files"""
+        try:
+            names = os.listdir(self.upload_directory)
+        except FileNotFoundError:
+            return {"files_removed": 0, "bytes_reclaimed": 0}
+
+        document_ids = self.vector_store.get_document_ids()
+        cutoff = time.time() - settings.maintenance_orphan_grace_seconds
+        removed, reclaimed = 0, 0
+
+        for name in names:
+            match = UPLOAD_FILE_PATTERN.match(name)
+            if not match:
+                continue
+            path = os.path.join(self.upload_directory, name)
+            try:
+                stat = os.stat(path)
+                # Young files may belong to an upload that is still being processed
+                if stat.st_mtime > cutoff:
+                    continue
+                if name.endswith(".partial") or match.group("document_id") not in document_ids:
+                    os.remove(path)
+                    removed += 1
+                    reclaimed += stat.st_size
+            except FileNotFoundError:
+                continue
+
+        if removed:
+            logger.info(f"Removed {removed} orphaned upload files ({reclaimed} bytes)")
+        self.stats["orphan_files_removed"] += removed
+        self.stats["orphan_bytes_reclaimed"] += reclaimed
+        return {"files_removed": removed, "bytes_reclaimed": reclaimed}
+
+    def measure_disk_usage(self) -> Dict[str, Any]:
+        """Walk the storage directories and remember their sizes"""
+        self.disk_usage = {
+            "uploads": directory_size(self.upload_directory),
+            "vector_store": directory_size(self.vector_store.persist_directory),
+            "facts": os.path.getsize(settings.facts_db_path) if os.path.exists(settings.facts_db_path) else 0,
+            "chart_cache": directory_size(settings.chart_cache_directory),
+            "measured_at": time.time()
+        }
+        return self.disk_usage
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "running": self._lock.locked(),
+            "disk_usage_bytes": self.disk_usage,
+            "vector_store": {
+                "collection": self.vector_store.collection_name,
+                "deleted_since_compaction": self.vector_store.deleted_since_compaction,
+                "deleted_fraction": self.vector_store.deleted_fraction(),
+                "last_compaction": self.vector_store.last_compaction
+            }
+        }
@@ -0,0 +1,203 @@
+from typing import List, Dict, Any, Optional, Set
+import re
+import fitz  # PyMuPDF
+import PyPDF2
+import pdfplumber
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A token such as 1,234 / (5,678) / 12.5% / -42
+NUMERIC_TOKEN_PATTERN = re.compile(r'^\(?-?[$€£]?\d[\d,]*(\.\d+)?%?\)?$')
+
+
+class PDFExtractor:
+    """Base class for page-wise PDF text extractors"""
+    name = "base"
+
+    def extract(self, file_path: str, page_numbers: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        """Return page-wise content for all pages, or only for the given 1-based page numbers"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _page_entry(page_num: int, text: str, tables: List[Dict[str, Any]], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "page_number": page_num,
+            "content": text.strip() if text else "",
+            "tables": tables,
+            "metadata": metadata
+        }
+
+
+class PdfPlumberExtractor(PDFExtractor):
+    """Layout-aware extractor; slowest backend but the only one that finds tables"""
+    name = "pdfplumber"
+
+    def extract(self, file_path: str, page_numbers: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        pages_content = []
+        pages = sorted(page_numbers) if page_numbers else None
+
+        with pdfplumber.open(file_path, pages=pages) as pdf:
+            for page in pdf.pages:
+                tables = self._extract_tables_from_page(page) if settings.extract_tables else []
+
+                # Keep table cells out of the prose so numbers are not indexed twice
+                text_page = page
+                for table in tables:
+                    text_page = text_page.outside_bbox(table["bbox"])
+                text = text_page.extract_text()
+
+                if (text and text.strip()) or tables:
+                    pages_content.append(self._page_entry(page.page_number, text, tables, {
+                        "page_width": page.width,
+                        "page_height": page.height,
+                        "rotation": page.rotation if hasattr(page, 'rotation') else 0
+                    }))
+
+        return pages_content
+
+    def _extract_tables_from_page(self, page) -> List[Dict[str, Any]]:
+        """Find tables on a pdfplumber page and return them as header/rows structures"""
+        tables = []
+
+        try:
+            found_tables = page.find_tables()
+        except Exception as e:
+            logger.warning(f"Table detection failed on page {page.page_number}: {str(e)}")
+            return tables
+
+        for table in found_tables:
+            rows = [
+                [self._clean_cell(cell) for cell in row]
+                for row in table.extract()
+            ]
+            # Drop rows without any content
+            rows = [row for row in rows if any(row)]
+
+            if not rows or len(rows) < settings.table_min_rows or max(len(row) for row in rows) < 2:
+                continue
+
+            tables.append({
+                "header": rows[0],
+                "rows": rows[1:],
+                "bbox": tuple(table.bbox)
+            })
+
+        return tables
+
+    @staticmethod
+    def _clean_cell(cell: Any) -> str:
+        """Normalize a table cell to a single-line string"""
+        if cell is None:
+            return ""
+        return " ".join(str(cell).split())
+
+
+class PyMuPDFExtractor(PDFExtractor):
+    """Fast plain-text extractor backed by MuPDF"""
+    name = "pymupdf"
+
+    def extract(self, file_path: str, page_numbers: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        pages_content = []
+
+        with fitz.open(file_path) as pdf:
+            for page_index in range(pdf.page_count):
+                page_num = page_index + 1
+                if page_numbers and page_num not in page_numbers:
+                    continue
+
+                page = pdf.load_page(page_index)
+                text = page.get_text("text", sort=True)
+
+                if text and text.strip():
+                    pages_content.append(self._page_entry(page_num, text, [], {
+                        "page_width": page.rect.width,
+                        "page_height": page.rect.height,
+                        "rotation": page.rotation
+                    }))
+
+        return pages_content
+
+
+class PyPDF2Extractor(PDFExtractor):
+    """Pure-Python extractor kept as the last-resort fallback"""
+    name = "pypdf2"
+
+    def extract(self, file_path: str, page_numbers: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        pages_content = []
+
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                if page_numbers and page_num not in page_numbers:
+                    continue
+
+                text = page.extract_text()
+                if text and text.strip():
+                    pages_content.append(self._page_entry(page_num, text, [], {}))
+
+        return pages_content
+
+
+class AutoExtractor(PDFExtractor):
+    """PyMuPDF for every page, re-extracting only table-heavy pages with pdfplumber"""
+    name = "auto"
+
+    def __init__(self):
+        self.fast_extractor = PyMuPDFExtractor()
+        self.table_extractor = PdfPlumberExtractor()
+
+    def extract(self, file_path: str, page_numbers: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        pages_content = self.fast_extractor.extract(file_path, page_numbers)
+
+        if not settings.extract_tables:
+            return pages_content
+
+        table_pages = {
+            page_data["page_number"]
+            for page_data in pages_content
+            if is_table_heavy(page_data["content"])
+        }
+        if not table_pages:
+            return pages_content
+
+        logger.info(f"Re-extracting {len(table_pages)} table-heavy pages of {file_path} with pdfplumber")
+        layout_pages = {
+            page_data["page_number"]: page_data
+            for page_data in self.table_extractor.extract(file_path, table_pages)
+        }
+
+        return [
+            layout_pages.get(page_data["page_number"], page_data)
+            for page_data in pages_content
+        ]
+
+
+def is_table_heavy(text: str) -> bool:
+    """Heuristic: a page is table-heavy when enough lines carry two or more numeric columns"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < settings.table_page_min_lines:
+        return False
+
+    numeric_lines = 0
+    for line in lines:
+        numeric_tokens = sum(1 for token in line.split() if NUMERIC_TOKEN_PATTERN.match(token))
+        if numeric_tokens >= 2:
+            numeric_lines += 1
+
+    return numeric_lines / len(lines) >= settings.table_page_numeric_ratio
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (PdfPlumberExtractor, PyMuPDFExtractor, PyPDF2Extractor, AutoExtractor)
+}
+
+
+def get_extractor(name: str) -> PDFExtractor:
+    """Create the extractor registered under the given backend name"""
+    try:
+        return EXTRACTORS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Unknown PDF extractor backend: {name}. Available: {', '.join(EXTRACTORS)}")
@@ -1,19 +1,49 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import hashlib
+import re
 import uuid
-import PyPDF2
-import pdfplumber
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from services.chunking import StructureAwareChunker
+from services.facts_store import is_specific_line_item, normalize_line_item
+from services.pdf_extractors import NUMERIC_TOKEN_PATTERN, PDFExtractor, PyPDF2Extractor, get_extractor
 from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+YEAR_PATTERN = re.compile(r'(?<!\d)(19|20)\d{2}(?!\d)')
+SUB_PERIOD_PATTERN = re.compile(r'\b(Q[1-4]|H[12])\b', re.IGNORECASE)
+
+
+def parse_number(token: str) -> Optional[float]:
+    """Parse a statement figure such as 1,234 / (1,234) / -12.5% into a float"""
+    token = token.strip()
+    if not NUMERIC_TOKEN_PATTERN.match(token):
+        return None
+    negative = (token.startswith("(") and token.endswith(")")) or token.lstrip("(").startswith("-")
+    digits = re.sub(r'[^\d.]', '', token)
+    if not digits or digits == ".":
+        return None
+    value = float(digits)
+    return -value if negative else value
+
+
+def parse_period(text: str) -> Optional[str]:
+    """Period label from a column header: "2023", or "2023-Q1" / "2023-H1" for sub-annual columns"""
+    years = [match.group(0) for match in YEAR_PATTERN.finditer(text)]
+    if not years or len(years) > 1:
+        return None
+    sub_period = SUB_PERIOD_PATTERN.search(text)
+    return f"{years[0]}-{sub_period.group(1).upper()}" if sub_period else years[0]
+
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, extractor: Optional[PDFExtractor] = None):
+        self.extractor = extractor or get_extractor(settings.pdf_extractor)
+        self.fallback_extractor = PyPDF2Extractor()
+        self.structure_chunker = StructureAwareChunker() if settings.chunking_strategy == "structure" else None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap,
@@ -23,91 +53,277 @@ class PDFProcessor:
     
     def extract_text_from_pdf(self, file_path: str) -> List[Dict[str, Any]]:
         """Extract text from PDF and return page-wise content"""
-        pages_content = []
-        
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text and text.strip():
-                        pages_content.append({
-                            "page_number": page_num,
-                            "content": text.strip(),
-                            "metadata": {
-                                "page_width": page.width,
-                                "page_height": page.height,
-                                "rotation": page.rotation if hasattr(page, 'rotation') else 0
-                            }
-                        })
+            pages_content = self.extractor.extract(file_path)
         except Exception as e:
-            logger.warning(f"pdfplumber failed for {file_path}, trying PyPDF2: {str(e)}")
+            logger.warning(f"{self.extractor.name} failed for {file_path}, trying PyPDF2: {str(e)}")
             
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page_num, page in enumerate(pdf_reader.pages, 1):
-                        text = page.extract_text()
-                        if text and text.strip():
-                            pages_content.append({
-                                "page_number": page_num,
-                                "content": text.strip(),
-                                "metadata": {}
-                            })
+                pages_content = self.fallback_extractor.extract(file_path)
             except Exception as e2:
                 logger.error(f"Both PDF extraction methods failed for {file_path}: {str(e2)}")
                 raise Exception(f"Failed to extract text from PDF: {str(e2)}")
         
         return pages_content
+    
+    def _table_to_text(self, header: List[str], rows: List[List[str]]) -> str:
+        """Render a table so every value keeps its row and column headers"""
+        column_headers = [h or f"Column {idx}" for idx, h in enumerate(header[1:], 1)]
+        lines = [" | ".join(header)]
+        
+        for row in rows:
+            row_label = row[0] if row else ""
+            values = []
+            for col_header, value in zip(column_headers, row[1:]):
+                if value:
+                    values.append(f"{col_header}: {value}")
+            if values:
+                lines.append(f"{row_label} | " + " | ".join(values) if row_label else " | ".join(values))
+            elif row_label:
+                # Section label rows such as "Current assets" carry no values
+                lines.append(row_label)
+        
+        return "\n".join(lines)
+    
+    def split_table_into_chunks(self, table: Dict[str, Any]) -> List[str]:
+        """Render a table as one chunk, splitting by rows (header repeated) only when too large"""
+        header = table["header"]
+        rows = table["rows"]
+        
+        table_text = self._table_to_text(header, rows)
+        if len(table_text) <= settings.chunk_size:
+            return [table_text]
+        
+        chunks = []
+        current_rows = []
+        for row in rows:
+            candidate = self._table_to_text(header, current_rows + [row])
+            if current_rows and len(candidate) > settings.chunk_size:
+                chunks.append(self._table_to_text(header, current_rows))
+                current_rows = []
+            current_rows.append(row)
+        
+        if current_rows:
+            chunks.append(self._table_to_text(header, current_rows))
         
+        return chunks
     
-    def split_into_chunks(self, pages_content: List[Dict[str, Any]], filename: str) -> List[Document]:
+    @staticmethod
+    def fingerprint_page(page_data: Dict[str, Any]) -> str:
+        """Hash a page's extracted text and tables so revisions can be diffed page by page"""
+        hasher = hashlib.sha256(page_data["content"].encode("utf-8"))
+        for table in page_data.get("tables", []):
+            for row in [table["header"]] + table["rows"]:
+                hasher.update("\x1f".join(row).encode("utf-8"))
+        return hasher.hexdigest()
+    
+    @staticmethod
+    def make_chunk_id(document_id: Optional[str], page: int, chunk_index: int) -> str:
+        """Deterministic chunk id (document/page/chunk_index) so re-ingesting upserts in place"""
+        if not document_id:
+            return str(uuid.uuid4())
+        return f"{document_id}:{page}:{chunk_index}"
+    
+    def _split_text(
+        self, 
+        pages_content: List[Dict[str, Any]], 
+        page_hashes: Dict[int, str]
+    ) -> Dict[int, List[Tuple[str, Dict[str, Any]]]]:
+        """Split prose with the configured strategy, grouping chunks by the page they start on"""
+        text_chunks = {}
+        
+        if settings.chunking_strategy == "structure":
+            for chunk in self.structure_chunker.chunk(pages_content):
+                span = range(chunk["page_start"], chunk["page_end"] + 1)
+                text_chunks.setdefault(chunk["page_start"], []).append((chunk["text"], {
+                    "page_start": chunk["page_start"],
+                    "page_end": chunk["page_end"],
+                    "section": chunk["section"],
+                    "section_index": chunk["section_index"],
+                    # Fingerprints of every page the chunk covers, for incremental replacement
+                    "span_page_hashes": ",".join(
+                        f"{page}:{page_hashes[page]}" for page in span if page in page_hashes
+                    )
+                }))
+            return text_chunks
+        
+        for page_data in pages_content:
+            page_num = page_data["page_number"]
+            content = page_data["content"]
+            if not content:
+                continue
+            
+            text_chunks[page_num] = [
+                (chunk, {"page_start": page_num, "page_end": page_num})
+                for chunk in self.text_splitter.split_text(content)
+            ]
+        
+        return text_chunks
+    
+    def split_into_chunks(
+        self, 
+        pages_content: List[Dict[str, Any]], 
+        filename: str, 
+        document_id: Optional[str] = None
+    ) -> List[Document]:
         """Split page content into chunks"""
         documents = []
+        page_hashes = {
+            page_data["page_number"]: self.fingerprint_page(page_data)
+            for page_data in pages_content
+        }
+        text_chunks = self._split_text(pages_content, page_hashes)
+        
         for page_data in pages_content:
             page_num = page_data["page_number"]
-            content = page_data["content"]
-            page_metadata = page_data["metadata"]
+            page_metadata = {
+                **page_data["metadata"],
+                "page_hash": page_hashes[page_num]
+            }
             
-            # Split page content into chunks
-            chunks = self.text_splitter.split_text(content)
+            # Prose chunks that start on this page
+            chunks = text_chunks.get(page_num, [])
+            page_documents = []
             
-            for chunk_idx, chunk in enumerate(chunks):
+            for chunk_idx, (chunk, chunk_metadata) in enumerate(chunks):
                 if chunk.strip():  # Only add non-empty chunks
                     doc_metadata = {
                         "filename": filename,
                         "page": page_num,
                         "chunk_index": chunk_idx,
-                        "total_chunks_in_page": len(chunks),
-                        "chunk_id": str(uuid.uuid4()),
+                        "chunk_id": self.make_chunk_id(document_id, page_num, chunk_idx),
+                        "chunk_type": "text",
                         "upload_date": datetime.now().isoformat(),
+                        **chunk_metadata,
                         **page_metadata
                     }
                     
-                    documents.append(Document(
+                    page_documents.append(Document(
                         page_content=chunk,
                         metadata=doc_metadata
                     ))
+            
+            # Each table becomes its own structured chunk, indexed after the prose chunks
+            table_chunk_idx = len(chunks)
+            for table_idx, table in enumerate(page_data.get("tables", [])):
+                table_chunks = self.split_table_into_chunks(table)
+                
+                for part_idx, table_chunk in enumerate(table_chunks):
+                    doc_metadata = {
+                        "filename": filename,
+                        "page": page_num,
+                        "chunk_index": table_chunk_idx,
+                        "chunk_id": self.make_chunk_id(document_id, page_num, table_chunk_idx),
+                        "chunk_type": "table",
+                        "page_start": page_num,
+                        "page_end": page_num,
+                        "table_index": table_idx,
+                        "table_part": part_idx,
+                        "table_columns": " | ".join(table["header"]),
+                        "table_rows": len(table["rows"]),
+                        "upload_date": datetime.now().isoformat(),
+                        **page_metadata
+                    }
+                    
+                    page_documents.append(Document(
+                        page_content=table_chunk,
+                        metadata=doc_metadata
+                    ))
+                    table_chunk_idx += 1
+            
+            # Counted once prose and table chunks of the page are combined
+            for document in page_documents:
+                document.metadata["total_chunks_in_page"] = len(page_documents)
+            documents.extend(page_documents)
+        
+        return documents
+    
+    def extract_facts(self, pages_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Extract line item / period / value facts from tables and statement-like text rows"""
+        facts = []
         
+        for page_data in pages_content:
+            page_num = page_data["page_number"]
+            
+            for table in page_data.get("tables", []):
+                periods = [parse_period(cell) for cell in table["header"][1:]]
+                for row in table["rows"]:
+                    label = row[0] if row else ""
+                    if not is_specific_line_item(normalize_line_item(label)):
+                        continue
+                    for period, cell in zip(periods, row[1:]):
+                        value = parse_number(cell) if period else None
+                        if value is not None:
+                            facts.append(self._fact(page_num, label, period, value, cell, "table"))
+            
+            # Text rows: values map onto the most recent "2023 2022" style header on the page
+            periods: List[str] = []
+            for line in page_data["content"].splitlines():
+                tokens = line.split()
+                year_tokens = [parse_period(token) for token in tokens if YEAR_PATTERN.fullmatch(token)]
+                if len(year_tokens) >= 2 and len(year_tokens) == sum(1 for t in tokens if NUMERIC_TOKEN_PATTERN.match(t)):
+                    periods = year_tokens
+                    continue
+                if not periods:
+                    continue
+                
+                values = []
+                while tokens and NUMERIC_TOKEN_PATTERN.match(tokens[-1]):
+                    values.insert(0, tokens.pop())
+                label = " ".join(tokens).strip(" .:")
+                if not values and line.rstrip().endswith("."):
+                    # A sentence ends the statement the header belongs to
+                    periods = []
+                    continue
+                
+                # One value per year column, plus at most one leading note reference
+                if not len(periods) <= len(values) <= len(periods) + 1:
+                    continue
+                if any(NUMERIC_TOKEN_PATTERN.match(token) for token in tokens):
+                    continue
+                if not is_specific_line_item(normalize_line_item(label)):
+                    continue
+                
+                for period, raw_value in zip(periods, values[-len(periods):]):
+                    value = parse_number(raw_value)
+                    if value is not None:
+                        facts.append(self._fact(page_num, label, period, value, raw_value, "text"))
+        
+        return facts
+    
+    @staticmethod
+    def _fact(page: int, line_item: str, period: Optional[str], value: float, raw_value: str, source: str) -> Dict[str, Any]:
+        return {
+            "page": page,
+            "line_item": line_item,
+            "period": period,
+            "value": value,
+            "raw_value": raw_value,
+            "source": source
+        }
+    
+    def process_pages(self, pages_content: List[Dict[str, Any]], filename: str, document_id: Optional[str] = None) -> List[Document]:
+        """Chunk already-extracted pages and return list of Document objects"""
+        if not pages_content:
+            raise Exception("No text content found in PDF")
+        
+        # Split text into chunks
+        documents = self.split_into_chunks(pages_content, filename, document_id)
+        
+        if not documents:
+            raise Exception("No document chunks created")
+        
+        logger.info(f"Successfully processed {filename}: {len(pages_content)} pages, {len(documents)} chunks")
         return documents
     
-    def process_pdf(self, file_path: str, filename: str) -> List[Document]:
+    def process_pdf(self, file_path: str, filename: str, document_id: Optional[str] = None) -> List[Document]:
         """Process PDF file and return list of Document objects"""
         try:
             # Extract text from PDF
             pages_content = self.extract_text_from_pdf(file_path)
             
-            if not pages_content:
-                raise Exception("No text content found in PDF")
-            
-            # Split text into chunks
-            documents = self.split_into_chunks(pages_content, filename)
-            
-            if not documents:
-                raise Exception("No document chunks created")
-            
-            logger.info(f"Successfully processed {filename}: {len(pages_content)} pages, {len(documents)} chunks")
-            return documents
+            return self.process_pages(pages_content, filename, document_id)
             
         except Exception as e:
             logger.error(f"Error processing PDF {filename}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,380 @@
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import cProfile
+import functools
+import hmac
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN_HEADER = "x-profile-token"
+
+# Python frames a thread sits in while blocked waiting for work; such samples are not counted
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+STDLIB_DIRECTORY = os.path.dirname(os.__file__)
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+def profiling_authorized(headers: Dict[str, str]) -> bool:
+    """Whether a request may use the profiling surface (enabled, and token matches when one is set)"""
+    if not settings.profiling_enabled:
+        return False
+    if not settings.profiling_token:
+        return True
+    return hmac.compare_digest(headers.get(PROFILE_TOKEN_HEADER, ""), settings.profiling_token)
+
+
+def frame_label(code) -> str:
+    """Flamegraph frame name: function (file:first line)"""
+    filename = code.co_filename
+    marker = filename.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        filename = filename[marker + len("site-packages") + 1:]
+    elif filename.startswith(STDLIB_DIRECTORY):
+        filename = os.path.relpath(filename, STDLIB_DIRECTORY)
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class RequestProfile:
+    """cProfile capture of a single request, merged across the threads it ran on"""
+
+    def __init__(self, method: str, path: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.status_code: Optional[int] = None
+        self.stats: Optional[pstats.Stats] = None
+        self._profile = cProfile.Profile()
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+
+    def add_thread_profile(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self._thread_profiles.append(profile)
+
+    def finish(self) -> None:
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+        self.stats = stats
+        self._profile = None
+        self._thread_profiles = []
+
+    def to_pstats(self) -> bytes:
+        """Same bytes as Stats.dump_stats, loadable with pstats, snakeviz, etc."""
+        return marshal.dumps(self.stats.stats)
+
+    def to_text(self, sort: str = "cumulative", limit: int = 60) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.add(self.stats)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "function_calls": self.stats.total_calls if self.stats else 0
+        }
+
+
+def profile_thread_work(func: Callable) -> Callable:
+    """Wrap func so that, when the calling request is being profiled, its run in a worker thread is included"""
+    request_profile = _active_profile.get()
+    if request_profile is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows only one active cProfile per process
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            request_profile.add_thread_profile(profile)
+
+    return wrapper
+
+
+class RequestProfileStore:
+    """Most recent request profiles, kept in memory for download"""
+
+    def __init__(self, max_profiles: Optional[int] = None):
+        self.max_profiles = max_profiles or settings.profiling_max_profiles
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        # cProfile cannot nest on a thread, so one request is profiled at a time
+        self._busy = threading.Lock()
+        self.stats = {"captured": 0, "skipped_busy": 0}
+
+    def try_begin(self) -> bool:
+        if self._busy.acquire(blocking=False):
+            return True
+        self.stats["skipped_busy"] += 1
+        return False
+
+    def end(self, profile: RequestProfile) -> None:
+        try:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            self.stats["captured"] += 1
+        finally:
+            self._busy.release()
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "stored": len(self._profiles)}
+
+
+class ProfilingMiddleware:
+    """Profiles a request with cProfile when it carries an X-Profile header.
+
+    The profile runs on the event loop thread for the whole request, so work of
+    other requests interleaved on the loop in that time is included as well.
+    The profile id is returned in the X-Profile-Id response header.
+    """
+
+    def __init__(self, app: ASGIApp, store: RequestProfileStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.profiling_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if PROFILE_HEADER not in headers or not profiling_authorized(headers):
+            await self.app(scope, receive, send)
+            return
+
+        if not self.store.try_begin():
+            await self.app(scope, receive, self._with_header(send, b"x-profile-status", b"busy"))
+            return
+
+        request_profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                request_profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", request_profile.id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = _active_profile.set(request_profile)
+        start = time.perf_counter()
+        try:
+            request_profile.start()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                request_profile.stop()
+                request_profile.duration = time.perf_counter() - start
+                _active_profile.reset(token)
+                request_profile.finish()
+        finally:
+            self.store.end(request_profile)
+        logger.info(f"Profiled {scope['method']} {scope['path']} ({request_profile.duration:.3f}s) as {request_profile.id}")
+
+    @staticmethod
+    def _with_header(send: Send, name: bytes, value: bytes) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(name, value)]
+            await send(message)
+        return wrapped
+
+
+class StackSampler:
+    """Background thread that samples every thread's Python stack at a fixed interval.
+
+    Samples are aggregated per time bucket so the hottest stacks of the last
+    window_seconds can be reported or exported as collapsed stacks for
+    flamegraph.pl / speedscope.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        window_seconds: Optional[float] = None,
+        bucket_seconds: float = 10.0,
+        max_depth: int = 128
+    ):
+        self.interval = interval or settings.profiling_sampler_interval
+        self.window_seconds = window_seconds or settings.profiling_sampler_window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.max_depth = max_depth
+        self._buckets: Deque[Tuple[float, Counter]] = deque()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._thread_names: Dict[int, str] = {}
+        self.stats = {"samples": 0, "stacks_recorded": 0, "sample_seconds_total": 0.0, "started_at": None}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        self.stats["started_at"] = time.time()
+        logger.info(f"Stack sampler started ({self.interval * 1000:.0f}ms interval)")
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info("Stack sampler stopped")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            try:
+                self._sample(own_id)
+            except Exception as e:
+                logger.error(f"Stack sampling failed: {str(e)}")
+            self.stats["sample_seconds_total"] += time.perf_counter() - start
+
+    def _sample(self, own_id: int) -> None:
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            codes = []
+            while frame is not None and len(codes) < self.max_depth:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+            stacks.append((self._thread_name(thread_id),) + tuple(codes))
+
+        now = time.time()
+        with self._lock:
+            if not self._buckets or now - self._buckets[-1][0] >= self.bucket_seconds:
+                self._buckets.append((now, Counter()))
+            while self._buckets and now - self._buckets[0][0] > self.window_seconds + self.bucket_seconds:
+                self._buckets.popleft()
+            self._buckets[-1][1].update(stacks)
+        self.stats["samples"] += 1
+        self.stats["stacks_recorded"] += len(stacks)
+
+    def _thread_name(self, thread_id: int) -> str:
+        name = self._thread_names.get(thread_id)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(thread_id, f"thread-{thread_id}")
+        return name
+
+    def _window_counts(self, window_seconds: Optional[float]) -> Counter:
+        cutoff = time.time() - (window_seconds or self.window_seconds)
+        totals = Counter()
+        with self._lock:
+            for bucket_start, counts in self._buckets:
+                if bucket_start + self.bucket_seconds >= cutoff:
+                    totals.update(counts)
+        return totals
+
+    def collapsed(self, window_seconds: Optional[float] = None) -> str:
+        """Brendan Gregg's collapsed stack format: 'thread;outer;...;inner count' per line"""
+        labels: Dict[Any, str] = {}
+        lines = []
+        for stack, count in self._window_counts(window_seconds).most_common():
+            frames = [stack[0]] + [labels.setdefault(code, frame_label(code)) for code in stack[1:]]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def hottest(self, window_seconds: Optional[float] = None, limit: int = 20) -> Dict[str, Any]:
+        """Frames ranked by samples where they are on top of the stack (self) and anywhere in it (total)"""
+        counts = self._window_counts(window_seconds)
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in counts.items():
+            codes = stack[1:]
+            if codes:
+                self_counts[codes[-1]] += count
+            for code in set(codes):
+                total_counts[code] += count
+
+        samples = sum(counts.values())
+
+        def ranked(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"frame": frame_label(code), "samples": count, "fraction": count / samples}
+                for code, count in counter.most_common(limit)
+            ]
+
+        return {
+            "window_seconds": window_seconds or self.window_seconds,
+            "stack_samples": samples,
+            "self": ranked(self_counts),
+            "total": ranked(total_counts)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        samples = self.stats["samples"]
+        return {
+            **self.stats,
+            "running": self.running,
+            "interval": self.interval,
+            "window_seconds": self.window_seconds,
+            "avg_sample_ms": self.stats["sample_seconds_total"] / samples * 1000 if samples else 0.0
+        }
@@ -1,6 +1,16 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import re
+import time
+import numpy as np
 from langchain.schema import Document
 from models.schemas import DocumentSource
+from services.facts_store import FactsStore, is_specific_line_item, normalize_line_item
+from services.llm_gateway import LLMGateway, Priority
+from services.session_retrieval import (
+    SessionRetrievalCache, SessionRetrievalState, condense_follow_up, is_follow_up, query_references
+)
 from services.vector_store import VectorStoreService
 from config import settings
 import logging
@@ -8,14 +18,54 @@ import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
+# Questions with these words need reasoning over context, not a single figure ("how much/many" asks for one)
+REASONING_PATTERN = re.compile(
+    r'\b(why|how(?!\s+(much|many)\b)|explain|compare|comparison|versus|vs|trend|change|changed|growth|grow|difference|'
+    r'analy[sz]e|analysis|impact|cause|should|ratio|margin|calculate|percent|percentage|summar\w*|between)\b',
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r'(?<!\d)(19|20)\d{2}(?!\d)')
+# Only questions that ask for a figure outright may skip the LLM
+FIGURE_QUESTION_PATTERN = re.compile(
+    r'^\s*(what\s+(was|were|is|are)|what\'s|how\s+(much|many))\b',
+    re.IGNORECASE
+)
+# Words a figure question wraps around the line item; the rest must be covered by the matched line item
+QUESTION_FILLER_WORDS = {
+    "what", "was", "were", "is", "are", "s", "how", "much", "many", "did", "does", "do", "the", "a", "an",
+    "in", "for", "of", "on", "at", "during", "as", "year", "fiscal", "financial", "fy", "our", "their", "its",
+    "company", "group", "reported", "amount", "value", "figure"
+}
+MIN_LINE_ITEM_COVERAGE = 0.6
+
 
 class RAGPipeline:
-    def __init__(self, vector_store: VectorStoreService):
+    def __init__(
+        self, 
+        vector_store: VectorStoreService, 
+        facts_store: Optional[FactsStore] = None, 
+        model: Optional[Any] = None
+    ):
         self.vector_store = vector_store
+        self.facts_store = facts_store
+        self.session_cache = SessionRetrievalCache()
+        self.stats = {
+            "fact_answers": 0,
+            "retrievals": 0,
+            "retrieval_skipped": 0,
+            "retrieval_narrowed": 0,
+            "follow_ups_condensed": 0,
+            "retrieval_seconds_saved": 0.0
+        }
+        # Moving average of a vector search, used to estimate the time saved by reuse
+        self._search_seconds_avg: Optional[float] = None
         
         # Configure Google Gemini
-        genai.configure(api_key=settings.google_api_key)
-        self.model = genai.GenerativeModel(settings.llm_model)
+        if model is None:
+            genai.configure(api_key=settings.google_api_key)
+            model = genai.GenerativeModel(settings.llm_model)
+        self.model = model
+        self.llm_gateway = LLMGateway(self.model)
         
         # System prompt template
         self.system_prompt = """You are a financial analyst assistant. Deliver precise analysis based on the provided financial documents.
@@ -37,41 +87,264 @@ Previous conversation (if any):
 {chat_history}
 Question: {question}"""
 
-    async def generate_answer(self, question: str, chat_history: List[Dict[str, str]] = None) -> Dict[str, Any]:
+    @staticmethod
+    def coalescing_key(
+        question: str, 
+        document_ids: Optional[List[str]] = None, 
+        chat_history: List[Dict[str, str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> str:
+        """Key under which identical in-flight questions share one answer.
+
+        The recent history is part of the key because it goes into the prompt; fresh
+        sessions asking the same question (the common burst case) all coalesce. Batch
+        runs get their own key so interactive callers never wait in the batch lane.
+        """
+        normalized_question = " ".join(question.lower().split()).rstrip("?.! ")
+        scope = ",".join(sorted(document_ids)) if document_ids else "*"
+        history = "\n".join(
+            f"{exchange.get('role', 'user')}:{exchange.get('content', '')}"
+            for exchange in (chat_history or [])[-10:]
+        )
+        history_digest = hashlib.sha256(history.encode("utf-8")).hexdigest()[:16] if history else ""
+        return f"{priority.name.lower()}|{scope}|{history_digest}|{normalized_question}"
+    
+    async def generate_answer(
+        self, 
+        question: str, 
+        chat_history: List[Dict[str, str]] = None, 
+        document_ids: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """Generate answer using RAG pipeline"""
         try:
+            # Previous turn of this session, if it searched the same documents
+            state = self.session_cache.get(session_id) if settings.session_retrieval_enabled else None
+            if state and state.document_ids != (sorted(document_ids) if document_ids else None):
+                state = None
+            
+            # Follow-ups ("and the prior year?") become standalone queries for retrieval only
+            search_query = question
+            if state and is_follow_up(question):
+                search_query = condense_follow_up(question, state.standalone_query)
+                self.stats["follow_ups_condensed"] += 1
+                logger.info(f"Condensed follow-up into: {search_query}")
+            
+            # Direct KPI lookups are answered from the facts table without the LLM; a rewritten
+            # follow-up is a guess, so only a question that stands on its own may skip the LLM.
+            # SQLite, embedding and Chroma calls run in threads so they never block the event loop
+            fact_answer = await asyncio.to_thread(self._answer_from_facts, question, document_ids)
+            if fact_answer:
+                self._remember_query(session_id, state, search_query, document_ids)
+                fact_answer["session_state"] = self.session_cache.get(session_id)
+                return fact_answer
+            
             # Retrieve relevant documents
-            relevant_docs = await self._retrieve_documents(question)
+            relevant_docs = await self._retrieve_documents(search_query, document_ids, session_id, state)
             
             # Generate context from retrieved documents
             context = self._generate_context(relevant_docs)
             
             # Generate answer using LLM
-            answer = self._generate_llm_response(question, context, chat_history)
+            answer = await self._generate_llm_response(question, context, chat_history, priority)
             
             # Prepare sources
             sources = self._prepare_sources(relevant_docs)
             
             return {
                 "answer": answer,
-                "sources": sources
+                "sources": sources,
+                # What this turn leaves for the session's next one; coalesced callers adopt it
+                "session_state": self.session_cache.get(session_id)
             }
             
         except Exception as e:
             logger.error(f"Error in RAG pipeline: {str(e)}")
             raise
     
-    async def _retrieve_documents(self, query: str) -> List[Document]:
+    def _answer_from_facts(self, question: str, document_ids: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Answer "what was <line item> in <year>" lookups from the facts table, or return None"""
+        if not self.facts_store or not settings.facts_fast_path_enabled:
+            return None
+        if not FIGURE_QUESTION_PATTERN.match(question) or REASONING_PATTERN.search(question):
+            return None
+        
+        years = [match.group(0) for match in YEAR_PATTERN.finditer(question)]
+        if len(years) != 1:
+            return None
+        
+        try:
+            line_item_key = self._match_line_item(question)
+            if not line_item_key:
+                return None
+            
+            # Also accept sub-annual periods of the requested year only when no annual figure exists
+            facts = self.facts_store.lookup(line_item_key, years[0]) or [
+                fact for fact in self.facts_store.lookup(line_item_key)
+                if fact["period"] and fact["period"].startswith(years[0])
+            ]
+            if document_ids:
+                facts = [fact for fact in facts if fact["document_id"] in document_ids]
+            if not facts:
+                return None
+        except Exception as e:
+            logger.error(f"Error looking up facts: {str(e)}")
+            return None
+        
+        # One figure per document/period; the first occurrence (lowest page) wins
+        unique_facts = {}
+        for fact in facts:
+            unique_facts.setdefault((fact["document_id"], fact["period"]), fact)
+        facts = list(unique_facts.values())[:5]
+        
+        lines = [
+            f"{fact['line_item']} for {fact['period'] or 'the reported period'} was {fact['raw_value']} "
+            f"({fact['filename']}, page {fact['page']})."
+            for fact in facts
+        ]
+        sources = [
+            DocumentSource(
+                content=f"{fact['line_item']} ({fact['period']}): {fact['raw_value']}",
+                page=fact["page"],
+                score=1.0,
+                metadata={
+                    "document_id": fact["document_id"],
+                    "filename": fact["filename"],
+                    "page": fact["page"],
+                    "period": fact["period"],
+                    "source": "facts"
+                }
+            )
+            for fact in facts
+        ]
+        
+        self.stats["fact_answers"] += 1
+        logger.info(f"Answered from facts table: {line_item_key} {years[0]}")
+        return {
+            "answer": "\n".join(lines),
+            "sources": sources
+        }
+    
+    def _match_line_item(self, question: str) -> Optional[str]:
+        """The single line item a figure question is about, or None when none or several match"""
+        normalized_question = normalize_line_item(YEAR_PATTERN.sub(' ', question))
+        padded_question = f" {normalized_question} "
+        matches = [
+            key for key in self.facts_store.line_item_keys()
+            if key and is_specific_line_item(key) and f" {key} " in padded_question
+        ]
+        if not matches:
+            return None
+        
+        # Shorter keys inside the longest one ("current assets" in "total current assets") are the same mention
+        line_item_key = max(matches, key=len)
+        if any(f" {key} " not in f" {line_item_key} " for key in matches):
+            return None
+        
+        # The line item must be what the question is about, not one word of it
+        content_words = [word for word in normalized_question.split() if word not in QUESTION_FILLER_WORDS]
+        covered = sum(1 for word in content_words if word in line_item_key.split())
+        if not content_words or covered / len(content_words) < MIN_LINE_ITEM_COVERAGE:
+            return None
+        return line_item_key
+    
+    def adopt_session_state(self, session_id: Optional[str], state: Optional[SessionRetrievalState]) -> None:
+        """Give a coalesced caller's session the state the shared run left, as if it had run the turn itself"""
+        if not session_id or not state or not settings.session_retrieval_enabled:
+            return
+        self.session_cache.put(session_id, state.copy())
+    
+    def _remember_query(
+        self, 
+        session_id: Optional[str], 
+        state: Optional[SessionRetrievalState], 
+        query: str, 
+        document_ids: Optional[List[str]] = None
+    ) -> None:
+        """Record the latest standalone query of a session without new retrieval results"""
+        if not session_id or not settings.session_retrieval_enabled:
+            return
+        if state:
+            state.standalone_query = query
+            state.updated_at = time.monotonic()
+        else:
+            state = SessionRetrievalState(query, document_ids=document_ids)
+        self.session_cache.put(session_id, state)
+    
+    async def _retrieve_documents(
+        self, 
+        query: str, 
+        document_ids: Optional[List[str]] = None, 
+        session_id: Optional[str] = None, 
+        state: Optional[SessionRetrievalState] = None
+    ) -> List[Document]:
         """Retrieve relevant documents for the query"""
         try:
             # Expand query with financial keywords if relevant
             expanded_query = self._expand_financial_query(query)
+            k = settings.max_retrieval_documents
+            self.stats["retrievals"] += 1
+            
+            if not session_id or not settings.session_retrieval_enabled:
+                # Search vector store for similar documents
+                results = await asyncio.to_thread(
+                    self.vector_store.similarity_search,
+                    expanded_query, 
+                    k=k,
+                    document_ids=document_ids
+                )
+                logger.info(f"Retrieved {len(results)} relevant documents for query")
+                return results
             
-            # Search vector store for similar documents
-            results = self.vector_store.similarity_search(
-                expanded_query, 
-                k=settings.max_retrieval_documents
+            query_embedding = np.asarray(
+                await asyncio.to_thread(self.vector_store.embed_query, expanded_query), dtype=np.float32
             )
+            search_document_ids = document_ids
+            
+            if state and state.has_results():
+                similarity = state.query_similarity(query_embedding)
+                
+                # Close to the previous query and about the same years and entities: its chunks
+                # answer this one too ("revenue 2023" and "revenue 2022" embed almost alike)
+                if similarity >= settings.session_reuse_similarity and query_references(query) == query_references(state.standalone_query):
+                    start = time.perf_counter()
+                    # Same threshold as a fresh search
+                    results = [
+                        (doc, score) for doc, score in state.rerank(query_embedding, k)
+                        if score >= settings.similarity_threshold
+                    ]
+                    if results:
+                        self._record_skip(time.perf_counter() - start)
+                        self._remember_query(session_id, state, query, document_ids)
+                        logger.info(f"Reused {len(results)} chunks from the previous turn (similarity {similarity:.2f})")
+                        return results
+                
+                # Related: search only the documents the previous turn drew from
+                if similarity >= settings.session_narrow_similarity and not document_ids:
+                    search_document_ids = state.retrieved_document_ids or None
+            
+            start = time.perf_counter()
+            matches = await asyncio.to_thread(
+                self.vector_store.search_by_embedding, query_embedding.tolist(), k=k, document_ids=search_document_ids
+            )
+            if search_document_ids != document_ids:
+                if matches:
+                    self.stats["retrieval_narrowed"] += 1
+                else:
+                    matches = await asyncio.to_thread(
+                        self.vector_store.search_by_embedding, query_embedding.tolist(), k=k, document_ids=document_ids
+                    )
+            self._record_search(time.perf_counter() - start)
+            
+            results = [(doc, score) for doc, score, _ in matches]
+            self.session_cache.put(session_id, SessionRetrievalState(
+                query,
+                query_embedding=query_embedding,
+                results=results,
+                chunk_embeddings=np.asarray([embedding for _, _, embedding in matches], dtype=np.float32) if matches else None,
+                document_ids=document_ids
+            ))
             
             logger.info(f"Retrieved {len(results)} relevant documents for query")
             return results
@@ -79,6 +352,26 @@ Question: {question}"""
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             return []
+    
+    def _record_search(self, seconds: float) -> None:
+        if self._search_seconds_avg is None:
+            self._search_seconds_avg = seconds
+        else:
+            self._search_seconds_avg = 0.9 * self._search_seconds_avg + 0.1 * seconds
+    
+    def _record_skip(self, seconds: float) -> None:
+        self.stats["retrieval_skipped"] += 1
+        if self._search_seconds_avg is not None:
+            self.stats["retrieval_seconds_saved"] += max(0.0, self._search_seconds_avg - seconds)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        retrievals = self.stats["retrievals"]
+        return {
+            **self.stats,
+            "retrieval_skip_rate": self.stats["retrieval_skipped"] / retrievals if retrievals else 0.0,
+            "avg_search_seconds": self._search_seconds_avg or 0.0,
+            "active_sessions": len(self.session_cache)
+        }
         
     def _expand_financial_query(self, query: str) -> str:
         """Expand query with relevant financial terms"""
@@ -91,11 +384,18 @@ Question: {question}"""
             "ratios": ["financial ratios", "performance metrics", "key indicators"]
         }
         
+        # Apply every matching group, without repeating terms already in the query
         query_lower = query.lower()
+        expansions = []
         for key, synonyms in financial_keywords.items():
             if key in query_lower:
-                return f"{query} {' '.join(synonyms)}"
+                expansions.extend(
+                    synonym for synonym in synonyms 
+                    if synonym not in query_lower and synonym not in expansions
+                )
         
+        if expansions:
+            return f"{query} {' '.join(expansions)}"
         return query
     
     def _generate_context(self, documents: List[Document]) -> str:
@@ -115,37 +415,39 @@ Question: {question}"""
         logger.info(f"Generated context from {len(documents)} documents")
         return "\n".join(context_parts)
     
-    def _generate_llm_response(self, question: str, context: str, chat_history: List[Dict[str, str]] = None) -> str:
+    async def _generate_llm_response(
+        self, 
+        question: str, 
+        context: str, 
+        chat_history: List[Dict[str, str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> str:
         """Generate response using LLM"""
-        try:
-            # Format chat history
-            history_text = ""
-            if chat_history:
-                history_parts = []
-                for exchange in chat_history[-10:]:  # Last 5 exchanges
-                    role = exchange.get('role', 'user')
-                    content = exchange.get('content', '')
-                    history_parts.append(f"{role.capitalize()}: {content}")
-                history_text = "\n".join(history_parts)
-            
-            # Create prompt
-            prompt = self.system_prompt.format(
-                context=context,
-                chat_history=history_text,
-                question=question
-            )
-            
-            # Generate response
-            response = self.model.generate_content(prompt)
-            
-            if response.text:
-                return response.text.strip()
-            else:
-                return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
-                
-        except Exception as e:
-            logger.error(f"Error generating LLM response: {str(e)}")
-            return f"I encountered an error while processing your question. Please try again."
+        # Format chat history
+        history_text = ""
+        if chat_history:
+            history_parts = []
+            for exchange in chat_history[-10:]:  # Last 5 exchanges
+                role = exchange.get('role', 'user')
+                content = exchange.get('content', '')
+                history_parts.append(f"{role.capitalize()}: {content}")
+            history_text = "\n".join(history_parts)
+        
+        # Create prompt
+        prompt = self.system_prompt.format(
+            context=context,
+            chat_history=history_text,
+            question=question
+        )
+        
+        # Generate response through the gateway (rate limits, retries, priority lanes);
+        # LLMUnavailableError propagates so the API can answer 503 instead of a fake reply
+        text = await self.llm_gateway.generate(prompt, priority=priority)
+        
+        if text:
+            return text
+        else:
+            return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
         
 
     def _prepare_sources(self, documents: List[tuple]) -> List[DocumentSource]:
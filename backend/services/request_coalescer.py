@@ -0,0 +1,40 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared in-flight computation"""
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"requests": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await fn() once per key at a time; returns (result, whether this call was coalesced)"""
+        self.stats["requests"] += 1
+
+        task = self._in_flight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["executions"] += 1
+            # A separate task so one caller disconnecting does not cancel the others
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+
+        return await asyncio.shield(task), coalesced
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._in_flight)}
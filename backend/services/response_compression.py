@@ -0,0 +1,163 @@
+from typing import List, Optional, Tuple
+import gzip
+import zlib
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+import logging
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/", "image/svg+xml")
+# One-shot bodies at least this large are compressed off the event loop
+THREAD_COMPRESSION_THRESHOLD = 1024 * 1024
+
+
+def supported_encodings() -> List[str]:
+    """Content codings this server can produce, in order of preference"""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred supported coding from an Accept-Encoding header, honoring q-values"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+
+    candidates = []
+    for preference, coding in enumerate(supported_encodings()):
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > 0:
+            candidates.append((-quality, preference, coding))
+    return min(candidates)[2] if candidates else None
+
+
+class _Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=settings.response_zstd_level).compressobj()
+        else:
+            self._compressor = zlib.compressobj(settings.response_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a complete response body"""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.response_zstd_level).compress(body)
+    return gzip.compress(body, compresslevel=settings.response_gzip_level)
+
+
+class CompressionMiddleware:
+    """Compresses JSON and text responses with zstd or gzip as negotiated via Accept-Encoding.
+
+    Bodies below minimum_size, non-compressible media types and responses that
+    already carry a Content-Encoding are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.response_compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not media_type.startswith(COMPRESSIBLE_MEDIA_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Hold the start message until the first body chunk decides the framing
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                if len(body) >= THREAD_COMPRESSION_THRESHOLD:
+                    compressed = await to_thread.run_sync(compress_body, body, self.encoding)
+                else:
+                    compressed = compress_body(body, self.encoding)
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streamed body: compress chunk by chunk without a known length
+            del headers["Content-Length"]
+            self.compressor = _Compressor(self.encoding)
+            await self.send(start_message)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import itertools
+import re
+import threading
+import time
+import numpy as np
+from langchain.schema import Document
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+YEAR_PATTERN = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+RELATIVE_YEAR_PATTERN = re.compile(
+    r'\b(?P<direction>previous|prior|preceding|last|next|following|subsequent)\s+(?:fiscal\s+|financial\s+)?years?\b',
+    re.IGNORECASE
+)
+# "what about net income?", "and how about 2022?": a new subject or period for the previous question
+FOLLOW_UP_LEAD_PATTERN = re.compile(
+    r'^\s*(and\s+)?(what\s+about|how\s+about|what\s+of|same\s+for)\b',
+    re.IGNORECASE
+)
+# "and the prior year?", "2022?": nothing but a period
+PERIOD_ONLY_PATTERN = re.compile(
+    r'^\s*(and\s+)?((for|in)\s+)?(the\s+)?((19|20)\d{2}|(previous|prior|preceding|last|next|following|subsequent)\s+'
+    r'(fiscal\s+|financial\s+)?years?)\s*[?.!]*\s*$',
+    re.IGNORECASE
+)
+# "why did it fall?", "how does that compare?": a pronoun standing in for the previous subject
+BARE_PRONOUN_PATTERN = re.compile(
+    r'\b(it|its|they|them|their)\b|\b(that|this|those|these)\b(?=\s*([?.!,]|$)|\s+(is|was|are|were|has|have|had|do|does|did|'
+    r'mean|means|change|changed|happen|happened|compare|compares|move|moved|in|for|during)\b)',
+    re.IGNORECASE
+)
+# Words dropped from a follow-up before it is merged with the previous query
+REFERENCE_PATTERN = re.compile(
+    r'\b(it|its|they|them|their|that|those|these|this|same)\b',
+    re.IGNORECASE
+)
+FILLER_PATTERN = re.compile(
+    r'^\s*(and\s+)?(((what|how)\s+about|what\s+of|same\s+for|for|in)\b)?\s*(the\s+)?',
+    re.IGNORECASE
+)
+# Capitalized words after the first one: company names, segments, tickers
+ENTITY_PATTERN = re.compile(r'(?<!^)(?<![.?!]\s)\b[A-Z][\w&-]*')
+
+CONNECTOR_WORDS = {"and", "or", "for", "in", "of", "the", "to", "about", "with", "vs", "versus"}
+
+
+def is_follow_up(question: str) -> bool:
+    """Questions that only make sense with the previous turn ("what about net income?", "and the prior year?")"""
+    if FOLLOW_UP_LEAD_PATTERN.match(question) or PERIOD_ONLY_PATTERN.match(question):
+        return True
+    return len(question.split()) <= settings.session_follow_up_max_words and bool(BARE_PRONOUN_PATTERN.search(question))
+
+
+def query_references(query: str) -> Tuple[List[str], List[str]]:
+    """Years and named entities a query is about, to tell apart queries that embed alike"""
+    years = sorted(set(YEAR_PATTERN.findall(query)))
+    entities = sorted({match.group(0).lower() for match in ENTITY_PATTERN.finditer(query.strip())})
+    return years, entities
+
+
+def condense_follow_up(question: str, previous_query: str) -> str:
+    """Rewrite a follow-up into a standalone retrieval query using the previous standalone query.
+
+    Years in the follow-up (or "previous/next year") replace the years of the previous
+    query. A "what about X" subject replaces the previous subject, keeping its period
+    and entities; anything else the follow-up adds is appended to the previous query.
+    """
+    years = [int(year) for year in YEAR_PATTERN.findall(previous_query)]
+    new_years = YEAR_PATTERN.findall(question)
+
+    relative = RELATIVE_YEAR_PATTERN.search(question)
+    if new_years and years:
+        # Position-wise: the n-th year asked about replaces the n-th year of the previous query
+        position = itertools.count()
+        base = YEAR_PATTERN.sub(lambda _: new_years[min(next(position), len(new_years) - 1)], previous_query)
+    elif relative and years:
+        step = -1 if relative.group("direction").lower() in ("previous", "prior", "preceding", "last") else 1
+        base = YEAR_PATTERN.sub(lambda match: str(int(match.group(0)) + step), previous_query)
+    else:
+        base = previous_query
+
+    remainder = RELATIVE_YEAR_PATTERN.sub(" ", question)
+    if new_years and years:
+        remainder = YEAR_PATTERN.sub(" ", remainder)
+    remainder = FILLER_PATTERN.sub("", remainder).strip(" ?.!,")
+    words = [word for word in remainder.split() if not REFERENCE_PATTERN.fullmatch(word)]
+    while words and words[0].lower() in CONNECTOR_WORDS:
+        words.pop(0)
+    while words and words[-1].lower() in CONNECTOR_WORDS:
+        words.pop()
+    remainder = " ".join(words)
+    if not remainder:
+        return base
+
+    if FOLLOW_UP_LEAD_PATTERN.match(question):
+        base_entities = [match.group(0) for match in ENTITY_PATTERN.finditer(base.strip())]
+        if all(word[:1].isupper() for word in words):
+            # "what about Contoso?": same question about another entity
+            for entity in base_entities:
+                base = re.sub(rf'\b{re.escape(entity)}\b\s*', "", base)
+            return f"{remainder} {base.strip()}"
+        # "what about net income?": a new subject for the same entities and period
+        kept = [entity for entity in dict.fromkeys(base_entities) if entity.lower() not in remainder.lower()]
+        years_kept = [] if YEAR_PATTERN.search(remainder) else YEAR_PATTERN.findall(base)
+        return " ".join(kept + [remainder] + years_kept)
+
+    return f"{base.rstrip()} {remainder}"
+
+
+class SessionRetrievalState:
+    """What the previous turn of a session retrieved, with embeddings for reranking"""
+
+    def __init__(
+        self,
+        standalone_query: str,
+        query_embedding: Optional[np.ndarray] = None,
+        results: Optional[List[Tuple[Document, float]]] = None,
+        chunk_embeddings: Optional[np.ndarray] = None,
+        document_ids: Optional[List[str]] = None
+    ):
+        self.standalone_query = standalone_query
+        self.query_embedding = query_embedding
+        self.results = results or []
+        self.chunk_embeddings = chunk_embeddings
+        self.document_ids = sorted(document_ids) if document_ids else None
+        self.updated_at = time.monotonic()
+
+    def copy(self) -> "SessionRetrievalState":
+        """Independent state for another session; embeddings are shared read-only"""
+        return SessionRetrievalState(
+            self.standalone_query,
+            query_embedding=self.query_embedding,
+            results=list(self.results),
+            chunk_embeddings=self.chunk_embeddings,
+            document_ids=self.document_ids
+        )
+
+    @property
+    def chunk_ids(self) -> List[str]:
+        return [doc.id or doc.metadata.get("chunk_id") for doc, _ in self.results]
+
+    @property
+    def retrieved_document_ids(self) -> List[str]:
+        return sorted({doc.metadata["document_id"] for doc, _ in self.results if doc.metadata.get("document_id")})
+
+    def has_results(self) -> bool:
+        return self.query_embedding is not None and self.chunk_embeddings is not None and len(self.results) > 0
+
+    def query_similarity(self, query_embedding: np.ndarray) -> float:
+        """Cosine similarity between a new query and the query that produced these results"""
+        denominator = np.linalg.norm(query_embedding) * np.linalg.norm(self.query_embedding)
+        return float(np.dot(query_embedding, self.query_embedding) / denominator) if denominator else 0.0
+
+    def rerank(self, query_embedding: np.ndarray, k: int) -> List[Tuple[Document, float]]:
+        """Previously retrieved chunks ordered for a new query.
+
+        Scores are squared L2 distances, the same measure Chroma returns, so reused
+        results look exactly like fresh ones downstream.
+        """
+        distances = np.sum((self.chunk_embeddings - query_embedding) ** 2, axis=1)
+        order = np.argsort(distances)[:k]
+        return [(self.results[i][0], float(distances[i])) for i in order]
+
+
+class SessionRetrievalCache:
+    """Per-session retrieval state, bounded by count (LRU) and idle time"""
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_sessions = max_sessions or settings.session_retrieval_max_sessions
+        self.ttl_seconds = ttl_seconds or settings.session_retrieval_ttl_seconds
+        self._states: "OrderedDict[str, SessionRetrievalState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> Optional[SessionRetrievalState]:
+        if not session_id:
+            return None
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                return None
+            if time.monotonic() - state.updated_at > self.ttl_seconds:
+                del self._states[session_id]
+                return None
+            self._states.move_to_end(session_id)
+            return state
+
+    def put(self, session_id: Optional[str], state: SessionRetrievalState) -> None:
+        if not session_id:
+            return
+        with self._lock:
+            self._states[session_id] = state
+            self._states.move_to_end(session_id)
+            while len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+
+    def invalidate_document(self, document_id: str) -> None:
+        """Forget sessions whose cached chunks came from a deleted or replaced document"""
+        with self._lock:
+            for session_id in [
+                session_id for session_id, state in self._states.items()
+                if document_id in state.retrieved_document_ids
+            ]:
+                del self._states[session_id]
+
+    def __len__(self) -> int:
+        return len(self._states)
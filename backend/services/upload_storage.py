@@ -0,0 +1,146 @@
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import os
+import aiofiles
+from starlette.requests import Request
+import logging
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Room for boundaries, part headers and small form fields on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+    pass
+
+
+class MultipartUploadError(Exception):
+    """Raised when the request body is not a multipart form carrying the expected file"""
+    pass
+
+
+class _FilePartReader:
+    """Multipart parser callbacks that keep the bytes of one file field and drop the rest"""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.pending: List[bytes] = []
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        # Only the first file sent under the expected field name is kept
+        if name == self.field_name and b"filename" in options and self.filename is None:
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self.pending.append(bytes(data[start:end]))
+
+    def on_part_end(self):
+        self._in_file = False
+
+    def drain(self) -> List[bytes]:
+        chunks, self.pending = self.pending, []
+        return chunks
+
+
+async def save_multipart_upload(
+    request: Request,
+    field_name: str,
+    destination_for: Callable[[str], str],
+    max_size: int
+) -> Tuple[str, str, int, str]:
+    """Parse a multipart body as it arrives and stream one file field straight to disk.
+
+    The size limit is enforced while the body is received, so an oversized upload is
+    cut off after max_size bytes instead of being spooled first, and the file is
+    written exactly once. destination_for maps the client filename to the target path
+    and may raise to reject the file before any of it is written.
+
+    Returns the client filename, the path written, the number of bytes and the
+    SHA-256 hex digest of the content. The partial file is removed on any failure.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise MultipartUploadError("Expected a multipart/form-data body")
+
+    # Content-Length covers the whole body, so only a clearly oversized one is refused up front
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise FileTooLargeError(f"Request body is {content_length} bytes, limit is {max_size}")
+
+    reader = _FilePartReader(field_name)
+    parser = MultipartParser(params[b"boundary"], reader.callbacks())
+    hasher = hashlib.sha256()
+    total_size = 0
+    destination = None
+    buffer = None
+
+    try:
+        async for body_chunk in request.stream():
+            parser.write(body_chunk)
+
+            if buffer is None and reader.filename is not None:
+                destination = destination_for(reader.filename)
+                buffer = await aiofiles.open(destination, "wb")
+
+            for chunk in reader.drain():
+                total_size += len(chunk)
+                if total_size > max_size:
+                    raise FileTooLargeError(f"File exceeds the {max_size} byte limit")
+
+                hasher.update(chunk)
+                await buffer.write(chunk)
+
+        parser.finalize()
+        if buffer is None:
+            raise MultipartUploadError(f"No '{field_name}' file in the request")
+        await buffer.close()
+    except BaseException:
+        if buffer is not None:
+            await buffer.close()
+        if destination and os.path.exists(destination):
+            os.remove(destination)
+        raise
+
+    logger.info(f"Saved upload to {destination}: {total_size} bytes")
+    return reader.filename, destination, total_size, hasher.hexdigest()
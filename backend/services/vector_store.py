@@ -1,6 +1,10 @@
 from datetime import datetime
+import json
 import os
-from typing import List, Optional, Tuple
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
 from langchain.schema import Document
 from langchain_huggingface import HuggingFaceEmbeddings
 from models.schemas import ChunkInfo, ChunksResponse, DocumentInfo
@@ -8,19 +12,36 @@ from config import settings
 import logging
 from langchain_chroma import Chroma
 import chromadb
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+SNAPSHOT_FORMAT_VERSION = 1
+# Written by the API server while it serves this directory; offline tools refuse to write alongside it
+SERVER_PID_FILENAME = "server.pid"
+
+
 class VectorStoreService:
-    def __init__(self):
+    def __init__(self, persist_directory: Optional[str] = None):
         self.instance_id = id(self)
+        self.persist_directory = persist_directory or settings.chroma_persist_directory
+        self.embedding_model_name = "all-MiniLM-L6-v2"
         self.embeddings = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2"
+            model_name=self.embedding_model_name
         )
         self.vector_store = None
         self.client = None
         self._initialized = False
+        
+        # Active collection; compaction swaps in a rebuilt copy under a new name
+        self.collection_name = settings.chroma_collection_name
+        self.deleted_since_compaction = 0
+        self.last_compaction: Optional[Dict[str, Any]] = None
+        # Guards writes against the final sync-and-swap of a compaction
+        self._write_lock = threading.RLock()
+        # Ids written while a compaction copies the collection (None when not compacting)
+        self._compaction_dirty_ids: Optional[Set[str]] = None
         logger.info(f"VectorStoreService instance created: {self.instance_id}")
     
     async def initialize(self): 
@@ -30,26 +51,21 @@ class VectorStoreService:
             logger.info(f"Initializing instance: {self.instance_id}")
        
             # Create persist directory if it doesn't exist
-            os.makedirs(settings.chroma_persist_directory, exist_ok=True)
-            logger.info(f"Chroma persist directory: {settings.chroma_persist_directory}")
+            os.makedirs(self.persist_directory, exist_ok=True)
+            logger.info(f"Chroma persist directory: {self.persist_directory}")
             
             
             # Initialize ChromaDB client
-            self.client = chromadb.PersistentClient(path=settings.chroma_persist_directory)
-          
+            self.client = chromadb.PersistentClient(path=self.persist_directory)
+            self._load_collection_state()
             
             # Initialize Chroma vector store
-            self.vector_store = Chroma(
-                client=self.client,
-                collection_name="documents",
-                embedding_function=self.embeddings,
-                persist_directory=settings.chroma_persist_directory
-            )
+            self.vector_store = self._make_langchain_store(self.collection_name)
             
             # Test the vector store
             try:
                 # Try to get collection info
-                collection = self.client.get_collection("documents")
+                collection = self._collection()
                 logger.info(f"Collection count: {collection.count()}")
             except Exception as collection_error:
                 logger.error(f"Error accessing collection: {collection_error}")
@@ -65,6 +81,81 @@ class VectorStoreService:
             logger.error(f"Full traceback: {traceback.format_exc()}")
             raise
     
+    def _make_langchain_store(self, collection_name: str) -> Chroma:
+        return Chroma(
+            client=self.client,
+            collection_name=collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory
+        )
+    
+    def _collection(self):
+        return self.client.get_collection(self.collection_name)
+    
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.persist_directory, "collection_state.json")
+    
+    def _load_collection_state(self) -> None:
+        """Restore the active collection name and deletion counter saved by a previous run"""
+        try:
+            with open(self._state_path) as f:
+                state = json.load(f)
+            self.collection_name = state.get("collection", self.collection_name)
+            self.deleted_since_compaction = state.get("deleted_since_compaction", 0)
+            self.last_compaction = state.get("last_compaction")
+        except FileNotFoundError:
+            pass
+    
+    def _save_collection_state(self) -> None:
+        tmp_path = f"{self._state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "collection": self.collection_name,
+                "deleted_since_compaction": self.deleted_since_compaction,
+                "last_compaction": self.last_compaction
+            }, f)
+        os.replace(tmp_path, self._state_path)
+    
+    @property
+    def _server_pid_path(self) -> str:
+        return os.path.join(self.persist_directory, SERVER_PID_FILENAME)
+    
+    def claim_directory(self) -> None:
+        """Mark the persist directory as served by this process"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(self._server_pid_path, "w") as f:
+            f.write(str(os.getpid()))
+    
+    def release_directory(self) -> None:
+        if self.directory_owner() == os.getpid():
+            os.remove(self._server_pid_path)
+    
+    def directory_owner(self) -> Optional[int]:
+        """Pid of a live server process using the persist directory, if any"""
+        try:
+            with open(self._server_pid_path) as f:
+                pid = int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            # Left behind by a server that did not shut down cleanly
+            return None
+        except PermissionError:
+            pass
+        return pid
+    
+    def _record_writes(self, ids: List[str]) -> None:
+        if self._compaction_dirty_ids is not None:
+            self._compaction_dirty_ids.update(ids)
+    
+    def _record_deletes(self, ids: List[str]) -> None:
+        self._record_writes(ids)
+        self.deleted_since_compaction += len(ids)
+        self._save_collection_state()
+    
     def add_documents(self, documents: List[Document], document_id: str) -> None:
         """Add documents to the vector store"""
         logger.info(f"add_documents called on instance: {self.instance_id}")
@@ -78,8 +169,12 @@ class VectorStoreService:
                 doc.metadata["document_id"] = document_id
         
             
-            # Add documents to vector store
-            self.vector_store.add_documents(documents)
+            # Deterministic chunk ids make this an upsert; embedding happens before taking
+            # the write lock so compaction and other writers only wait for the write itself
+            ids = [doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+            texts = [doc.page_content for doc in documents]
+            embeddings = self.embed_texts(texts)
+            self.upsert_embeddings(ids, embeddings, texts, [doc.metadata for doc in documents])
             
             logger.info(f"Added {len(documents)} documents to vector store")
             
@@ -87,16 +182,64 @@ class VectorStoreService:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             raise
     
-    def similarity_search(self, query: str, k: int = None) -> List[Tuple[Document, float]]:
-        """Search for similar documents"""
+    def embed_texts(self, texts: List[str], batch_size: int = 256) -> List[List[float]]:
+        """Embed texts in batches with the store's embedding model"""
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            embeddings.extend(self.embeddings.embed_documents(texts[start:start + batch_size]))
+        return embeddings
+    
+    def upsert_embeddings(
+        self, 
+        ids: List[str], 
+        embeddings: List[List[float]], 
+        texts: List[str], 
+        metadatas: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> None:
+        """Write pre-computed embeddings straight to the collection in large batches"""
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            batch_size = min(batch_size or len(ids) or 1, self.client.get_max_batch_size())
+            
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                with self._write_lock:
+                    self._collection().upsert(
+                        ids=ids[start:end],
+                        embeddings=embeddings[start:end],
+                        documents=texts[start:end],
+                        metadatas=metadatas[start:end]
+                    )
+                    self._record_writes(ids[start:end])
+            
+            logger.info(f"Upserted {len(ids)} pre-embedded chunks")
+            
+        except Exception as e:
+            logger.error(f"Error upserting embeddings: {str(e)}")
+            raise
+    
+    def similarity_search(
+        self, 
+        query: str, 
+        k: int = None, 
+        document_ids: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Search for similar documents, optionally restricted to some document ids"""
         try:
             if not self.vector_store:
                 raise Exception("Vector store not initialized")
             
             k = int(k or settings.max_retrieval_documents)
             
+            search_filter = None
+            if document_ids:
+                search_filter = {"document_id": {"$in": list(document_ids)}}
+            
             # Perform similarity search with scores
-            results = self.vector_store.similarity_search_with_score(query, k=k)
+            results = self.vector_store.similarity_search_with_score(query, k=k, filter=search_filter)
             
             # Filter by similarity threshold
             filtered_results = [
@@ -110,17 +253,62 @@ class VectorStoreService:
             logger.error(f"Error performing similarity search: {str(e)}")
             raise
     
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query with the store's embedding model"""
+        return self.embeddings.embed_query(text)
+    
+    def search_by_embedding(
+        self, 
+        query_embedding: List[float], 
+        k: int = None, 
+        document_ids: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float, List[float]]]:
+        """Like similarity_search for a pre-computed query embedding, also returning each chunk's embedding"""
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            k = int(k or settings.max_retrieval_documents)
+            
+            collection = self._collection()
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=k,
+                where={"document_id": {"$in": list(document_ids)}} if document_ids else None,
+                include=["documents", "metadatas", "distances", "embeddings"]
+            )
+            
+            matches = []
+            for chunk_id, text, metadata, distance, embedding in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+                results["embeddings"][0]
+            ):
+                # Same threshold as similarity_search
+                if distance >= settings.similarity_threshold:
+                    matches.append((Document(page_content=text, metadata=metadata or {}, id=chunk_id), distance, embedding))
+            
+            return matches
+            
+        except Exception as e:
+            logger.error(f"Error performing embedding search: {str(e)}")
+            raise
+    
     def delete_document(self, document_id: str) -> None:
         """Delete documents from vector store"""
         try:
             if not self.vector_store:
                 raise Exception("Vector store not initialized")
             
-            # Get collection
-            collection = self.client.get_collection("documents")
-            
             # Delete documents with matching document_id
-            collection.delete(where={"document_id": document_id})
+            with self._write_lock:
+                collection = self._collection()
+                chunk_ids = collection.get(where={"document_id": document_id}, include=[])["ids"]
+                if chunk_ids:
+                    collection.delete(ids=chunk_ids)
+                    self._record_deletes(chunk_ids)
             
             logger.info(f"Deleted documents with document_id: {document_id}")
             
@@ -128,6 +316,92 @@ class VectorStoreService:
             logger.error(f"Error deleting documents: {str(e)}")
             raise
     
+    def get_document_pages(self, document_id: str) -> Dict[int, Dict[str, Any]]:
+        """Get stored page fingerprints and chunk ids for a document, keyed by page number"""
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            collection = self._collection()
+            results = collection.get(where={"document_id": document_id}, include=["metadatas"])
+            
+            pages = {}
+            
+            def page_entry(page: int, page_hash: Optional[str], filename: Optional[str]) -> Dict[str, Any]:
+                page_info = pages.setdefault(page, {
+                    'page_hash': page_hash,
+                    'filename': filename,
+                    'chunk_ids': [],
+                    'covering_pages': set()
+                })
+                # Chunks written before fingerprinting existed force the page to be refreshed
+                if page_info['page_hash'] != page_hash:
+                    page_info['page_hash'] = None
+                return page_info
+            
+            for chunk_id, metadata in zip(results['ids'], results['metadatas']):
+                page = metadata.get('page', 0)
+                filename = metadata.get('filename')
+                page_entry(page, metadata.get('page_hash'), filename)['chunk_ids'].append(chunk_id)
+                
+                # Chunks spanning several pages record a fingerprint for each covered page
+                for span_entry in filter(None, metadata.get('span_page_hashes', '').split(',')):
+                    covered_page, page_hash = span_entry.split(':', 1)
+                    page_entry(int(covered_page), page_hash, filename)['covering_pages'].add(page)
+            
+            return pages
+            
+        except Exception as e:
+            logger.error(f"Error getting pages for document {document_id}: {str(e)}")
+            raise
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete specific chunks by id"""
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            if not chunk_ids:
+                return
+            
+            with self._write_lock:
+                self._collection().delete(ids=chunk_ids)
+                self._record_deletes(chunk_ids)
+            
+            logger.info(f"Deleted {len(chunk_ids)} chunks")
+            
+        except Exception as e:
+            logger.error(f"Error deleting chunks: {str(e)}")
+            raise
+    
+    def update_chunk_metadata(self, chunk_ids: List[str], fields: Dict[str, Any], batch_size: int = 1000) -> int:
+        """Set metadata fields on existing chunks without re-embedding them; returns the number updated"""
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            updated = 0
+            batch_size = min(batch_size, self.client.get_max_batch_size())
+            for start in range(0, len(chunk_ids), batch_size):
+                with self._write_lock:
+                    collection = self._collection()
+                    results = collection.get(ids=chunk_ids[start:start + batch_size], include=["metadatas"])
+                    if not results["ids"]:
+                        continue
+                    collection.update(
+                        ids=results["ids"],
+                        metadatas=[{**(metadata or {}), **fields} for metadata in results["metadatas"]]
+                    )
+                    self._record_writes(results["ids"])
+                updated += len(results["ids"])
+            
+            logger.info(f"Updated metadata of {updated} chunks")
+            return updated
+            
+        except Exception as e:
+            logger.error(f"Error updating chunk metadata: {str(e)}")
+            raise
+    
     def get_document_count(self) -> int:
         """Get total number of documents in vector store"""
         try:
@@ -135,7 +409,7 @@ class VectorStoreService:
                 raise Exception("Vector store not initialized")
             
             # Get collection
-            collection = self.client.get_collection("documents")
+            collection = self._collection()
             
             # Get all documents
             results = collection.get()
@@ -184,10 +458,10 @@ class VectorStoreService:
                 raise Exception("Vector store not initialized")
             
             # Get collection
-            collection = self.client.get_collection("documents")
+            collection = self._collection()
             
-            # Get all documents
-            results = collection.get()
+            # Only metadata is needed to list documents; skip chunk texts
+            results = collection.get(include=["metadatas"])
             
             # Group by document_id and filename
             documents_map = {}
@@ -210,8 +484,10 @@ class VectorStoreService:
                 
                 documents_map[key]['chunks_count'] += 1
             
+            # Stored metadata was validated on ingest
+            build_document = DocumentInfo.model_construct if settings.skip_read_validation else DocumentInfo
             documents = [
-                DocumentInfo(
+                build_document(
                     id=info['id'],
                     filename=info['filename'],
                     upload_date=datetime.fromisoformat(info['upload_date']),
@@ -239,7 +515,7 @@ class VectorStoreService:
                 raise Exception("Vector store not initialized")
             
             # Get collection
-            collection = self.client.get_collection("documents")
+            collection = self._collection()
             
             # Build where clause
             where_clause = {}
@@ -255,18 +531,20 @@ class VectorStoreService:
                 results = collection.get(limit=limit)
             
             # Convert to ChunkInfo objects
+            build_chunk = ChunkInfo.model_construct if settings.skip_read_validation else ChunkInfo
+            build_response = ChunksResponse.model_construct if settings.skip_read_validation else ChunksResponse
             chunks = []
             for i, (chunk_id, metadata) in enumerate(zip(results['ids'], results['metadatas'])):
                 content = results['documents'][i] if i < len(results['documents']) else ""
                 
-                chunks.append(ChunkInfo(
+                chunks.append(build_chunk(
                     id=chunk_id,
                     content=content,
                     page=metadata.get('page', 0),
                     metadata=metadata
                 ))
             
-            return ChunksResponse(
+            return build_response(
                 chunks=chunks,
                 total_count=len(chunks)
             )
@@ -281,12 +559,283 @@ class VectorStoreService:
             if not self.vector_store:
                 return 0
             
-            collection = self.client.get_collection("documents")
+            collection = self._collection()
             return collection.count()
             
         except Exception as e:
             logger.error(f"Error getting document count: {str(e)}")
             return 0
+    
+    def get_document_ids_by_source(self, source_path: str) -> Set[str]:
+        """Distinct document ids of chunks ingested from source_path (recorded by bulk ingestion)"""
+        if not self.vector_store:
+            raise Exception("Vector store not initialized")
+        results = self._collection().get(where={"source_path": source_path}, include=["metadatas"])
+        return {metadata.get("document_id") for metadata in results["metadatas"] if metadata and metadata.get("document_id")}
+    
+    def get_document_ids(self) -> Set[str]:
+        """Distinct document ids with at least one stored chunk"""
+        if not self.vector_store:
+            raise Exception("Vector store not initialized")
+        results = self._collection().get(include=["metadatas"])
+        return {metadata.get("document_id") for metadata in results["metadatas"] if metadata}
+    
+    def deleted_fraction(self) -> float:
+        """Share of index entries deleted since the collection was last rebuilt"""
+        live = self.get_document_count()
+        total = live + self.deleted_since_compaction
+        return self.deleted_since_compaction / total if total else 0.0
+    
+    def compact(self, batch_size: Optional[int] = None, retire_grace_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Rebuild the collection without its deleted entries and swap it in.
+        
+        Chroma only marks deleted vectors, so the HNSW index keeps its size after
+        churn. The live chunks are copied into a fresh collection while the old one
+        keeps serving queries and writes; writes made during the copy are tracked and
+        replayed before the swap, which is the only step that blocks writers.
+        """
+        if not self.vector_store:
+            raise Exception("Vector store not initialized")
+        if self._compaction_dirty_ids is not None:
+            raise Exception("Compaction already in progress")
+        
+        batch_size = min(batch_size or settings.compaction_batch_size, self.client.get_max_batch_size())
+        retire_grace_seconds = settings.compaction_retire_grace_seconds if retire_grace_seconds is None else retire_grace_seconds
+        start = time.perf_counter()
+        old_name = self.collection_name
+        new_name = f"{settings.chroma_collection_name}_{int(time.time() * 1000)}"
+        deleted_before = self.deleted_since_compaction
+        
+        old_collection = self._collection()
+        new_collection = self.client.create_collection(new_name, metadata=old_collection.metadata)
+        
+        try:
+            with self._write_lock:
+                self._compaction_dirty_ids = set()
+                snapshot_ids = old_collection.get(include=[])["ids"]
+            
+            copied = self._copy_chunks(old_collection, new_collection, snapshot_ids, batch_size)
+            
+            with self._write_lock:
+                # Replay what changed during the copy, then point reads and writes at the new collection
+                dirty_ids = list(self._compaction_dirty_ids)
+                self._copy_chunks(old_collection, new_collection, dirty_ids, batch_size)
+                self.collection_name = new_name
+                self.vector_store = self._make_langchain_store(new_name)
+                self._compaction_dirty_ids = None
+                self.deleted_since_compaction = 0
+                self.last_compaction = {
+                    "completed_at": datetime.now().isoformat(),
+                    "duration_seconds": time.perf_counter() - start,
+                    "chunks_copied": copied,
+                    "deleted_entries_dropped": deleted_before,
+                    "dirty_chunks_replayed": len(dirty_ids)
+                }
+                self._save_collection_state()
+        except Exception as e:
+            logger.error(f"Error compacting collection {old_name}: {str(e)}")
+            with self._write_lock:
+                self._compaction_dirty_ids = None
+            try:
+                self.client.delete_collection(new_name)
+            except Exception:
+                pass
+            raise
+        
+        # Let queries already running against the old collection finish before dropping it
+        time.sleep(retire_grace_seconds)
+        self.client.delete_collection(old_name)
+        
+        logger.info(
+            f"Compacted {old_name} into {new_name}: {copied} chunks copied, "
+            f"{deleted_before} deleted entries dropped in {self.last_compaction['duration_seconds']:.1f}s"
+        )
+        return self.last_compaction
+    
+    @staticmethod
+    def _copy_chunks(source, target, ids: List[str], batch_size: int) -> int:
+        """Copy chunks by id between collections; ids missing from source are removed from target"""
+        copied = 0
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            results = source.get(ids=batch_ids, include=["embeddings", "documents", "metadatas"])
+            if results["ids"]:
+                target.upsert(
+                    ids=results["ids"],
+                    embeddings=results["embeddings"],
+                    documents=results["documents"],
+                    metadatas=results["metadatas"]
+                )
+                copied += len(results["ids"])
+            missing_ids = list(set(batch_ids) - set(results["ids"]))
+            if missing_ids:
+                target.delete(ids=missing_ids)
+        return copied
+    
+    def drop_stale_collections(self) -> List[str]:
+        """Delete collections left behind by an interrupted compaction"""
+        # Without a saved state the active name is only the default guess; leave everything alone
+        if not self.vector_store or self._compaction_dirty_ids is not None or not os.path.exists(self._state_path):
+            return []
+        
+        prefix = f"{settings.chroma_collection_name}_"
+        dropped = []
+        for collection in self.client.list_collections():
+            # Chroma returns names or collection objects depending on the version
+            name = collection if isinstance(collection, str) else collection.name
+            if name != self.collection_name and (name == settings.chroma_collection_name or name.startswith(prefix)):
+                self.client.delete_collection(name)
+                dropped.append(name)
+        if dropped:
+            logger.info(f"Dropped stale collections: {', '.join(dropped)}")
+        return dropped
+    
+    def export_snapshot(self, directory: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Write all chunks to a columnar snapshot directory.
+        
+        Layout, row-aligned across files:
+          embeddings.npy   float32 matrix (chunks x dimensions), written through a memmap
+          ids.jsonl, texts.jsonl, metadatas.jsonl   one JSON value per line
+          manifest.json    counts, embedding model and format version (written last)
+        """
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            start = time.perf_counter()
+            batch_size = batch_size or settings.compaction_batch_size
+            os.makedirs(directory, exist_ok=True)
+            manifest_path = os.path.join(directory, "manifest.json")
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            
+            collection = self._collection()
+            with self._write_lock:
+                ids = collection.get(include=[])["ids"]
+            
+            embeddings = None
+            exported = 0
+            with open(os.path.join(directory, "ids.jsonl"), "w") as ids_file, \
+                    open(os.path.join(directory, "texts.jsonl"), "w") as texts_file, \
+                    open(os.path.join(directory, "metadatas.jsonl"), "w") as metadatas_file:
+                for batch_start in range(0, len(ids), batch_size):
+                    results = collection.get(
+                        ids=ids[batch_start:batch_start + batch_size],
+                        include=["embeddings", "documents", "metadatas"]
+                    )
+                    batch_embeddings = np.asarray(results["embeddings"], dtype=np.float32)
+                    if embeddings is None and len(batch_embeddings):
+                        embeddings = np.lib.format.open_memmap(
+                            os.path.join(directory, "embeddings.npy"),
+                            mode="w+",
+                            dtype=np.float32,
+                            shape=(len(ids), batch_embeddings.shape[1])
+                        )
+                    
+                    # Chunks deleted since the id listing are simply absent from the batch
+                    for row, (chunk_id, text, metadata) in enumerate(
+                        zip(results["ids"], results["documents"], results["metadatas"])
+                    ):
+                        embeddings[exported + row] = batch_embeddings[row]
+                        ids_file.write(json.dumps(chunk_id) + "\n")
+                        texts_file.write(json.dumps(text) + "\n")
+                        metadatas_file.write(json.dumps(metadata) + "\n")
+                    exported += len(results["ids"])
+            
+            dimensions = embeddings.shape[1] if embeddings is not None else 0
+            if embeddings is not None:
+                # Rows reserved for chunks deleted during the export stay unused; count is authoritative
+                embeddings.flush()
+                del embeddings
+            else:
+                np.save(os.path.join(directory, "embeddings.npy"), np.zeros((0, 0), dtype=np.float32))
+            
+            manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "created_at": datetime.now().isoformat(),
+                "count": exported,
+                "dimensions": dimensions,
+                "embedding_model": self.embedding_model_name,
+                "collection_metadata": collection.metadata,
+                "export_seconds": time.perf_counter() - start
+            }
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+            
+            logger.info(f"Exported {exported} chunks to snapshot {directory} in {manifest['export_seconds']:.1f}s")
+            return manifest
+            
+        except Exception as e:
+            logger.error(f"Error exporting snapshot: {str(e)}")
+            raise
+    
+    def import_snapshot(self, directory: str, batch_size: Optional[int] = None, replace: bool = False) -> Dict[str, Any]:
+        """Bulk-load a snapshot written by export_snapshot without re-embedding anything.
         
+        Embeddings are memory-mapped and fed to the collection batch by batch. With
+        replace, chunks not present in the snapshot are deleted afterwards.
+        """
+        try:
+            if not self.vector_store:
+                raise Exception("Vector store not initialized")
+            
+            with open(os.path.join(directory, "manifest.json")) as f:
+                manifest = json.load(f)
+            if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+            if manifest.get("embedding_model") != self.embedding_model_name:
+                raise ValueError(
+                    f"Snapshot was embedded with {manifest.get('embedding_model')}, "
+                    f"this store uses {self.embedding_model_name}"
+                )
+            
+            start = time.perf_counter()
+            count = manifest["count"]
+            batch_size = min(batch_size or settings.bulk_write_batch_size, self.client.get_max_batch_size())
+            embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r") if count else None
+            
+            imported_ids = set()
+            with open(os.path.join(directory, "ids.jsonl")) as ids_file, \
+                    open(os.path.join(directory, "texts.jsonl")) as texts_file, \
+                    open(os.path.join(directory, "metadatas.jsonl")) as metadatas_file:
+                for batch_start in range(0, count, batch_size):
+                    batch_count = min(batch_size, count - batch_start)
+                    batch_ids = [json.loads(next(ids_file)) for _ in range(batch_count)]
+                    batch_texts = [json.loads(next(texts_file)) for _ in range(batch_count)]
+                    batch_metadatas = [json.loads(next(metadatas_file)) for _ in range(batch_count)]
+                    
+                    with self._write_lock:
+                        self._collection().upsert(
+                            ids=batch_ids,
+                            embeddings=np.ascontiguousarray(embeddings[batch_start:batch_start + batch_count]),
+                            documents=batch_texts,
+                            metadatas=batch_metadatas
+                        )
+                        self._record_writes(batch_ids)
+                    imported_ids.update(batch_ids)
+            
+            removed = 0
+            if replace:
+                with self._write_lock:
+                    stale_ids = [chunk_id for chunk_id in self._collection().get(include=[])["ids"] if chunk_id not in imported_ids]
+                    for batch_start in range(0, len(stale_ids), batch_size):
+                        self._collection().delete(ids=stale_ids[batch_start:batch_start + batch_size])
+                    if stale_ids:
+                        self._record_deletes(stale_ids)
+                    removed = len(stale_ids)
+            
+            stats = {
+                "imported": count,
+                "removed": removed,
+                "import_seconds": time.perf_counter() - start,
+                "snapshot_created_at": manifest.get("created_at")
+            }
+            logger.info(f"Imported {count} chunks from snapshot {directory} in {stats['import_seconds']:.1f}s")
+            return stats
+            
+        except Exception as e:
+            logger.error(f"Error importing snapshot: {str(e)}")
+            raise
+
 
-vector_store_instance = VectorStoreService()
\ No newline at end of file
+vector_store_instance = VectorStoreService()
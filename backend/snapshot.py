@@ -0,0 +1,98 @@
+"""Export or import a snapshot of the vector store (and facts) for fast replica warm-up.
+
+Usage (from the backend directory):
+    python snapshot.py export SNAPSHOT_DIR [--no-facts]
+    python snapshot.py import SNAPSHOT_DIR [--replace] [--no-facts]
+
+A snapshot holds every chunk's id, embedding, text and metadata in columnar
+files (see VectorStoreService.export_snapshot), plus a copy of the facts
+database. Importing loads them in bulk without extracting or embedding any PDF;
+a merge import (without --replace) replaces the facts of the snapshot's documents
+and leaves the others.
+
+This CLI opens the Chroma directory itself, so it only runs while the API server
+is stopped: writes made beside a running server (for instance during one of its
+compactions) would be lost. It exits with an error when the server holds the
+directory; use POST /api/maintenance/snapshot/export or .../import on the
+running server instead. Those endpoints are disabled unless ADMIN_TOKEN is set
+(send it as X-Admin-Token) and only accept snapshot names below
+SNAPSHOT_DIRECTORY.
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+FACTS_FILENAME = "facts.db"
+
+
+def resolve_snapshot_directory(name: str, root: Optional[str] = None) -> str:
+    """Absolute path of a snapshot below the snapshot root; raises ValueError for paths that escape it"""
+    root = os.path.realpath(root or settings.snapshot_directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Snapshot directory must be inside {settings.snapshot_directory}")
+    return path
+
+
+def export_snapshot(vector_store, directory: str, facts_store=None) -> Dict[str, Any]:
+    manifest = vector_store.export_snapshot(directory)
+    if facts_store:
+        facts_path = os.path.join(directory, FACTS_FILENAME)
+        if os.path.exists(facts_path):
+            os.remove(facts_path)
+        facts_store.backup(facts_path)
+        manifest["facts"] = facts_store.count()
+    return manifest
+
+
+def import_snapshot(vector_store, directory: str, facts_store=None, replace: bool = False) -> Dict[str, Any]:
+    stats = vector_store.import_snapshot(directory, replace=replace)
+    facts_path = os.path.join(directory, FACTS_FILENAME)
+    if facts_store and os.path.exists(facts_path):
+        facts_store.restore(facts_path, replace=replace)
+        stats["facts"] = facts_store.count()
+    return stats
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export or import a vector store snapshot")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory")
+    parser.add_argument("--replace", action="store_true", help="On import, delete chunks that are not in the snapshot")
+    parser.add_argument("--no-facts", action="store_true", help="Leave the facts database out")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    logging.basicConfig(level=settings.log_level)
+
+    from services.facts_store import FactsStore
+    from services.vector_store import vector_store_instance as vector_store
+    owner = vector_store.directory_owner()
+    if owner is not None:
+        raise SystemExit(
+            f"{vector_store.persist_directory} is in use by the API server (pid {owner}); "
+            f"stop it or call POST /api/maintenance/snapshot/{args.command} on it instead"
+        )
+    asyncio.run(vector_store.initialize())
+    facts_store = None if args.no_facts else FactsStore()
+
+    if args.command == "export":
+        result = export_snapshot(vector_store, args.directory, facts_store)
+    else:
+        result = import_snapshot(vector_store, args.directory, facts_store, replace=args.replace)
+
+    print(json.dumps(result, indent=2, default=str))
+    return result
+
+
+if __name__ == "__main__":
+    main()
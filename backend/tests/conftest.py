@@ -0,0 +1,36 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the way main.py does (services.*, config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The vector store module builds its embedding model at import; use the hash-seeded
+# stand-in from the benchmarks so tests neither download nor load sentence-transformers
+import langchain_huggingface  # noqa: E402
+from benchmarks.stubs import StubEmbeddings  # noqa: E402
+
+langchain_huggingface.HuggingFaceEmbeddings = StubEmbeddings
+
+
+def make_page(page_number: int, content: str, tables=None) -> dict:
+    """Page entry in the shape the PDF extractors return"""
+    return {"page_number": page_number, "content": content, "tables": tables or [], "metadata": {}}
+
+
+@pytest.fixture
+def vector_store(tmp_path):
+    from services.vector_store import VectorStoreService
+
+    store = VectorStoreService(persist_directory=str(tmp_path / "chroma"))
+    asyncio.run(store.initialize())
+    return store
+
+
+@pytest.fixture
+def facts_store(tmp_path):
+    from services.facts_store import FactsStore
+
+    return FactsStore(str(tmp_path / "facts.db"))
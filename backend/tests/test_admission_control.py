@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from services.admission_control import (
+    AdmissionControlMiddleware, AdmissionController, AdmissionLimiter, RequestShedError
+)
+
+
+@pytest.mark.asyncio
+async def test_released_slots_go_to_the_oldest_waiter():
+    limiter = AdmissionLimiter("query", max_concurrency=1, max_queue=5, queue_timeout=1)
+    await limiter.acquire()
+    admitted = []
+
+    async def wait(name):
+        await limiter.acquire()
+        admitted.append(name)
+
+    waiters = [asyncio.ensure_future(wait(name)) for name in ("first", "second")]
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.sleep(0)
+    limiter.release()
+    await asyncio.gather(*waiters)
+
+    assert admitted == ["first", "second"]
+    assert limiter.get_stats()["active"] == 1
+    limiter.release()
+    assert limiter.get_stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_shed_with_429():
+    limiter = AdmissionLimiter("ingest", max_concurrency=1, max_queue=1, queue_timeout=1)
+    await limiter.acquire()
+    queued = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(RequestShedError) as excinfo:
+        await limiter.acquire()
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after >= 1
+
+    limiter.release()
+    await queued
+    assert limiter.stats["shed_queue_full"] == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_past_the_deadline_are_shed_with_503_and_dequeued():
+    limiter = AdmissionLimiter("analysis", max_concurrency=1, max_queue=5, queue_timeout=0.05)
+    await limiter.acquire()
+
+    with pytest.raises(RequestShedError) as excinfo:
+        await limiter.acquire()
+
+    assert excinfo.value.status_code == 503
+    assert limiter.get_stats()["queue_depth"] == 0
+    limiter.release()
+    assert limiter.get_stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_do_not_leak_slots():
+    limiter = AdmissionLimiter("query", max_concurrency=1, max_queue=5, queue_timeout=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.get_stats()["queue_depth"] == 0
+
+    limiter.release()
+    assert limiter.get_stats()["active"] == 0
+
+
+def test_routes_are_classified_by_method_and_path():
+    controller = AdmissionController.from_settings()
+
+    assert controller.classify("POST", "/api/upload") == "ingest"
+    assert controller.classify("PUT", "/api/documents/doc-1") == "ingest"
+    assert controller.classify("POST", "/api/maintenance/snapshot/import") == "ingest"
+    assert controller.classify("POST", "/api/chat") == "query"
+    assert controller.classify("POST", "/analysis/calculate-metrics") == "analysis"
+    assert controller.classify("GET", "/api/documents") is None
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_over_limit_requests_and_passes_others():
+    release = asyncio.Event()
+
+    async def chat(request):
+        await release.wait()
+        return JSONResponse({"answer": "ok"})
+
+    async def documents(request):
+        return JSONResponse({"documents": []})
+
+    app = Starlette(routes=[Route("/api/chat", chat, methods=["POST"]), Route("/api/documents", documents)])
+    controller = AdmissionController({"query": AdmissionLimiter("query", max_concurrency=1, max_queue=0, queue_timeout=1)})
+    app.add_middleware(AdmissionControlMiddleware, controller=controller)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.ensure_future(client.post("/api/chat"))
+        await asyncio.sleep(0.05)
+
+        shed = await client.post("/api/chat")
+        unlimited = await client.get("/api/documents")
+        release.set()
+        served = await first
+
+    assert shed.status_code == 429
+    assert int(shed.headers["retry-after"]) >= 1
+    assert unlimited.status_code == 200
+    assert served.json() == {"answer": "ok"}
+    assert controller.get_stats()["query"]["active"] == 0
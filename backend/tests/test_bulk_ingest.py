@@ -0,0 +1,167 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+
+import pytest
+
+import bulk_ingest
+from bulk_ingest import BulkIngestor, Checkpoint, document_id_for
+
+# Files whose extraction kills the worker process
+CRASHING_FILES = set()
+
+
+def fake_extract(file_path):
+    """In-process stand-in for _extract_file: one chunk and one fact per file"""
+    with open(file_path, "rb") as f:
+        content = f.read()
+    content_hash = hashlib.sha256(content).hexdigest()
+    document_id = document_id_for(content_hash)
+    metadata = {
+        "chunk_id": f"{document_id}:1:0", "page": 1, "document_id": document_id,
+        "content_hash": content_hash, "source_path": file_path
+    }
+    return {
+        "path": file_path,
+        "document_id": document_id,
+        "content_hash": content_hash,
+        "pages": 1,
+        "chunks": [(metadata["chunk_id"], content.decode(), metadata)],
+        "facts": [{"page": 1, "line_item": "Total assets", "period": "2023", "value": len(content), "raw_value": str(len(content)), "source": "text"}]
+    }
+
+
+class InlineExecutor:
+    """Runs submissions synchronously; a crashing file breaks the pool like a killed worker"""
+
+    pools = 0
+
+    def __init__(self, max_workers=None, mp_context=None):
+        InlineExecutor.pools += 1
+        self.broken = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, path):
+        if self.broken:
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        if path in CRASHING_FILES:
+            self.broken = True
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        else:
+            future.set_result(fn(path))
+        return future
+
+
+@pytest.fixture(autouse=True)
+def inline_pool(monkeypatch):
+    monkeypatch.setattr(bulk_ingest, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(bulk_ingest, "_extract_file", fake_extract)
+    CRASHING_FILES.clear()
+    InlineExecutor.pools = 0
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    directory = tmp_path / "pdfs"
+    directory.mkdir()
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        (directory / name).write_text(f"Annual report {name}")
+    return directory
+
+
+def make_ingestor(vector_store, facts_store, checkpoint_path, restart=False):
+    return BulkIngestor(
+        vector_store, Checkpoint(str(checkpoint_path), restart=restart),
+        workers=1, embed_batch_size=8, write_batch_size=100, facts_store=facts_store
+    )
+
+
+def test_completed_files_are_skipped_on_the_next_run(tmp_path, pdf_dir, vector_store, facts_store):
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    first = make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+    second = make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    assert first["files_ingested"] == 3
+    assert second["files_ingested"] == 0
+    assert second["files_skipped"] == 3
+    assert vector_store._collection().count() == 3
+
+
+def test_restart_ignores_the_checkpoint(tmp_path, pdf_dir, vector_store, facts_store):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    stats = make_ingestor(vector_store, facts_store, checkpoint_path, restart=True).run(str(pdf_dir))
+
+    assert stats["files_ingested"] == 3
+    # Same content, same ids: re-ingestion upserts in place
+    assert vector_store._collection().count() == 3
+
+
+def test_changed_file_replaces_its_previous_version(tmp_path, pdf_dir, vector_store, facts_store):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+    path = str(pdf_dir / "a.pdf")
+    old_id = Checkpoint(str(checkpoint_path)).data["completed"][path]["document_id"]
+
+    (pdf_dir / "a.pdf").write_text("Annual report a.pdf, restated")
+    stats = make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    new_id = Checkpoint(str(checkpoint_path)).data["completed"][path]["document_id"]
+    assert stats["files_ingested"] == 1
+    assert stats["documents_replaced"] == 1
+    assert new_id != old_id
+    assert vector_store.get_document_ids_by_source(path) == {new_id}
+    assert vector_store._collection().count() == 3
+    assert {fact["document_id"] for fact in facts_store.lookup("total assets")} == set(vector_store.get_document_ids())
+
+
+def test_dead_worker_marks_its_file_failed_and_the_run_continues(tmp_path, pdf_dir, vector_store, facts_store):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    crashing = str(pdf_dir / "b.pdf")
+    CRASHING_FILES.add(crashing)
+
+    stats = make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    checkpoint = Checkpoint(str(checkpoint_path))
+    assert stats["files_ingested"] == 2
+    assert stats["files_failed"] == 1
+    assert "Worker process died" in checkpoint.data["failed"][crashing]
+    assert crashing not in checkpoint.data["completed"]
+    # The crash broke the first pool; c.pdf and the retry of b.pdf ran in a fresh one
+    assert InlineExecutor.pools == 2
+
+
+def test_failed_files_are_retried_on_the_next_run(tmp_path, pdf_dir, vector_store, facts_store):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    crashing = str(pdf_dir / "b.pdf")
+    CRASHING_FILES.add(crashing)
+    make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    CRASHING_FILES.clear()
+    stats = make_ingestor(vector_store, facts_store, checkpoint_path).run(str(pdf_dir))
+
+    checkpoint = Checkpoint(str(checkpoint_path))
+    assert stats["files_ingested"] == 1
+    assert crashing in checkpoint.data["completed"]
+    assert crashing not in checkpoint.data["failed"]
+
+
+def test_cli_refuses_to_run_while_the_server_holds_the_directory(tmp_path, pdf_dir, monkeypatch):
+    from services import vector_store as vector_store_module
+
+    server_store = vector_store_module.vector_store_instance
+    monkeypatch.setattr(server_store, "persist_directory", str(tmp_path / "served"))
+    server_store.claim_directory()
+    try:
+        with pytest.raises(SystemExit, match="in use by the API server"):
+            bulk_ingest.main([str(pdf_dir), "--checkpoint", str(tmp_path / "checkpoint.json")])
+    finally:
+        server_store.release_directory()
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+
+import pytest
+
+from services import chart_service
+from services.chart_service import ChartCache, ChartService
+
+BAR_CHART = {"labels": ["2023", "2022"], "values": [900, 800]}
+
+
+@pytest.fixture
+def blocking_render(monkeypatch):
+    """Renders in a thread that waits until released, so the leader can be cancelled mid-render"""
+    release = threading.Event()
+
+    def render(normalized):
+        release.wait(5)
+        return b"chart"
+
+    monkeypatch.setattr(chart_service, "render_chart", render)
+    monkeypatch.setattr(ChartService, "_get_executor", lambda self: ThreadPoolExecutor(max_workers=2))
+    yield release
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_render(tmp_path, blocking_render):
+    service = ChartService(cache=ChartCache(str(tmp_path), 10 * 1024 * 1024), workers=1)
+
+    leader = asyncio.ensure_future(service.generate_chart("bar", BAR_CHART))
+    await asyncio.sleep(0.05)
+    follower = asyncio.ensure_future(service.generate_chart("bar", BAR_CHART))
+    await asyncio.sleep(0.05)
+    blocking_render.set()
+
+    (_, leader_path, leader_hit), (_, follower_path, follower_hit) = await asyncio.gather(leader, follower)
+    assert leader_path == follower_path
+    assert (leader_hit, follower_hit) == (False, True)
+    assert service.stats["renders"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_fail_followers(tmp_path, blocking_render):
+    service = ChartService(cache=ChartCache(str(tmp_path), 10 * 1024 * 1024), workers=1)
+
+    leader = asyncio.ensure_future(service.generate_chart("bar", BAR_CHART))
+    await asyncio.sleep(0.05)
+    follower = asyncio.ensure_future(service.generate_chart("bar", BAR_CHART))
+    await asyncio.sleep(0.05)
+    leader.cancel()
+    await asyncio.sleep(0.05)
+    blocking_render.set()
+
+    _, path, _ = await asyncio.wait_for(follower, timeout=1)
+    assert leader.cancelled()
+    assert os.path.exists(path)
+    assert service.stats["renders"] == 1
+    assert not service._in_flight
+
+
+@pytest.mark.asyncio
+async def test_failed_render_reaches_every_caller(tmp_path, monkeypatch):
+    def render(normalized):
+        raise ValueError("bad chart")
+
+    monkeypatch.setattr(chart_service, "render_chart", render)
+    monkeypatch.setattr(ChartService, "_get_executor", lambda self: ThreadPoolExecutor(max_workers=1))
+    service = ChartService(cache=ChartCache(str(tmp_path), 10 * 1024 * 1024), workers=1)
+
+    results = await asyncio.gather(
+        service.generate_chart("bar", BAR_CHART), service.generate_chart("bar", BAR_CHART), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert not service._in_flight
+
+
+def test_render_workers_are_spawned(tmp_path):
+    service = ChartService(cache=ChartCache(str(tmp_path), 10 * 1024 * 1024), workers=1)
+    try:
+        assert service._get_executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        service.shutdown()
@@ -0,0 +1,58 @@
+from services.chunking import StructureAwareChunker
+from tests.conftest import make_page
+
+
+class WordCounter:
+    """One token per word, counting how often the chunker asks"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return max(1, len(text.split()))
+
+
+def test_headings_start_new_sections():
+    chunker = StructureAwareChunker(max_tokens=50, token_counter=WordCounter())
+    chunks = chunker.chunk([
+        make_page(1, "STATEMENT OF FINANCIAL POSITION\nTotal assets 900 800\nNOTES TO THE FINANCIAL STATEMENTS\nNote text here."),
+    ])
+
+    assert [chunk["section"] for chunk in chunks] == [
+        "STATEMENT OF FINANCIAL POSITION",
+        "NOTES TO THE FINANCIAL STATEMENTS",
+    ]
+    assert chunks[0]["text"].endswith("Total assets 900 800")
+
+
+def test_chunks_track_page_span():
+    chunker = StructureAwareChunker(max_tokens=100, token_counter=WordCounter())
+    chunks = chunker.chunk([
+        make_page(1, "BALANCE SHEET\nCash 10 20"),
+        make_page(2, "Inventories 30 40"),
+    ])
+
+    assert len(chunks) == 1
+    assert (chunks[0]["page_start"], chunks[0]["page_end"]) == (1, 2)
+
+
+def test_numeric_rows_are_never_split():
+    row = "Revenue " + " ".join(str(1000 + i) for i in range(40))
+    chunker = StructureAwareChunker(max_tokens=16, token_counter=WordCounter())
+
+    chunks = chunker.chunk([make_page(1, row)])
+
+    assert [chunk["text"] for chunk in chunks] == [row]
+
+
+def test_long_prose_line_split_within_budget_in_linear_time():
+    words = [f"word{i}" for i in range(2000)]
+    counter = WordCounter()
+    chunker = StructureAwareChunker(max_tokens=16, token_counter=counter)
+
+    pieces = chunker._split_long_line(" ".join(words), 16)
+
+    assert " ".join(pieces).split() == words
+    assert all(len(piece.split()) <= 16 for piece in pieces)
+    assert counter.calls <= len(words)
@@ -0,0 +1,48 @@
+from services.pdf_processor import PDFProcessor
+from tests.conftest import make_page
+
+
+def extract(pages):
+    return PDFProcessor().extract_facts(pages)
+
+
+def test_table_rows_become_facts_without_generic_labels():
+    table = {
+        "header": ["", "2023", "2022"],
+        "rows": [
+            ["Revenue", "1,200", "1,100"],
+            ["Total", "5,000", "4,000"],
+            ["Total assets", "900", "(800)"],
+        ],
+    }
+
+    facts = extract([make_page(1, "", tables=[table])])
+
+    assert {(fact["line_item"], fact["period"], fact["value"]) for fact in facts} == {
+        ("Revenue", "2023", 1200.0),
+        ("Revenue", "2022", 1100.0),
+        ("Total assets", "2023", 900.0),
+        ("Total assets", "2022", -800.0),
+    }
+
+
+def test_text_rows_must_line_up_with_the_year_header():
+    content = "\n".join([
+        "2023 2022",
+        "Cash and cash equivalents 5 300 250",
+        "In 2023 the company had 12 offices and 3 plants",
+        "Number of offices and 12",
+        "Trade receivables 120 110",
+        "Net 40 30",
+        "Management expects growth to continue in the coming years.",
+        "Inventories 10 20",
+    ])
+
+    facts = extract([make_page(1, content)])
+
+    assert {(fact["line_item"], fact["period"], fact["value"]) for fact in facts} == {
+        ("Cash and cash equivalents", "2023", 300.0),
+        ("Cash and cash equivalents", "2022", 250.0),
+        ("Trade receivables", "2023", 120.0),
+        ("Trade receivables", "2022", 110.0),
+    }
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.stubs import StubGenerativeModel
+from services.rag_pipeline import RAGPipeline
+
+
+def fact(line_item, period, value, page=3):
+    return {"page": page, "line_item": line_item, "period": period, "value": value, "raw_value": f"{value:,}", "source": "table"}
+
+
+@pytest.fixture
+def pipeline(facts_store):
+    facts_store.add_facts("doc-1", "report.pdf", [
+        fact("Total assets", "2023", 900),
+        fact("Total assets", "2022", 800),
+        fact("Total current assets", "2023", 400),
+        fact("Current assets", "2023", 410),
+        fact("Revenue", "2023", 1200, page=2),
+        fact("Net income", "2023", 150, page=2),
+        # Stored before generic labels were filtered out at extraction
+        fact("Total", "2023", 5000),
+    ])
+    return RAGPipeline(vector_store=None, facts_store=facts_store, model=StubGenerativeModel(latency=0))
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What were total assets in 2023?", "Total assets for 2023 was 900"),
+    ("What were the total assets of the group in 2022?", "Total assets for 2022 was 800"),
+    ("How much was revenue in 2023?", "Revenue for 2023 was 1,200"),
+    ("What was total current assets in 2023?", "Total current assets for 2023 was 400"),
+])
+def test_figure_questions_are_answered_from_facts(pipeline, question, expected):
+    answer = pipeline._answer_from_facts(question)
+
+    assert answer is not None
+    assert answer["answer"].startswith(expected)
+
+
+@pytest.mark.parametrize("question", [
+    "What is the total headcount in 2023?",
+    "Tell me about the revenue recognition policy",
+    "Who audited the total accounts?",
+    "What was revenue last year?",
+    "What were revenue and net income in 2023?",
+    "How did revenue change in 2023?",
+    "What was the revenue recognition policy in 2023?",
+])
+def test_other_questions_fall_through_to_the_llm(pipeline, question):
+    assert pipeline._answer_from_facts(question) is None
@@ -0,0 +1,30 @@
+import sqlite3
+
+import pytest
+
+
+def fact(line_item, period, value, page=3):
+    return {"page": page, "line_item": line_item, "period": period, "value": value, "raw_value": str(value), "source": "table"}
+
+
+def test_replace_swaps_a_documents_facts_and_leaves_others_alone(facts_store):
+    facts_store.add_facts("doc-1", "report.pdf", [fact("Total assets", "2023", 900), fact("Revenue", "2023", 1200)])
+    facts_store.add_facts("doc-2", "other.pdf", [fact("Total assets", "2023", 50)])
+
+    stored = facts_store.replace_document_facts("doc-1", "report.pdf", [fact("Total assets", "2023", 950)])
+
+    assert stored == 1
+    assert facts_store.lookup("total assets", "2023", document_id="doc-1")[0]["value"] == 950
+    assert facts_store.lookup("revenue") == []
+    assert len(facts_store.lookup("total assets", document_id="doc-2")) == 1
+    assert "revenue" not in facts_store.line_item_keys()
+
+
+def test_failed_replace_keeps_the_previous_facts(facts_store):
+    facts_store.add_facts("doc-1", "report.pdf", [fact("Total assets", "2023", 900)])
+
+    # value is NOT NULL, so the insert fails after the delete has run
+    with pytest.raises(sqlite3.IntegrityError):
+        facts_store.replace_document_facts("doc-1", "report.pdf", [fact("Total assets", "2023", 950), fact("Revenue", "2023", None)])
+
+    assert [row["value"] for row in facts_store.lookup("total assets", document_id="doc-1")] == [900]
@@ -0,0 +1,78 @@
+import pytest
+
+from services.financial_metrics import FinancialMetricsEngine
+
+
+@pytest.fixture
+def engine():
+    return FinancialMetricsEngine()
+
+
+def test_ratios_and_margins(engine):
+    metrics = engine.calculate_single({
+        "revenue": 1000, "gross_profit": 400, "operating_income": 250, "net_income": 150,
+        "total_assets": 3000, "total_liabilities": 1800, "shareholders_equity": 1200,
+        "current_assets": 900, "current_liabilities": 600,
+    })
+
+    assert metrics == pytest.approx({
+        "gross_margin": 0.4,
+        "operating_margin": 0.25,
+        "net_profit_margin": 0.15,
+        "return_on_assets": 0.05,
+        "return_on_equity": 0.125,
+        "current_ratio": 1.5,
+        "debt_to_equity": 1.5,
+        "debt_to_assets": 0.6,
+        "equity_multiplier": 2.5,
+    })
+
+
+def test_zero_denominators_and_missing_inputs_are_none(engine):
+    metrics = engine.calculate({
+        "revenue": [0, 1000, None],
+        "net_income": [50, None, 20],
+        "shareholders_equity": [0, 500, 400],
+    })
+
+    assert metrics["net_profit_margin"] == [None, None, None]
+    assert metrics["return_on_equity"] == [None, None, 0.05]
+    # Metrics whose inputs were not sent at all are left out
+    assert "current_ratio" not in metrics
+
+
+def test_single_values_skip_none_inputs(engine):
+    metrics = engine.calculate_single({"revenue": 1000, "net_income": 100, "gross_profit": None})
+
+    assert metrics == {"net_profit_margin": 0.1}
+
+
+def test_growth_is_per_entity_in_period_order(engine):
+    # Rows arrive shuffled across two companies; results stay aligned with the input rows
+    metrics = engine.calculate(
+        {"revenue": [120, 200, 100, 250, 150]},
+        periods=["2023", "2022", "2022", "2023", "2024"],
+        entities=["acme", "globex", "acme", "globex", "acme"],
+    )
+
+    assert metrics["revenue_growth"] == pytest.approx([0.2, None, None, 0.25, 0.25])
+
+
+def test_growth_without_periods_follows_row_order(engine):
+    metrics = engine.calculate({"net_income": [-100, 50, 50, 0, 10]})
+
+    # Growth against a negative base is measured on its magnitude; a zero base is undefined
+    assert metrics["net_income_growth"] == pytest.approx([None, 1.5, 0.0, -1.0, None])
+
+
+def test_batch_reports_the_evaluated_row_count(engine):
+    _, row_count = engine.calculate_batch({}, periods=["2022", "2023"])
+
+    assert row_count == 2
+
+
+def test_mismatched_lengths_and_unknown_columns_are_rejected(engine):
+    with pytest.raises(ValueError, match="same length"):
+        engine.calculate({"revenue": [1, 2]}, periods=["2023"])
+    with pytest.raises(ValueError, match="Unknown columns: ebitda"):
+        engine.calculate({"ebitda": [1]})
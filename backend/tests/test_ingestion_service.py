@@ -0,0 +1,32 @@
+from services.ingestion_service import IngestionService
+from services.pdf_extractors import PDFExtractor
+from services.pdf_processor import PDFProcessor
+from tests.conftest import make_page
+
+
+class StaticExtractor(PDFExtractor):
+    """Returns prepared pages for a path instead of reading a PDF"""
+    name = "static"
+
+    def __init__(self, pages_by_path):
+        self.pages_by_path = pages_by_path
+
+    def extract(self, file_path, page_numbers=None):
+        return self.pages_by_path[file_path]
+
+
+def test_replace_updates_document_fields_on_unchanged_pages(vector_store, facts_store):
+    extractor = StaticExtractor({
+        "v1.pdf": [make_page(1, "Revenue grew in every segment."), make_page(2, "Costs were flat.")],
+        "v2.pdf": [make_page(1, "Revenue grew in every segment."), make_page(2, "Costs rose by ten percent.")],
+    })
+    service = IngestionService(PDFProcessor(extractor=extractor), vector_store, facts_store)
+
+    service.ingest_file("v1.pdf", "report.pdf", "doc-1", extra_metadata={"content_hash": "hash-1"})
+    stats = service.replace_document("v2.pdf", "report.pdf", "doc-1", extra_metadata={"content_hash": "hash-2"})
+
+    assert stats["pages_changed"] == 1
+    assert stats["chunks_metadata_updated"] >= 1
+    metadatas = vector_store._collection().get(where={"document_id": "doc-1"}, include=["metadatas"])["metadatas"]
+    assert {metadata["content_hash"] for metadata in metadatas} == {"hash-2"}
+    assert len({metadata["upload_date"] for metadata in metadatas}) == 1
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from benchmarks.stubs import StubResponse
+from services.llm_gateway import LLMGateway, LLMRequestError, LLMUnavailableError, Priority
+
+
+class BlockingModel:
+    """Sync model whose calls block in their worker thread until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.finished = threading.Event()
+
+    def generate_content(self, prompt):
+        self.release.wait(5)
+        self.finished.set()
+        return StubResponse("late")
+
+
+class ScriptedModel:
+    """Async model that raises or answers according to a script, one entry per call"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        await asyncio.sleep(0.01)
+        return StubResponse(outcome)
+
+
+def make_gateway(model, **overrides):
+    options = dict(
+        requests_per_minute=6000, tokens_per_minute=10_000_000, max_concurrency=1,
+        max_retries=2, retry_base_delay=0.001, retry_max_delay=0.01, request_timeout=5
+    )
+    options.update(overrides)
+    return LLMGateway(model, **options)
+
+
+@pytest.mark.asyncio
+async def test_timed_out_thread_call_keeps_its_slot_until_it_returns():
+    model = BlockingModel()
+    gateway = make_gateway(model, max_retries=0, request_timeout=0.05)
+
+    with pytest.raises(LLMUnavailableError):
+        await gateway.generate("slow prompt")
+    assert gateway.stats["timeouts"] == 1
+    # The worker thread is still inside the model call
+    assert gateway._active == 1
+
+    model.release.set()
+    await asyncio.to_thread(model.finished.wait, 5)
+    for _ in range(50):
+        if gateway._active == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert gateway._active == 0
+
+
+@pytest.mark.asyncio
+async def test_non_retriable_error_is_raised_once_as_request_error():
+    model = ScriptedModel(google_exceptions.PermissionDenied("API key not valid"))
+    gateway = make_gateway(model)
+
+    with pytest.raises(LLMRequestError):
+        await gateway.generate("prompt")
+
+    assert len(model.prompts) == 1
+    assert gateway.stats["retries"] == 0
+    assert gateway._active == 0
+
+
+@pytest.mark.asyncio
+async def test_retriable_errors_are_retried_until_success():
+    model = ScriptedModel(google_exceptions.ServiceUnavailable("busy"), google_exceptions.TooManyRequests("slow down"), "answer")
+    gateway = make_gateway(model)
+
+    assert await gateway.generate("prompt") == "answer"
+    assert len(model.prompts) == 3
+    assert gateway.stats["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_raise_unavailable_with_retry_after():
+    model = ScriptedModel(*[google_exceptions.ServiceUnavailable("busy")] * 3)
+    gateway = make_gateway(model)
+
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        await gateway.generate("prompt")
+    assert excinfo.value.retry_after > 0
+    assert gateway.stats["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_admitted_ahead_of_queued_batch_requests():
+    model = ScriptedModel()
+    gateway = make_gateway(model)
+
+    first = asyncio.ensure_future(gateway.generate("first", Priority.BATCH))
+    await asyncio.sleep(0)
+    queued = [asyncio.ensure_future(gateway.generate(f"batch {i}", Priority.BATCH)) for i in range(3)]
+    queued.append(asyncio.ensure_future(gateway.generate("interactive", Priority.INTERACTIVE)))
+    await asyncio.gather(first, *queued)
+
+    assert model.prompts[0] == "first"
+    assert model.prompts[1] == "interactive"
@@ -0,0 +1,23 @@
+import pytest
+
+from services import maintenance_service
+from services.maintenance_service import MaintenanceService
+
+
+@pytest.mark.asyncio
+async def test_stats_report_disk_usage_from_the_last_pass_without_walking(tmp_path, vector_store, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "notes.txt").write_bytes(b"x" * 100)
+    service = MaintenanceService(vector_store, upload_directory=str(uploads))
+
+    assert service.get_stats()["disk_usage_bytes"] is None
+    await service.run_once()
+
+    def no_walk(path):
+        raise AssertionError("get_stats walked a directory")
+
+    monkeypatch.setattr(maintenance_service, "directory_size", no_walk)
+    stats = service.get_stats()
+    assert stats["runs"] == 1
+    assert stats["disk_usage_bytes"]["uploads"] == 100
@@ -0,0 +1,164 @@
+from collections import Counter
+import threading
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import settings
+from services import profiling
+from services.profiling import (
+    ProfilingMiddleware, RequestProfile, RequestProfileStore, StackSampler, frame_label, profile_thread_work
+)
+
+
+def capture(store, path):
+    assert store.try_begin()
+    profile = RequestProfile("GET", path)
+    profile.start()
+    outer()
+    profile.stop()
+    profile.finish()
+    store.end(profile)
+    return profile
+
+
+def outer():
+    pass
+
+
+def inner():
+    pass
+
+
+def test_store_keeps_only_the_most_recent_profiles():
+    store = RequestProfileStore(max_profiles=2)
+
+    first, second, third = (capture(store, path) for path in ("/a", "/b", "/c"))
+
+    assert store.get(first.id) is None
+    assert [summary["path"] for summary in store.list()] == ["/c", "/b"]
+    assert store.get_stats() == {"captured": 3, "skipped_busy": 0, "stored": 2}
+
+
+def test_one_request_is_profiled_at_a_time():
+    store = RequestProfileStore(max_profiles=2)
+
+    assert store.try_begin()
+    assert not store.try_begin()
+    store.end(RequestProfile("GET", "/a"))
+
+    assert store.try_begin()
+    assert store.stats["skipped_busy"] == 1
+
+
+def blocking_work():
+    return sum(range(1000))
+
+
+@pytest.fixture
+def profiled_app(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+
+    async def report(request):
+        total = await run_in_threadpool(profile_thread_work(blocking_work))
+        return JSONResponse({"total": total})
+
+    store = RequestProfileStore(max_profiles=5)
+    app = Starlette(routes=[Route("/api/report", report)])
+    app.add_middleware(ProfilingMiddleware, store=store)
+    return app, store
+
+
+async def get(app, headers):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/api/report", headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_returns_its_profile_id(profiled_app):
+    app, store = profiled_app
+
+    response = await get(app, {"x-profile": "1", "x-profile-token": "secret"})
+
+    assert response.status_code == 200
+    profile = store.get(response.headers["x-profile-id"])
+    assert profile.status_code == 200
+    assert profile.path == "/api/report"
+    # Work handed to the threadpool is merged into the request's profile
+    assert "blocking_work" in profile.to_text(limit=200)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers", [
+    {"x-profile": "1"},
+    {"x-profile": "1", "x-profile-token": "wrong"},
+    {"x-profile-token": "secret"},
+])
+async def test_unauthorized_or_unmarked_requests_pass_through(profiled_app, headers):
+    app, store = profiled_app
+
+    response = await get(app, headers)
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert store.get_stats()["captured"] == 0
+
+
+@pytest.mark.asyncio
+async def test_request_arriving_while_another_is_profiled_is_served_unprofiled(profiled_app):
+    app, store = profiled_app
+    store.try_begin()
+
+    response = await get(app, {"x-profile": "1", "x-profile-token": "secret"})
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "busy"
+    assert "x-profile-id" not in response.headers
+
+
+def test_collapsed_stacks_only_cover_the_requested_window(monkeypatch):
+    monkeypatch.setattr(profiling.time, "time", lambda: 1000.0)
+    sampler = StackSampler(interval=1, window_seconds=60, bucket_seconds=10)
+    stack = ("worker", outer.__code__, inner.__code__)
+    sampler._buckets.extend([
+        (800.0, Counter({stack: 4})),
+        (995.0, Counter({stack: 2, ("worker", outer.__code__): 1})),
+    ])
+
+    recent = sampler.collapsed(window_seconds=30)
+    everything = sampler.collapsed(window_seconds=300)
+
+    labels = f"worker;{frame_label(outer.__code__)}"
+    assert recent == f"{labels};{frame_label(inner.__code__)} 2\n{labels} 1\n"
+    assert everything.splitlines()[0] == f"{labels};{frame_label(inner.__code__)} 6"
+
+
+def test_sampler_buckets_samples_and_drops_expired_buckets(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(profiling.time, "time", lambda: clock[0])
+    sampler = StackSampler(interval=1, window_seconds=30, bucket_seconds=10)
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            pass
+
+    thread = threading.Thread(target=spin, name="spinner")
+    thread.start()
+    try:
+        for now, buckets in ((1000.0, 1), (1005.0, 1), (1015.0, 2), (1100.0, 1)):
+            clock[0] = now
+            sampler._sample(threading.get_ident())
+            assert len(sampler._buckets) == buckets
+    finally:
+        stop.set()
+        thread.join()
+
+    assert sampler.stats["samples"] == 4
+    assert "spinner;" in sampler.collapsed()
+    assert frame_label(spin.__code__) in sampler.collapsed()
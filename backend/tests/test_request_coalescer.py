@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from benchmarks.stubs import StubGenerativeModel, StubVectorStore
+from services.rag_pipeline import RAGPipeline
+from services.request_coalescer import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_the_leader_result():
+    coalescer = SingleFlight("test")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    outcomes = await asyncio.gather(*(coalescer.run("key", compute) for _ in range(10)))
+
+    assert calls == 1
+    assert [result for result, _ in outcomes] == ["answer"] * 10
+    assert sum(1 for _, coalesced in outcomes if coalesced) == 9
+    assert coalescer.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_leader_failure_reaches_every_follower_and_is_not_cached():
+    coalescer = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("model error")
+
+    outcomes = await asyncio.gather(*(coalescer.run("key", fail) for _ in range(5)), return_exceptions=True)
+
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert coalescer.stats["errors"] == 1
+
+    async def succeed():
+        return "recovered"
+
+    assert await coalescer.run("key", succeed) == ("recovered", False)
+
+
+@pytest.mark.asyncio
+async def test_leader_caller_cancelling_does_not_cancel_followers():
+    coalescer = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    leader = asyncio.ensure_future(coalescer.run("key", compute))
+    await asyncio.sleep(0.01)
+    followers = [asyncio.ensure_future(coalescer.run("key", compute)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert [result for result, _ in await asyncio.gather(*followers)] == ["answer"] * 3
+
+
+@pytest.mark.asyncio
+async def test_identical_chat_questions_fan_out_from_one_model_call():
+    pipeline = RAGPipeline(StubVectorStore(latency=0.0), model=StubGenerativeModel(latency=0.05))
+    coalescer = SingleFlight("chat")
+    questions = ["What were the key risks?"] * 20 + ["What is the dividend policy?"] * 5
+
+    outcomes = await asyncio.gather(*(
+        coalescer.run(
+            pipeline.coalescing_key(question, None, []),
+            lambda question=question: pipeline.generate_answer(question=question, chat_history=[])
+        )
+        for question in questions
+    ))
+
+    assert pipeline.model.calls == 2
+    assert len({result["answer"] for result, _ in outcomes[:20]}) == 1
+    assert outcomes[0][0]["answer"] != outcomes[-1][0]["answer"]
@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from services.response_compression import CompressionMiddleware, negotiate_encoding, zstandard
+
+LARGE_PAYLOAD = {"chunks": [{"id": i, "content": f"Revenue for segment {i} grew year over year"} for i in range(200)]}
+
+
+def large_json(request):
+    return JSONResponse(LARGE_PAYLOAD)
+
+
+def small_json(request):
+    return JSONResponse({"status": "ok"})
+
+
+def pdf_bytes(request):
+    return Response(b"%PDF-1.4 " + b"0" * 4096, media_type="application/pdf")
+
+
+def streamed_text(request):
+    async def lines():
+        for i in range(100):
+            yield f"line {i} of a streamed export\n".encode()
+    return StreamingResponse(lines(), media_type="text/plain")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[
+        Route("/large", large_json),
+        Route("/small", small_json),
+        Route("/pdf", pdf_bytes),
+        Route("/stream", streamed_text),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, zstd;q=0.4", "gzip"),
+    ("identity", None),
+    ("gzip;q=0", None),
+    ("", None),
+    ("br, *;q=0.1", "zstd" if zstandard is not None else "gzip"),
+])
+def test_negotiate_encoding_honors_q_values(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_large_json_is_gzipped_with_vary_and_length(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE_PAYLOAD
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_zstd_is_preferred_when_the_client_accepts_it(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, zstd"})
+
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_small_bodies_and_unaccepted_encodings_pass_through(client):
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert small.json() == {"status": "ok"}
+    assert "content-encoding" not in identity.headers
+    assert identity.json() == LARGE_PAYLOAD
+
+
+def test_non_compressible_media_types_pass_through(client):
+    response = client.get("/pdf", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.content.startswith(b"%PDF")
+
+
+def test_streamed_bodies_are_compressed_without_content_length(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode().splitlines()[-1] == "line 99 of a streamed export"
@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+import pytest
+from langchain.schema import Document
+
+from benchmarks.stubs import StubGenerativeModel
+from config import settings
+from services.rag_pipeline import RAGPipeline
+from services.session_retrieval import condense_follow_up, is_follow_up
+
+
+def fact(line_item, period, value, page=3):
+    return {"page": page, "line_item": line_item, "period": period, "value": value, "raw_value": f"{value:,}", "source": "table"}
+
+
+@pytest.fixture
+def pipeline(vector_store, facts_store):
+    facts_store.add_facts("doc-1", "report.pdf", [
+        fact("Total assets", "2023", 900),
+        fact("Total assets", "2022", 800),
+        fact("Net income", "2023", 150, page=2),
+    ])
+    vector_store.add_documents([
+        Document(page_content=f"Segment {i} revenue and net income by year", metadata={"chunk_id": f"doc-1:1:{i}", "page": 1})
+        for i in range(6)
+    ], "doc-1")
+    return RAGPipeline(vector_store=vector_store, facts_store=facts_store, model=StubGenerativeModel(latency=0))
+
+
+def ask(pipeline, question, session_id="session-1"):
+    return asyncio.run(pipeline.generate_answer(question=question, chat_history=[], session_id=session_id))
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("what about net income?", True),
+    ("And how about 2022?", True),
+    ("and the prior year?", True),
+    ("Why did it fall?", True),
+    ("How does that compare?", True),
+    ("What was revenue last year?", False),
+    ("Is this company profitable?", False),
+    ("What were total assets in the previous year of the merger?", False),
+])
+def test_only_anaphoric_questions_are_follow_ups(question, expected):
+    assert is_follow_up(question) is expected
+
+
+@pytest.mark.parametrize("question, previous, expected", [
+    ("what about net income?", "What were total assets in 2023?", "net income 2023"),
+    ("what about net income?", "What was Contoso revenue in 2023?", "Contoso net income 2023"),
+    ("and what about net income in 2022?", "What were total assets in 2023?", "net income 2022"),
+    ("and the prior year?", "What were total assets in 2023?", "What were total assets in 2022?"),
+    ("what about Fabrikam?", "What was Contoso revenue in 2023?", "Fabrikam What was revenue in 2023?"),
+])
+def test_follow_up_subject_replaces_the_previous_subject(question, previous, expected):
+    assert condense_follow_up(question, previous) == expected
+
+
+def test_what_about_follow_up_is_not_answered_with_the_previous_fact(pipeline):
+    first = ask(pipeline, "What were total assets in 2023?")
+    second = ask(pipeline, "what about net income?")
+
+    assert first["answer"].startswith("Total assets for 2023 was 900")
+    assert "Total assets" not in second["answer"]
+    assert pipeline.session_cache.get("session-1").standalone_query == "net income 2023"
+
+
+@pytest.mark.parametrize("question", ["What was revenue last year?", "Is this company profitable?"])
+def test_standalone_questions_are_not_merged_with_the_previous_turn(pipeline, question):
+    ask(pipeline, "What were total assets in 2023?")
+    answer = ask(pipeline, question)
+
+    assert "Total assets" not in answer["answer"]
+    assert pipeline.session_cache.get("session-1").standalone_query == question
+
+
+def test_reuse_requires_the_same_years(pipeline, monkeypatch):
+    # Hash-seeded test embeddings are unrelated, so let every query count as similar
+    monkeypatch.setattr(settings, "session_reuse_similarity", -1.0)
+
+    ask(pipeline, "Which segments drove revenue in 2023?")
+    ask(pipeline, "and the previous year?")
+    assert pipeline.stats["retrieval_skipped"] == 0
+
+    ask(pipeline, "Which segments drove revenue in 2022?")
+    assert pipeline.stats["retrieval_skipped"] == 1
+
+
+def test_reused_chunks_respect_the_similarity_threshold(pipeline, monkeypatch):
+    monkeypatch.setattr(settings, "session_reuse_similarity", -1.0)
+    ask(pipeline, "Which segments drove revenue in 2023?")
+
+    # Nothing previously retrieved passes a stricter threshold, so the turn searches again
+    monkeypatch.setattr(settings, "similarity_threshold", 100.0)
+    answer = ask(pipeline, "Which segments drove revenue in 2023?")
+
+    assert pipeline.stats["retrieval_skipped"] == 0
+    assert answer["sources"] == []
+
+
+def test_coalesced_callers_adopt_the_shared_session_state(pipeline):
+    result = ask(pipeline, "Which segments drove revenue in 2023?", session_id="leader")
+    pipeline.adopt_session_state("follower", result["session_state"])
+
+    follower_state = pipeline.session_cache.get("follower")
+    assert follower_state.standalone_query == "Which segments drove revenue in 2023?"
+    assert follower_state.chunk_ids == pipeline.session_cache.get("leader").chunk_ids
+
+    # Later turns of one session leave the other alone
+    ask(pipeline, "and the previous year?", session_id="follower")
+    assert pipeline.session_cache.get("leader").standalone_query == "Which segments drove revenue in 2023?"
+
+
+@pytest.mark.asyncio
+async def test_retrieval_and_fact_lookups_do_not_block_the_event_loop(pipeline):
+    blocking_calls = []
+    lookup, embed_query = pipeline.facts_store.lookup, pipeline.vector_store.embed_query
+
+    def slow(name, fn):
+        def call(*args, **kwargs):
+            time.sleep(0.1)
+            blocking_calls.append(name)
+            return fn(*args, **kwargs)
+        return call
+
+    pipeline.facts_store.lookup = slow("lookup", lookup)
+    pipeline.vector_store.embed_query = slow("embed_query", embed_query)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.ensure_future(tick())
+    await pipeline.generate_answer(question="What were total assets in 2023?", chat_history=[], session_id="loop")
+    await pipeline.generate_answer(question="Which segments drove revenue?", chat_history=[], session_id="loop")
+    ticker.cancel()
+
+    assert "lookup" in blocking_calls and "embed_query" in blocking_calls
+    # Every blocking call slept 100ms; the loop kept ticking through them
+    assert ticks >= 5 * len(blocking_calls)
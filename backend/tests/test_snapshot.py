@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+from langchain.schema import Document
+
+import snapshot
+from services.facts_store import FactsStore
+from services.vector_store import VectorStoreService
+
+
+def fact(line_item, period, value, page=3):
+    return {"page": page, "line_item": line_item, "period": period, "value": value, "raw_value": f"{value:,}", "source": "table"}
+
+
+def chunks(document_id, count):
+    return [
+        Document(page_content=f"{document_id} chunk {i}", metadata={"chunk_id": f"{document_id}:1:{i}", "page": 1})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def exported(tmp_path, vector_store, facts_store):
+    vector_store.add_documents(chunks("doc-1", 5), "doc-1")
+    facts_store.add_facts("doc-1", "report.pdf", [fact("Total assets", "2023", 900), fact("Total assets", "2022", 800)])
+
+    directory = str(tmp_path / "snapshot")
+    manifest = snapshot.export_snapshot(vector_store, directory, facts_store)
+    assert manifest["count"] == 5
+    assert manifest["facts"] == 2
+    return directory
+
+
+@pytest.fixture
+def replica(tmp_path):
+    store = VectorStoreService(persist_directory=str(tmp_path / "replica"))
+    asyncio.run(store.initialize())
+    facts = FactsStore(str(tmp_path / "replica_facts.db"))
+    # The replica already serves another document
+    store.add_documents(chunks("doc-2", 2), "doc-2")
+    facts.add_facts("doc-2", "other.pdf", [fact("Revenue", "2023", 1200)])
+    facts.add_facts("doc-1", "report.pdf", [fact("Total assets", "2021", 700)])
+    return store, facts
+
+
+def test_snapshot_round_trip_keeps_chunks_and_embeddings(exported, vector_store, replica):
+    store, facts = replica
+
+    stats = snapshot.import_snapshot(store, exported, facts)
+
+    assert stats["imported"] == 5
+    source = vector_store._collection().get(where={"document_id": "doc-1"}, include=["embeddings", "documents"])
+    copied = store._collection().get(ids=source["ids"], include=["embeddings", "documents"])
+    source_rows = {chunk_id: (text, list(embedding)) for chunk_id, text, embedding in zip(source["ids"], source["documents"], source["embeddings"])}
+    copied_rows = {chunk_id: (text, list(embedding)) for chunk_id, text, embedding in zip(copied["ids"], copied["documents"], copied["embeddings"])}
+    assert copied_rows == source_rows
+
+
+def test_merge_import_replaces_only_the_snapshot_documents_facts(exported, replica):
+    store, facts = replica
+
+    snapshot.import_snapshot(store, exported, facts)
+
+    assert sorted(f["period"] for f in facts.lookup("total assets")) == ["2022", "2023"]
+    assert len(facts.lookup("revenue")) == 1
+    assert len(store._collection().get(where={"document_id": "doc-2"})["ids"]) == 2
+
+
+def test_replace_import_drops_everything_not_in_the_snapshot(exported, replica):
+    store, facts = replica
+
+    stats = snapshot.import_snapshot(store, exported, facts, replace=True)
+
+    assert stats["removed"] == 2
+    assert facts.lookup("revenue") == []
+    assert facts.count() == 2
+    assert store._collection().count() == 5
+
+
+def test_cli_refuses_to_run_while_the_server_holds_the_directory(tmp_path, exported, monkeypatch):
+    from services import vector_store as vector_store_module
+
+    server_store = vector_store_module.vector_store_instance
+    monkeypatch.setattr(server_store, "persist_directory", str(tmp_path / "served"))
+    server_store.claim_directory()
+    try:
+        with pytest.raises(SystemExit, match="in use by the API server"):
+            snapshot.main(["import", exported])
+    finally:
+        server_store.release_directory()
+
+    assert not os.path.exists(tmp_path / "served" / "server.pid")
+
+
+@pytest.mark.parametrize("name", ["../outside", "/etc", "", ".", "nightly/../../outside"])
+def test_snapshot_names_cannot_escape_the_snapshot_root(tmp_path, name):
+    with pytest.raises(ValueError):
+        snapshot.resolve_snapshot_directory(name, root=str(tmp_path / "snapshots"))
+
+
+def test_snapshot_names_resolve_below_the_snapshot_root(tmp_path):
+    root = tmp_path / "snapshots"
+
+    assert snapshot.resolve_snapshot_directory("nightly/2024-06", root=str(root)) == os.path.realpath(root / "nightly" / "2024-06")
+
+
+def test_admin_endpoints_need_a_configured_and_matching_token(monkeypatch):
+    from config import settings
+    from services.maintenance_service import admin_authorized
+
+    monkeypatch.setattr(settings, "admin_token", "")
+    assert not admin_authorized({"x-admin-token": ""})
+
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    assert not admin_authorized({})
+    assert not admin_authorized({"x-admin-token": "wrong"})
+    assert admin_authorized({"x-admin-token": "secret"})
@@ -0,0 +1,17 @@
+from benchmarks.synthetic import LINE_ITEMS, make_synthetic_pdf
+from services.pdf_extractors import PdfPlumberExtractor
+
+
+def test_table_pages_extract_as_full_grid(tmp_path):
+    path = make_synthetic_pdf(str(tmp_path / "tables.pdf"), pages=1, table_ratio=1.0)
+
+    pages = PdfPlumberExtractor().extract(path)
+
+    assert len(pages) == 1
+    tables = pages[0]["tables"]
+    assert len(tables) == 1
+    assert tables[0]["header"] == ["Line item", "2023", "2022", "2021"]
+    assert len(tables[0]["rows"]) == len(LINE_ITEMS)
+    assert all(len(row) == 4 and all(row) for row in tables[0]["rows"])
+    # Every value sits inside the grid, so none of it leaks into the prose
+    assert not any(cell in pages[0]["content"] for row in tables[0]["rows"] for cell in row[1:])
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from services.upload_storage import FileTooLargeError, MultipartUploadError, save_multipart_upload
+
+BOUNDARY = "upload-test-boundary"
+MAX_SIZE = 256 * 1024
+
+
+def multipart_body(parts):
+    body = b""
+    for headers, content in parts:
+        body += f"--{BOUNDARY}\r\n{headers}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def file_part(content, filename="report.pdf", name="file"):
+    return f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\nContent-Type: application/pdf', content
+
+
+def field_part(name, value):
+    return f'Content-Disposition: form-data; name="{name}"', value
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def client(upload_dir):
+    def destination_for(filename):
+        if not filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        return str(upload_dir / f"id_{filename}")
+
+    async def upload(request):
+        try:
+            filename, path, size, content_hash = await save_multipart_upload(request, "file", destination_for, MAX_SIZE)
+        except FileTooLargeError:
+            return JSONResponse({"detail": "File is too large"}, status_code=413)
+        except MultipartUploadError as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+        return JSONResponse({"filename": filename, "path": path, "size": size, "content_hash": content_hash})
+
+    app = Starlette(routes=[Route("/upload", upload, methods=["POST"])])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def post(client, body, chunk_size=8 * 1024, sent=None, headers=None):
+    async def stream():
+        for start in range(0, len(body), chunk_size):
+            if sent is not None:
+                sent.append(chunk_size)
+            yield body[start:start + chunk_size]
+
+    async with client:
+        return await client.post(
+            "/upload",
+            content=stream(),
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}", **(headers or {})}
+        )
+
+
+@pytest.mark.asyncio
+async def test_file_field_is_streamed_to_disk_and_hashed(client, upload_dir):
+    content = os.urandom(100 * 1024)
+    body = multipart_body([field_part("note", b"ignored"), file_part(content)])
+
+    response = await post(client, body, chunk_size=1000)
+
+    assert response.status_code == 200
+    saved = response.json()
+    assert saved["filename"] == "report.pdf"
+    assert saved["size"] == len(content)
+    assert saved["content_hash"] == hashlib.sha256(content).hexdigest()
+    assert (upload_dir / "id_report.pdf").read_bytes() == content
+
+
+@pytest.mark.asyncio
+async def test_oversized_upload_is_cut_off_while_the_body_is_received(client, upload_dir):
+    body = multipart_body([file_part(os.urandom(4 * MAX_SIZE))])
+    sent = []
+
+    response = await post(client, body, sent=sent)
+
+    assert response.status_code == 413
+    # The body stopped being read shortly after the limit, and nothing is left on disk
+    assert sum(sent) < 2 * MAX_SIZE
+    assert list(upload_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_oversized_content_length_is_refused_before_reading(client, upload_dir):
+    body = multipart_body([file_part(os.urandom(4 * MAX_SIZE))])
+    sent = []
+
+    response = await post(client, body, sent=sent, headers={"content-length": str(len(body))})
+
+    assert response.status_code == 413
+    assert sent == []
+
+
+@pytest.mark.asyncio
+async def test_rejected_filename_writes_nothing(client, upload_dir):
+    response = await post(client, multipart_body([file_part(b"MZ...", filename="setup.exe")]))
+
+    assert response.status_code == 400
+    assert list(upload_dir.iterdir()) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("body, content_type", [
+    (multipart_body([field_part("note", b"no file here")]), f"multipart/form-data; boundary={BOUNDARY}"),
+    (multipart_body([file_part(b"%PDF-1.7", name="attachment")]), f"multipart/form-data; boundary={BOUNDARY}"),
+    (b'{"file": "report.pdf"}', "application/json"),
+])
+async def test_requests_without_the_file_field_are_rejected(client, upload_dir, body, content_type):
+    async with client:
+        response = await client.post("/upload", content=body, headers={"content-type": content_type})
+
+    assert response.status_code == 400
+    assert list(upload_dir.iterdir()) == []
@@ -0,0 +1,34 @@
+import threading
+
+from langchain.schema import Document
+
+
+def test_add_documents_embeds_without_holding_the_write_lock(vector_store):
+    lock_free_while_embedding = []
+    embed_documents = vector_store.embeddings.embed_documents
+
+    def probing_embed_documents(texts):
+        # Another writer (e.g. a compaction swap) must be able to take the lock meanwhile
+        def probe():
+            acquired = vector_store._write_lock.acquire(blocking=False)
+            if acquired:
+                vector_store._write_lock.release()
+            lock_free_while_embedding.append(acquired)
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        return embed_documents(texts)
+
+    vector_store.embeddings.embed_documents = probing_embed_documents
+    documents = [
+        Document(page_content=f"Revenue note {i}", metadata={"chunk_id": f"doc-1:1:{i}", "page": 1})
+        for i in range(3)
+    ]
+
+    vector_store.add_documents(documents, "doc-1")
+
+    assert lock_free_while_embedding == [True]
+    stored = vector_store._collection().get(where={"document_id": "doc-1"}, include=["metadatas"])
+    assert sorted(stored["ids"]) == ["doc-1:1:0", "doc-1:1:1", "doc-1:1:2"]
+    assert all(metadata["document_id"] == "doc-1" for metadata in stored["metadatas"])